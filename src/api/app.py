@@ -1,4 +1,4 @@
-import io
+import json
 import logging
 import shutil
 import tempfile
@@ -6,26 +6,41 @@ import time
 import zipfile
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple
 
 from fastapi import FastAPI, File, Form, HTTPException, Response, UploadFile
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 from api.middleware import RouterLoggingMiddleware
 from api.logger import configure_logger
 from api.utils import (
+    UPLOAD_CHUNK_SIZE_BYTES,
     UploadSizeLimitError,
     UploadValidationError,
+    find_zip_input_root,
+    open_zip_input,
     stage_multipart_uploads,
     validate_staged_workspace,
 )
 from api.tempdir import get_writable_temp_dir
+from api.executor import TransformExecutorSaturatedError, create_transform_executor
+from api.jobs import DEFAULT_JOB_RESULT_TTL_SECONDS, JobStore, TransformJob
+from lib.config import read_int_env
 from lib.transform.collections import build_collections, searching_and_assigning
 from lib.transform.json_collections import build_collections_from_json
-from lib.transform.outputs import save_objects_to_json
-from api.model import HealthResponse
-from api.validators import validate_no_duplicate_filenames, validate_json_transform_files
+from lib.transform.logger import capture_transformer_log
+from lib.transform.outputs import iter_zipped_objects
+from lib.transform.parser import InputPath
+from api.model import HealthResponse, JobResponse
+from api.validators import (
+    validate_no_duplicate_filenames,
+    validate_json_transform_files,
+    validate_output_format,
+    validate_uncompressed_size,
+)
 
 
 configure_logger()
@@ -38,8 +53,22 @@ origins = [
 "https://hsds.sitblueprint.com"
 ]
 
-# Temporary upload limit. Change this later once the real production limit is decided.
-MAX_UPLOAD_SIZE_BYTES = 5 * 1024 * 1024
+# Transforms are CPU bound, so they run on a bounded pool instead of the event loop.
+# Configure with HSDS_MAX_CONCURRENT_TRANSFORMS and HSDS_MAX_QUEUED_TRANSFORMS.
+transform_executor = create_transform_executor()
+TRANSFORM_RETRY_AFTER_SECONDS = 5
+
+# Uploads are spooled to disk and read lazily, so the limit only bounds temp disk usage.
+# Override with HSDS_MAX_UPLOAD_SIZE_BYTES.
+MAX_UPLOAD_SIZE_BYTES = read_int_env("HSDS_MAX_UPLOAD_SIZE_BYTES", 200 * 1024 * 1024)
+# Caps the summed size of the zip's members once inflated, which is what the transform actually reads.
+# Override with HSDS_MAX_UNCOMPRESSED_SIZE_BYTES.
+MAX_UNCOMPRESSED_SIZE_BYTES = read_int_env("HSDS_MAX_UNCOMPRESSED_SIZE_BYTES", 500 * 1024 * 1024)
+# Uploads up to this size are spooled in memory before rolling over to a temp file
+UPLOAD_SPOOL_MEMORY_BYTES = 4 * 1024 * 1024
+
+# Stage timings and run totals of a synchronous transform, as compact JSON (see transform_metrics_header)
+TRANSFORM_METRICS_HEADER = "X-Transform-Metrics"
 
 # Adding CORS middleware
 app.add_middleware(
@@ -48,6 +77,7 @@ app.add_middleware(
     allow_credentials=True, # Allow cookies and credentials
     allow_methods=["*"], # Allow all HTTP methods
     allow_headers=["*"], # Allow all headers
+    expose_headers=[TRANSFORM_METRICS_HEADER], # Readable by browser clients
 )
 
 app.add_middleware(RouterLoggingMiddleware, logger=logging.getLogger("hsds.api"))
@@ -69,107 +99,192 @@ async def health(response: Response) -> HealthResponse:
     )
 
 
-@app.post(
-    "/transform",
-    status_code=201,
-    summary="Transform custom dataset into HSDS format",
-    description=(
-        "Accepts a zip file containing input data and mapping files. "
-        "Use input_format to specify whether the input is csv (default) or json. "
-        "Unzips, runs the transformer (build_collections → searching_and_assigning), and returns a zip of the transformed JSON files"
-    ),
-    response_class=StreamingResponse,
+def run_transformer(
+    input_dir: InputPath,
+    input_format: str = "csv",
+    progress: Optional[Callable[..., None]] = None,
+) -> list:
+    """
+    Build and link collections for an input directory (or a zipfile.Path inside an upload). Blocking; call through the executor.
+    progress, if given, is called with the current stage and object counts (see TransformJob.update), and
+    finally with the run's metrics (TransformerLog.get_metrics)
+    """
+    report = progress or (lambda **_: None)
+    counts = {"objects_mapped": 0, "objects_linked": 0}
+
+    def counter(name: str) -> Callable[[int], None]:
+        # Mapping and linking call this every batch of rows / LINK_PROGRESS_INTERVAL objects with the objects since
+        # the last call, so the job's counts move during the run without being updated for every object
+        def add(count: int) -> None:
+            counts[name] += count
+            report(**{name: counts[name]})
+
+        return add
+
+    # Each run records into its own log, so concurrent transforms don't mix their metrics
+    with capture_transformer_log() as log:
+        report(stage="mapping")
+        if input_format == "json":
+            results = build_collections_from_json(input_dir, progress=counter("objects_mapped"))
+        else:
+            # Rows are mapped as they are read, so large uploads aren't parsed into memory first
+            results = build_collections(input_dir, streaming=True, progress=counter("objects_mapped"))
+
+        report(stage="linking", objects_mapped=sum(len(objs) for _, objs in results))
+        results = searching_and_assigning(results, progress=counter("objects_linked"))
+        report(metrics=log.get_metrics())
+    return results
+
+
+def transform_metrics_header(metrics: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Response header with the stage timings and totals; per-file metrics are left out to bound its size"""
+    if not metrics:
+        return {}
+    summary = {"stages": metrics["stages"], "totals": metrics["totals"]}
+    return {TRANSFORM_METRICS_HEADER: json.dumps(summary, separators=(",", ":"))}
+
+
+def saturated_error(exc: TransformExecutorSaturatedError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(exc),
+        headers={"Retry-After": str(TRANSFORM_RETRY_AFTER_SECONDS)},
+    )
+
+
+async def run_transformer_off_loop(
+    input_dir: InputPath, input_format: str = "csv"
+) -> Tuple[list, Optional[Dict[str, Any]]]:
+    """Returns the linked collections and the run's metrics"""
+    reported: Dict[str, Any] = {}
+    try:
+        results = await transform_executor.run(
+            run_transformer, input_dir, input_format, lambda **fields: reported.update(fields)
+        )
+    except TransformExecutorSaturatedError as exc:
+        raise saturated_error(exc) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    return results, reported.get("metrics")
+
+
+# Results of asynchronous jobs stay on disk for HSDS_JOB_RESULT_TTL_SECONDS after they finish
+job_store = JobStore(
+    executor=transform_executor,
+    transform_fn=run_transformer,
+    ttl_seconds=read_int_env("HSDS_JOB_RESULT_TTL_SECONDS", DEFAULT_JOB_RESULT_TTL_SECONDS),
 )
-async def transform(
-    zip_file: UploadFile = File(
-        ..., description="Zip file containing input data and mapping files"
-    ),
-    input_format: str = Form(
-        default="csv", description="Input data format: 'csv' or 'json'"
-    ),
-) -> StreamingResponse:
-    # Validate input_format
+
+
+def validate_input_format(input_format: str) -> str:
     input_format = input_format.lower()
     if input_format not in ("csv", "json"):
         raise HTTPException(
             status_code=422,
             detail="input_format must be 'csv' or 'json'",
         )
+    return input_format
+
+
+def get_temp_root() -> str:
+    try:
+        return get_writable_temp_dir()
+    except RuntimeError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+def get_zip_input_root(zf: zipfile.ZipFile) -> str:
+    try:
+        return find_zip_input_root(zf)
+    except UploadValidationError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+def validate_zip_upload(spool: BinaryIO) -> str:
+    """Validates the directory of the zip in spool and returns its input root. Blocking; call through a threadpool"""
+    spool.seek(0)
+    try:
+        with zipfile.ZipFile(spool, "r") as zf:
+            if not zf.namelist():
+                raise HTTPException(
+                    status_code=422, detail="Zip file contains no files"
+                )
+            validate_no_duplicate_filenames(zf)
+            validate_uncompressed_size(zf, MAX_UNCOMPRESSED_SIZE_BYTES)
+            return get_zip_input_root(zf)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=422, detail="Invalid zip file")
+
+
+async def read_zip_upload(zip_file: UploadFile, spool: BinaryIO) -> str:
+    """
+    Copies an uploaded zip into spool (a temp file) and validates its directory, raising HTTPException
+    for anything unusable. Returns the input root inside the zip; members are read from spool later as needed.
+    Writes go through a threadpool, so the event loop never blocks on disk
+    """
     # Input validation: require a non-empty .zip file
     if not zip_file.filename or not zip_file.filename.lower().endswith(".zip"):
         raise HTTPException(status_code=422, detail="Must provide a zip file")
     # reads the upload in chunks so oversized files can be rejected early
-    content_buffer = io.BytesIO()
     total_size = 0
 
-    while chunk := await zip_file.read(1024 * 1024):
+    while chunk := await zip_file.read(UPLOAD_CHUNK_SIZE_BYTES):
         total_size += len(chunk)
 
         if total_size > MAX_UPLOAD_SIZE_BYTES:
             raise HTTPException(status_code=413, detail="Uploaded zip file is too large")
 
-        content_buffer.write(chunk)
+        await run_in_threadpool(spool.write, chunk)
 
-    # converts buffered chunks back into bytes for zip validation and extraction
-    content = content_buffer.getvalue()
-    if not content:
+    if not total_size:
         raise HTTPException(status_code=422, detail="Zip file is empty")
-    try:
-        with zipfile.ZipFile(io.BytesIO(content), "r") as zf:
-            if not zf.namelist():
-                raise HTTPException(
-                    status_code=422, detail="Zip file contains no files"
-                )
-            validate_no_duplicate_filenames(zf)
-    except zipfile.BadZipFile:
-        raise HTTPException(status_code=422, detail="Invalid zip file")
+    return await run_in_threadpool(validate_zip_upload, spool)
 
-    try:
-        temp_root = get_writable_temp_dir()
-    except RuntimeError as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
 
-    # Unzip into a temp directory
-    with tempfile.TemporaryDirectory(dir=temp_root, prefix="hsds-input-") as input_dir:
-        with zipfile.ZipFile(io.BytesIO(content), "r") as zf:
-            zf.extractall(input_dir)
+@app.post(
+    "/transform",
+    status_code=201,
+    summary="Transform custom dataset into HSDS format",
+    description=(
+        "Accepts a zip file containing input data and mapping files. "
+        "Use input_format to specify whether the input is csv (default) or json. "
+        "Unzips, runs the transformer (build_collections → searching_and_assigning), and returns a zip of the transformed JSON files"
+    ),
+    response_class=StreamingResponse,
+)
+async def transform(
+    zip_file: UploadFile = File(
+        ..., description="Zip file containing input data and mapping files"
+    ),
+    input_format: str = Form(
+        default="csv", description="Input data format: 'csv' or 'json'"
+    ),
+    output_format: str = Form(
+        default="files",
+        description="Output layout: 'files' (one JSON file per object), 'ndjson' (one file per object type) or 'bundle' (a single JSON file)",
+    ),
+) -> StreamingResponse:
+    input_format = validate_input_format(input_format)
+    output_format = validate_output_format(output_format)
+    temp_root = get_temp_root()
 
-        # Handle case where zip creates a single top-level folder
-        extracted_items = list(Path(input_dir).iterdir())
-        if len(extracted_items) == 1 and extracted_items[0].is_dir():
-            input_dir = str(extracted_items[0])
+    # Small uploads stay in memory; larger ones roll over to a temp file instead of being buffered
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MEMORY_BYTES, dir=temp_root) as spool:
+        root = await read_zip_upload(zip_file, spool)
 
-        if not any(Path(input_dir).iterdir()):
-            raise HTTPException(
-                status_code=422, detail="Zip file extracts to an empty folder"
-            )
+        # Input files are streamed straight from the archive, nothing is extracted
+        with zipfile.ZipFile(spool, "r") as zf:
+            input_root = open_zip_input(zf, root, zip_file.filename)
 
-        # Run the transformer: build collections, then link parents/children
-        try:
-            if input_format == "json":
-                results = build_collections_from_json(input_dir)
-            else:
-                results = build_collections(input_dir)
-        except ValueError as e:
-            raise HTTPException(status_code=422, detail=str(e))
-
-        results = searching_and_assigning(results)
-
-        # Write each object to JSON files in another temp dir, then zip and return
-        with tempfile.TemporaryDirectory(dir=temp_root, prefix="hsds-output-") as output_dir:
-            save_objects_to_json(results, output_dir)
-            buf = io.BytesIO()
-            with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as out_zip:
-                for p in Path(output_dir).rglob("*"):
-                    if p.is_file():
-                        arcname = p.relative_to(output_dir)
-                        out_zip.write(p, arcname)
-            buf.seek(0)
-            return StreamingResponse(
-                buf,
-                media_type="application/zip",
-                headers={"Content-Disposition": "attachment; filename=transformed.zip"},
-            )
+            # Run the transformer off the event loop: build collections, then link parents/children
+            results, metrics = await run_transformer_off_loop(input_root, input_format)
+
+    # Serialize and zip the objects while the response is sent, without an output directory
+    return StreamingResponse(
+        iter_zipped_objects(results, output_format=output_format),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=transformed.zip", **transform_metrics_header(metrics)},
+    )
 
 
 @app.post(
@@ -186,16 +301,17 @@ async def transform(
 async def transform_stream(
     files: list[UploadFile] = File(
         ..., description="Repeated files parts containing source JSON and *_mapping.json"
-    )
+    ),
+    output_format: str = Form(
+        default="files",
+        description="Output layout: 'files' (one JSON file per object), 'ndjson' (one file per object type) or 'bundle' (a single JSON file)",
+    ),
 ) -> StreamingResponse:
-    try:
-        temp_root = get_writable_temp_dir()
-    except RuntimeError as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
+    output_format = validate_output_format(output_format)
+    temp_root = get_temp_root()
 
     workspace_dir = Path(tempfile.mkdtemp(dir=temp_root, prefix="hsds-stream-"))
     input_dir = workspace_dir / "input"
-    output_dir = workspace_dir / "output"
 
     try:
         summary = await stage_multipart_uploads(
@@ -205,28 +321,15 @@ async def transform_stream(
         )
         validate_staged_workspace(summary)
         validate_json_transform_files(str(input_dir))
-        
-        try:
-            results = build_collections_from_json(str(input_dir))
-        except ValueError as exc:
-            raise HTTPException(status_code=422, detail=str(exc)) from exc
 
-        results = searching_and_assigning(results)
-        save_objects_to_json(results, output_dir)
-
-        buf = io.BytesIO()
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as out_zip:
-            for p in output_dir.rglob("*"):
-                if p.is_file():
-                    arcname = p.relative_to(output_dir)
-                    out_zip.write(p, arcname)
-        buf.seek(0)
+        results, metrics = await run_transformer_off_loop(str(input_dir), "json")
 
+        # The zip is generated from the in-memory results, so the workspace can be removed right away
         return StreamingResponse(
-            buf,
+            iter_zipped_objects(results, output_format=output_format),
             status_code=201,
             media_type="application/zip",
-            headers={"Content-Disposition": "attachment; filename=transformed.zip"},
+            headers={"Content-Disposition": "attachment; filename=transformed.zip", **transform_metrics_header(metrics)},
         )
     except UploadSizeLimitError as exc:
         raise HTTPException(status_code=413, detail=str(exc)) from exc
@@ -236,6 +339,109 @@ async def transform_stream(
         shutil.rmtree(workspace_dir, ignore_errors=True)
 
 
+def job_response(job: TransformJob) -> JobResponse:
+    return JobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        stage=job.stage,
+        objects_mapped=job.objects_mapped,
+        objects_linked=job.objects_linked,
+        metrics=job.metrics,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        expires_at=job.finished_at + job_store.ttl if job.finished_at else None,
+        result_url=f"/jobs/{job.job_id}/result" if job.status == "succeeded" else None,
+    )
+
+
+def get_job_or_404(job_id: str) -> TransformJob:
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
+@app.post(
+    "/jobs",
+    status_code=202,
+    summary="Submit a transform job",
+    description=(
+        "Accepts the same zip upload as /transform, but returns a job id right away. "
+        "Poll GET /jobs/{job_id} for status and progress, then download the zip from "
+        "GET /jobs/{job_id}/result. Results are removed once they expire."
+    ),
+    response_model=JobResponse,
+)
+async def submit_job(
+    response: Response,
+    zip_file: UploadFile = File(
+        ..., description="Zip file containing input data and mapping files"
+    ),
+    input_format: str = Form(
+        default="csv", description="Input data format: 'csv' or 'json'"
+    ),
+    output_format: str = Form(
+        default="files",
+        description="Output layout: 'files' (one JSON file per object), 'ndjson' (one file per object type) or 'bundle' (a single JSON file)",
+    ),
+) -> JobResponse:
+    input_format = validate_input_format(input_format)
+    output_format = validate_output_format(output_format)
+
+    # The upload is written straight into the job's workspace and read from there by the worker
+    job = job_store.create_job(get_temp_root(), input_format, output_format, zip_file.filename)
+    try:
+        upload = await run_in_threadpool(open, job.upload_path, "w+b")
+        try:
+            input_root = await read_zip_upload(zip_file, upload)
+        finally:
+            await run_in_threadpool(upload.close)
+    except BaseException:
+        job_store.discard(job.job_id)
+        raise
+
+    try:
+        job_store.start(job, input_root)
+    except TransformExecutorSaturatedError as exc:
+        raise saturated_error(exc) from exc
+
+    response.headers["Location"] = f"/jobs/{job.job_id}"
+    return job_response(job)
+
+
+@app.get(
+    "/jobs/{job_id}",
+    summary="Get transform job status",
+    description="Returns the job's status, current stage and progress counters",
+    response_model=JobResponse,
+)
+async def get_job(job_id: str, response: Response) -> JobResponse:
+    response.headers["Cache-Control"] = "no-store"
+    return job_response(get_job_or_404(job_id))
+
+
+@app.get(
+    "/jobs/{job_id}/result",
+    summary="Download a transform job's result",
+    description="Returns the zip of transformed JSON files once the job has succeeded",
+    response_class=FileResponse,
+)
+async def get_job_result(job_id: str) -> FileResponse:
+    job = get_job_or_404(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=409, detail=f"Job failed: {job.error}")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is still {job.status}")
+
+    return FileResponse(
+        job.result_path,
+        media_type="application/zip",
+        filename="transformed.zip",
+    )
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(_, exc: RequestValidationError) -> JSONResponse:
     return JSONResponse(
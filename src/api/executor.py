@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from lib.config import read_int_env
+
+
+DEFAULT_MAX_CONCURRENT_TRANSFORMS = 2
+DEFAULT_MAX_QUEUED_TRANSFORMS = 4
+
+
+class TransformExecutorSaturatedError(RuntimeError):
+    pass
+
+
+class TransformExecutor:
+    """Runs blocking transform jobs on a bounded thread pool so the event loop stays responsive.
+
+    At most max_workers jobs run at once and up to max_queued more wait for a worker.
+    Anything beyond that is rejected immediately instead of piling up.
+    """
+
+    def __init__(self, max_workers: int, max_queued: int = 0) -> None:
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than zero")
+        if max_queued < 0:
+            raise ValueError("max_queued must not be negative")
+
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="hsds-transform"
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Number of jobs that are running or waiting for a worker."""
+        return self._in_flight
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Schedules fn without waiting for it, raising TransformExecutorSaturatedError when full."""
+        if not self._slots.acquire(blocking=False):
+            raise TransformExecutorSaturatedError(
+                f"Transform capacity reached ({self.max_workers} running, "
+                f"{self.max_queued} queued). Try again later."
+            )
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+
+        # The slot is held until the job really finishes, even if the request is cancelled first
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_transform_executor(
+    workers_env_var: str = "HSDS_MAX_CONCURRENT_TRANSFORMS",
+    queue_env_var: str = "HSDS_MAX_QUEUED_TRANSFORMS",
+) -> TransformExecutor:
+    """Build the API's transform executor from environment configuration."""
+    return TransformExecutor(
+        max_workers=read_int_env(workers_env_var, DEFAULT_MAX_CONCURRENT_TRANSFORMS),
+        max_queued=read_int_env(queue_env_var, DEFAULT_MAX_QUEUED_TRANSFORMS),
+    )
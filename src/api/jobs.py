@@ -0,0 +1,171 @@
+import logging
+import shutil
+import tempfile
+import threading
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from api.executor import TransformExecutor
+from api.utils import open_zip_input
+from lib.transform.outputs import iter_zipped_objects
+
+
+logger = logging.getLogger("hsds.api.jobs")
+
+DEFAULT_JOB_RESULT_TTL_SECONDS = 60 * 60
+UPLOAD_FILENAME = "input.zip"
+RESULT_FILENAME = "transformed.zip"
+
+# Called as transform_fn(input_root, input_format, progress=job.update), where input_root is a zipfile.Path
+# inside the uploaded archive, and returns the linked collections
+TransformFn = Callable[..., List[Any]]
+
+
+@dataclass
+class TransformJob:
+    """State of one submitted transform. Updated from the worker thread, read by the API."""
+
+    job_id: str
+    workspace_dir: Path
+    input_format: str
+    output_format: str
+    upload_name: str = UPLOAD_FILENAME
+    input_root: str = ""  # Folder inside the uploaded zip that holds the input files
+    status: str = "queued"  # queued -> running -> succeeded | failed
+    stage: Optional[str] = None
+    objects_mapped: int = 0
+    objects_linked: int = 0
+    metrics: Optional[Dict[str, Any]] = None  # Stage and per-file timings, set when the transform finishes
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def upload_path(self) -> Path:
+        return self.workspace_dir / UPLOAD_FILENAME
+
+    @property
+    def result_path(self) -> Path:
+        return self.workspace_dir / RESULT_FILENAME
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def update(self, **fields: Any) -> None:
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+
+class JobStore:
+    """
+    Keeps transform jobs submitted to the API and their results on disk.
+
+    Jobs run on the shared transform executor. Finished jobs (and their result zip) are evicted
+    ttl_seconds after they finish; eviction runs whenever the store is used.
+    """
+
+    def __init__(
+        self,
+        executor: TransformExecutor,
+        transform_fn: TransformFn,
+        ttl_seconds: int = DEFAULT_JOB_RESULT_TTL_SECONDS,
+        root_dir: Optional[Path] = None,
+    ) -> None:
+        self.executor = executor
+        self.transform_fn = transform_fn
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._root_dir = root_dir
+        self._jobs: Dict[str, TransformJob] = {}
+        self._lock = threading.Lock()
+
+    def create_job(
+        self,
+        temp_root: str,
+        input_format: str,
+        output_format: str,
+        upload_name: str = UPLOAD_FILENAME,
+    ) -> TransformJob:
+        """Registers a job and creates its workspace so the upload can be written to job.upload_path."""
+        self.evict_expired()
+
+        with self._lock:
+            if self._root_dir is None:
+                self._root_dir = Path(tempfile.mkdtemp(dir=temp_root, prefix="hsds-jobs-"))
+
+            job_id = uuid.uuid4().hex
+            job = TransformJob(
+                job_id=job_id,
+                workspace_dir=self._root_dir / job_id,
+                input_format=input_format,
+                output_format=output_format,
+                upload_name=upload_name,
+            )
+            job.workspace_dir.mkdir(parents=True)
+            self._jobs[job_id] = job
+        return job
+
+    def start(self, job: TransformJob, input_root: str = "") -> None:
+        """
+        Queues a job whose upload has been written, reading inputs from the input_root folder of the zip
+        Raises TransformExecutorSaturatedError and discards the job when the executor is full
+        """
+        job.input_root = input_root
+        try:
+            self.executor.submit(self._run, job)
+        except BaseException:
+            self.discard(job.job_id)
+            raise
+
+    def get(self, job_id: str) -> Optional[TransformJob]:
+        self.evict_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            shutil.rmtree(job.workspace_dir, ignore_errors=True)
+
+    def evict_expired(self, now: Optional[datetime] = None) -> int:
+        """Removes finished jobs older than the TTL along with their files. Returns how many were evicted."""
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished_at is not None and now - job.finished_at >= self.ttl
+            ]
+        for job_id in expired:
+            self.discard(job_id)
+        return len(expired)
+
+    def _run(self, job: TransformJob) -> None:
+        job.update(status="running", started_at=datetime.now(timezone.utc))
+        outcome: Dict[str, Any] = {"status": "succeeded", "stage": None}
+        try:
+            with zipfile.ZipFile(job.upload_path, "r") as zf:
+                input_root = open_zip_input(zf, job.input_root, job.upload_name)
+                results = self.transform_fn(input_root, job.input_format, progress=job.update)
+
+            job.update(stage="writing")
+            partial_path = job.result_path.with_suffix(".part")
+            with open(partial_path, "wb") as f:
+                for chunk in iter_zipped_objects(results, output_format=job.output_format):
+                    f.write(chunk)
+            partial_path.replace(job.result_path)
+        except Exception as exc:
+            logger.exception("Transform job %s failed", job.job_id)
+            outcome = {"status": "failed", "error": str(exc)}
+        finally:
+            # Only the result is kept for download
+            job.upload_path.unlink(missing_ok=True)
+            # finished_at is set before the final status so a finished job always has an expiry
+            job.update(finished_at=datetime.now(timezone.utc))
+            job.update(**outcome)
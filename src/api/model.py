@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Literal
+from typing import Any, Dict, Literal, Optional
 from pydantic import BaseModel
 
 class HealthResponse(BaseModel):
@@ -7,4 +7,18 @@ class HealthResponse(BaseModel):
     service: str
     version: str
     timestamp_utc: datetime
-    uptime_seconds: float
\ No newline at end of file
+    uptime_seconds: float
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    stage: Optional[Literal["mapping", "linking", "writing"]] = None
+    objects_mapped: int
+    objects_linked: int
+    metrics: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    result_url: Optional[str] = None
@@ -1,3 +1,4 @@
+import zipfile
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Sequence
@@ -133,3 +134,29 @@ def validate_staged_workspace(summary: StagingSummary) -> None:
         raise UploadValidationError(
             "At least one mapping file ending in *_mapping.json is required"
         )
+
+
+def find_zip_input_root(zf: zipfile.ZipFile) -> str:
+    """Returns the folder inside the archive that holds the input files ("" for the top level).
+
+    A zip that wraps everything in a single top-level folder is read from inside that folder.
+    """
+    names = zf.namelist()
+    top_level = {name.split("/", 1)[0] for name in names}
+
+    root = ""
+    if len(top_level) == 1 and any("/" in name for name in names):
+        root = f"{top_level.pop()}/"
+
+    if not any(name.startswith(root) and not name.endswith("/") for name in names):
+        raise UploadValidationError("Zip file extracts to an empty folder")
+    return root
+
+
+def open_zip_input(zf: zipfile.ZipFile, root: str, display_name: str) -> zipfile.Path:
+    """Returns the input folder of an open archive as a zipfile.Path the transformer can read lazily.
+
+    display_name replaces the archive's on-disk path in transformer error messages.
+    """
+    zf.filename = display_name
+    return zipfile.Path(zf, at=root)
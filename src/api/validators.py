@@ -3,6 +3,8 @@ from pathlib import Path
 
 from fastapi import HTTPException
 
+from lib.transform.outputs import OUTPUT_FORMATS
+
 
 # helper function to check for duplicate filenames (even in subdirectories)
 def validate_no_duplicate_filenames(zf: zipfile.ZipFile) -> None:
@@ -22,6 +24,16 @@ def validate_no_duplicate_filenames(zf: zipfile.ZipFile) -> None:
 
         seen_filenames.add(filename)
 
+# helper function to reject zips whose members would inflate past max_bytes (zip bombs included)
+def validate_uncompressed_size(zf: zipfile.ZipFile, max_bytes: int) -> None:
+    total_size = sum(file_info.file_size for file_info in zf.infolist())
+
+    if total_size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail="Zip file contents are too large once uncompressed",
+        )
+
 # helper function to ensure json uploads contain required files
 def validate_json_transform_files(input_dir: str) -> None:
     files = [p for p in Path(input_dir).rglob("*") if p.is_file()]
@@ -40,4 +52,14 @@ def validate_json_transform_files(input_dir: str) -> None:
         raise HTTPException(status_code=422, detail="JSON input file is missing")
 
     if not has_mapping_file:
-        raise HTTPException(status_code=422, detail="Mapping file is missing")
\ No newline at end of file
+        raise HTTPException(status_code=422, detail="Mapping file is missing")
+
+# helper function to normalize and check the requested output layout
+def validate_output_format(output_format: str) -> str:
+    output_format = (output_format or "").lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"output_format must be one of: {', '.join(OUTPUT_FORMATS)}",
+        )
+    return output_format
@@ -0,0 +1,132 @@
+import json
+import tempfile
+from pathlib import Path
+
+import click
+
+from src.lib.benchmark.pipeline import DEFAULT_MAX_REGRESSION, STAGES, compare_results, run_benchmark
+from src.lib.benchmark.synthetic import DatasetConfig, generate_dataset
+
+
+def dataset_options(fn):
+    """Options shared by the commands that generate a synthetic dataset"""
+    options = [
+        click.option('--rows', type=click.IntRange(min=1), default=1000, show_default=True, help='Organizations to generate; locations match, services and phones scale with --fan-out'),
+        click.option('--columns', type=click.IntRange(min=1), default=12, show_default=True, help='Columns per input file (padded with mapped filler columns)'),
+        click.option('--fan-out', type=click.IntRange(min=1), default=3, show_default=True, help='Children per parent for each *_id relation (services per organization, phones per service)'),
+        click.option('--path-arrays', type=click.IntRange(min=1), default=2, show_default=True, help='Width of the semicolon path arrays (Phone1;Phone2;...)'),
+        click.option('--splits', type=click.IntRange(min=0), default=1, show_default=True, help='Comma-split fields per input file'),
+        click.option('--seed', type=int, default=0, show_default=True, help='Random seed, so a dataset can be regenerated exactly'),
+    ]
+    for option in reversed(options):
+        fn = option(fn)
+    return fn
+
+
+def _echo_results(results):
+    click.echo(f"{'stage':<26}{'median s':>10}{'min s':>10}{'cpu s':>10}{'items':>10}{'items/s':>12}")
+    for stage in STAGES:
+        summary = results["stages"][stage]
+        per_second = summary["items_per_second"]
+        click.echo(
+            f"{stage:<26}{summary['wall_seconds']['median']:>10.3f}{summary['wall_seconds']['min']:>10.3f}"
+            f"{summary['cpu_seconds']['median']:>10.3f}{summary['items']:>10}"
+            f"{(f'{per_second:.0f}' if per_second is not None else '-'):>12}"
+        )
+
+
+def _echo_comparison(comparison):
+    click.echo(f"{'stage':<26}{'baseline s':>12}{'current s':>12}{'ratio':>8}")
+    for entry in comparison:
+        ratio = f"{entry['ratio']:.2f}" if entry["ratio"] is not None else "-"
+        flag = "  REGRESSED" if entry["regressed"] else ""
+        click.echo(
+            f"{entry['stage']:<26}{entry['baseline_seconds']:>12.3f}{entry['current_seconds']:>12.3f}{ratio:>8}{flag}"
+        )
+
+
+def _load_results(path: Path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as exc:
+        raise click.ClickException(f"Could not read benchmark results from {path}: {exc}") from exc
+
+
+@click.group()
+def main():
+    pass
+
+
+@main.command()
+@click.argument('output_dir', type=click.Path(file_okay=False, dir_okay=True, path_type=Path))
+@dataset_options
+def generate(output_dir, rows, columns, fan_out, path_arrays, splits, seed):
+    """Write a synthetic input directory (CSVs and mapping files) to OUTPUT_DIR"""
+    config = DatasetConfig(rows=rows, columns=columns, fan_out=fan_out, path_arrays=path_arrays, splits=splits, seed=seed)
+    written = generate_dataset(output_dir, config)
+    for filename, count in written.items():
+        click.echo(f"  {filename}: {count} rows")
+    click.echo(f"Synthetic dataset written to {output_dir}")
+
+
+@main.command()
+@click.option('--data-dir', type=click.Path(exists=True, file_okay=False, dir_okay=True, path_type=Path), default=None, help='Benchmark an existing input directory instead of generating a synthetic one')
+@dataset_options
+@click.option('--repeat', type=click.IntRange(min=1), default=3, show_default=True, help='Times to run the whole pipeline; medians are reported')
+@click.option('--trace-memory', is_flag=True, default=False, help='Also record peak memory per stage (tracemalloc; slows every stage down)')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, path_type=Path), default=Path('benchmark.json'), show_default=True, help='Where to write the results JSON')
+@click.option('--compare', 'baseline', type=click.Path(exists=True, dir_okay=False, path_type=Path), default=None, help='Results JSON of an earlier run to compare against; exits with status 1 if a stage regressed')
+@click.option('--max-regression', type=click.FloatRange(min=0), default=DEFAULT_MAX_REGRESSION, show_default=True, help='Slowdown of a stage\'s median time (0.2 = 20%) that counts as a regression')
+def run(data_dir, rows, columns, fan_out, path_arrays, splits, seed, repeat, trace_memory, output, baseline, max_regression):
+    """Time every stage of the transform pipeline and write the results as JSON"""
+    baseline_results = _load_results(baseline) if baseline is not None else None
+
+    try:
+        if data_dir is not None:
+            results = run_benchmark(data_dir, repeat=repeat, trace_memory=trace_memory)
+        else:
+            config = DatasetConfig(
+                rows=rows, columns=columns, fan_out=fan_out, path_arrays=path_arrays, splits=splits, seed=seed
+            )
+            with tempfile.TemporaryDirectory(prefix="hsds-synthetic-") as synthetic_dir:
+                row_counts = generate_dataset(synthetic_dir, config)
+                results = run_benchmark(
+                    synthetic_dir,
+                    repeat=repeat,
+                    trace_memory=trace_memory,
+                    dataset={"synthetic": config.as_dict(), "rows": row_counts},
+                )
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    _echo_results(results)
+    click.echo(f"Results written to {output}")
+
+    if baseline_results is not None:
+        comparison = compare_results(baseline_results, results, max_regression=max_regression)
+        _echo_comparison(comparison)
+        if any(entry["regressed"] for entry in comparison):
+            raise SystemExit(1)
+
+
+@main.command()
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--max-regression', type=click.FloatRange(min=0), default=DEFAULT_MAX_REGRESSION, show_default=True, help='Slowdown of a stage\'s median time (0.2 = 20%) that counts as a regression')
+def compare(baseline, current, max_regression):
+    """Compare two results files; exits with status 1 if a stage of CURRENT regressed against BASELINE"""
+    comparison = compare_results(_load_results(baseline), _load_results(current), max_regression=max_regression)
+    if not comparison:
+        raise click.ClickException("The results files have no stages in common")
+    _echo_comparison(comparison)
+    if any(entry["regressed"] for entry in comparison):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
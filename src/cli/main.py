@@ -1,9 +1,13 @@
+import json
+from contextlib import nullcontext
 from pathlib import Path
 
-from ..lib.transform.outputs import save_objects_to_json
-from ..lib.transform.collections import build_collections, searching_and_assigning
+from ..lib.transform.outputs import OUTPUT_FORMATS, save_objects
+from ..lib.transform.incremental import ObjectChanges, default_state_dir, save_objects_incremental
+from ..lib.transform.collections import build_collections, searching_and_assigning, searching_and_assigning_incremental
 from ..lib.transform.json_collections import build_collections_from_json
 from ..lib.transform.logger import transformer_log
+from ..lib.transform.profiling import profile_transform
 from ..lib.transform.custom_transform.transforms_loader import load_transforms_registry_if_available
 import click
 import sys
@@ -13,17 +17,29 @@ import sys
 @click.option('--output-dir', '-o', default='output', help='Output directory for JSON files')
 @click.option('--generate-ids', default=None, help='Generate new IDs using the provided organization name/id')
 @click.option('--input-format', '-f', type=click.Choice(['csv', 'json'], case_sensitive=False), default='csv', help='Input data format (csv or json)')
+@click.option('--output-format', type=click.Choice(OUTPUT_FORMATS, case_sensitive=False), default='files', show_default=True, help='Output layout: one JSON file per object (files), one NDJSON file per object type (ndjson), or a single JSON bundle (bundle)')
 @click.option(
     '--transforms',
     type=click.Path(exists=False, dir_okay=False, file_okay=True, path_type=Path),
     default=None,
     help='Path to a Python module defining custom transforms (optional; omitted or missing file runs without them)',
 )
+@click.option('--stream', is_flag=True, default=False, help='Map CSV rows as they are read instead of loading each input file into memory first')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=1, show_default=True, help='Number of worker processes used to map input/mapping file pairs in parallel')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=None, help='Split each input file into chunks of this many rows so one large file is mapped across all workers')
+@click.option('--incremental', is_flag=True, default=False, help='Only map rows that changed since the last incremental run and only rewrite changed output files (csv input)')
+@click.option('--state-dir', type=click.Path(file_okay=False, dir_okay=True, path_type=Path), default=None, help='Where --incremental keeps row fingerprints and the output manifest (default: .<output-dir>.hsds-state next to the output directory)')
+@click.option('--metrics', 'print_metrics', is_flag=True, default=False, help='Print time, memory and row/object counts per stage and per input file after the log')
+@click.option('--metrics-json', type=click.Path(dir_okay=False, path_type=Path), default=None, help='Write the same metrics as JSON to this file')
+@click.option('--trace-memory', is_flag=True, default=False, help='Also measure peak Python memory per stage and input file (tracemalloc; slows the run down)')
+@click.option('--profile', 'print_profile', is_flag=True, default=False, help='Print time spent per mapping node, relation and custom transform, most expensive first (maps in this process, ignoring --workers)')
+@click.option('--profile-json', type=click.Path(dir_okay=False, path_type=Path), default=None, help='Write the full profile as JSON to this file (implies profiling)')
 
-def main(data_dictionary, output_dir, generate_ids, transforms, input_format):
+def main(data_dictionary, output_dir, generate_ids, transforms, input_format, output_format, stream, workers, chunk_size, incremental, state_dir, print_metrics, metrics_json, trace_memory, print_profile, profile_json):
     try:
         # Clear any previous log entries from prior runs
         transformer_log.clear()
+        transformer_log.trace_memory = trace_memory
 
         transforms_registry = load_transforms_registry_if_available(transforms)
         if transforms is None:
@@ -37,27 +53,70 @@ def main(data_dictionary, output_dir, generate_ids, transforms, input_format):
                 f"Custom transforms: loaded from {transforms.resolve()}."
             )
 
-        # Build collections from the specified input format
-        if input_format == 'json':
-            results = build_collections_from_json(data_dictionary)
-        else:
-            results = build_collections(
-            data_dictionary,
-            custom_transforms_registry=transforms_registry,
-        )  # Builds collections
-        
-        results = searching_and_assigning(results, requestor_identifier=generate_ids) # Links and cleans up, passes transformer_id
+        if incremental:
+            if input_format == 'json':
+                raise ValueError("--incremental is only supported for csv input")
+            state_dir = state_dir or default_state_dir(output_dir)
+            transformer_log.log(f"Incremental state: {state_dir}")
+
+        profiling = print_profile or profile_json is not None
+        if profiling and workers > 1:
+            # Worker processes can't report into this process's profile
+            transformer_log.log("Profiling: mapping in this process, --workers is ignored.")
+            workers = 1
 
-        # Save individual JSON files
-        save_objects_to_json(results, output_dir)
+        changes = ObjectChanges() if incremental else None
+        with profile_transform() if profiling else nullcontext() as profile:
+            # Build collections from the specified input format
+            if input_format == 'json':
+                results = build_collections_from_json(data_dictionary, workers=workers)
+            else:
+                results = build_collections(
+                data_dictionary,
+                custom_transforms_registry=transforms_registry,
+                streaming=stream,
+                workers=workers,
+                chunk_size=chunk_size,
+                state_dir=state_dir if incremental else None,
+                changes=changes,
+            )  # Builds collections
+
+            if incremental:
+                # Only objects affected by changed rows are linked again
+                results = searching_and_assigning_incremental(results, state_dir, changes, requestor_identifier=generate_ids)
+            else:
+                results = searching_and_assigning(results, requestor_identifier=generate_ids) # Links and cleans up, passes transformer_id
 
         # Log output summary
         transformer_log.section("Output")
+
+        # Save JSON files in the requested layout
+        with transformer_log.stage("save_objects"):
+            if incremental:
+                counts = save_objects_incremental(results, output_dir, state_dir, output_format=output_format.lower())
+                transformer_log.log(
+                    f"Files written: {counts['written']}, unchanged: {counts['unchanged']}, removed: {counts['removed']}"
+                )
+            else:
+                save_objects(results, output_dir, output_format=output_format.lower())
+
         transformer_log.log(f"JSON files saved to: {output_dir}")
 
         # Print the log instead of results
         click.echo(transformer_log.get_log())
 
+        if print_metrics:
+            click.echo(transformer_log.format_metrics())
+        if metrics_json is not None:
+            with open(metrics_json, "w", encoding="utf-8") as f:
+                json.dump(transformer_log.get_metrics(), f, indent=2)
+
+        if print_profile:
+            click.echo(profile.format_report())
+        if profile_json is not None:
+            with open(profile_json, "w", encoding="utf-8") as f:
+                json.dump(profile.get_report(), f, indent=2)
+
     except ValueError as e:
         click.echo(f"Error: {str(e)}", err=True)
         sys.exit(1)
@@ -1,15 +1,23 @@
 from pathlib import Path
 import click
-from ..lib.reverse_transform.reverse_transform import process_mappings, get_entity_objects, ingest_json_directory
+from ..lib.reverse_transform.reverse_transform import (
+    build_entity_index,
+    get_entity_objects,
+    get_entity_type,
+    ingest_json_directory,
+    process_mappings,
+)
 from ..lib.reverse_transform.buildcsv import reverseTransform
+from ..lib.reverse_transform.parallel import parallel_reverse_transform
+from ..lib.reverse_transform.streaming import stream_reverse_transform
 
 def _ensure_non_empty_dir(path: Path, label: str) -> None:
     if not any(path.iterdir()):
         raise click.ClickException(f"{label} directory '{path}' is empty.")
 
 
-def _find_files(path: Path, pattern: str, label: str) -> list[Path]:
-    files = list(path.glob(pattern))
+def _find_files(path: Path, pattern: str, label: str, *patterns: str) -> list[Path]:
+    files = [file for glob_pattern in (pattern, *patterns) for file in path.glob(glob_pattern)]
     if not files:
         raise click.ClickException(f"No {label} files found in '{path}'.")
     return files
@@ -37,7 +45,24 @@ def _find_files(path: Path, pattern: str, label: str) -> list[Path]:
     show_default=True,
     help="Output directory for reversed CSV files.",
 )
-def main(mapping_dir: str, hsds_dir: str, output_dir: str) -> None:
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    help="Read HSDS objects one at a time (JSON files and <type>.ndjson files) and write rows as they are read, "
+    "so memory use stays bounded. A top-level object is only matched to the type in its own filename "
+    "(<type>_<id>.json), not to every file carrying its id as the default mode does.",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of worker processes reading the HSDS files. More than one requires --stream: the files (not the "
+    "mappings) are split across the workers and their CSV parts are merged in directory order.",
+)
+def main(mapping_dir: str, hsds_dir: str, output_dir: str, stream: bool, workers: int) -> None:
     mapping_path = Path(mapping_dir)
     hsds_path = Path(hsds_dir)
     output_path = Path(output_dir)
@@ -45,8 +70,15 @@ def main(mapping_dir: str, hsds_dir: str, output_dir: str) -> None:
     _ensure_non_empty_dir(mapping_path, "Mapping")
     _ensure_non_empty_dir(hsds_path, "HSDS")
 
+    if workers > 1 and not stream:
+        # Workers read objects the way --stream does, which matches top-level objects differently, so it isn't implied
+        raise click.UsageError("--workers greater than 1 requires --stream.")
+
     csv_files = _find_files(mapping_path, "*.csv", "CSV")
-    json_files = _find_files(hsds_path, "*.json", "JSON")
+    if stream:
+        json_files = _find_files(hsds_path, "*.json", "JSON or NDJSON", "*.ndjson")
+    else:
+        json_files = _find_files(hsds_path, "*.json", "JSON")
 
     click.echo(
         f"Found {len(csv_files)} mapping CSV file(s) and {len(json_files)} HSDS JSON file(s)."
@@ -54,11 +86,29 @@ def main(mapping_dir: str, hsds_dir: str, output_dir: str) -> None:
     click.echo(f"Output directory: {output_dir}")
 
     mapping_data = process_mappings(mapping_path)
+
+    if stream:
+        output_path.mkdir(parents=True, exist_ok=True)
+        for spec in mapping_data:
+            if get_entity_type(spec) is None:
+                click.echo(f"  Skipping {spec.source_file.name}: unrecognized mapping filename format.")
+        if workers > 1:
+            written = parallel_reverse_transform(mapping_data, hsds_path, output_path, workers)
+        else:
+            written = stream_reverse_transform(mapping_data, hsds_path, output_path)
+        for _, output_file, rows in written:
+            click.echo(f"  Wrote {output_file.name} ({rows} row(s)).")
+        click.echo(f"Done. {len(mapping_data)} CSV file(s) written to '{output_path}'.")
+        return
+
     all_objects = ingest_json_directory(hsds_path)
+    # One pass over the objects serves every mapping spec
+    entity_types = {get_entity_type(spec) for spec in mapping_data} - {None}
+    entity_index = build_entity_index(all_objects, hsds_path, entity_types)
 
     output_path.mkdir(parents=True, exist_ok=True)
     for spec in mapping_data:
-        dict_list = get_entity_objects(spec, all_objects, hsds_path)
+        dict_list = get_entity_objects(spec, all_objects, hsds_path, index=entity_index)
         if dict_list is None:
             click.echo(f"  Skipping {spec.source_file.name}: unrecognized mapping filename format.")
             continue
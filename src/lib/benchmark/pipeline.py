@@ -0,0 +1,234 @@
+"""
+PIPELINE: times each stage of a transform over an input directory and compares results between runs.
+
+Stages, in pipeline order:
+    parse                    read input CSVs and mapping files (parse_input_csv_rows, parse_nested_mapping)
+    nested_map               map rows to HSDS objects (map_rows, same output as nested_map per row)
+    searching_and_assigning  link children into their parents
+    generate_ids             replace ids with UUIDs (what --generate-ids does)
+    save_objects_to_json     write one JSON file per top-level object
+
+"items" counts input rows for parse, mapped objects for nested_map and searching_and_assigning, and top-level
+(linked) objects for the last two stages. Every repetition runs all stages from scratch. Results are plain JSON (see run_benchmark) so a run on one commit can
+be compared with a run on another with compare_results.
+"""
+
+import gc
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..transform.collections import find_csv_pairs, generate_ids, map_rows, searching_and_assigning
+from ..transform.compiler import build_filter_spec
+from ..transform.logger import transformer_log
+from ..transform.outputs import save_objects_to_json
+from ..transform.parser import parse_input_csv_rows, parse_nested_mapping, validate_mapping_against_parsed_data
+
+RESULTS_FORMAT_VERSION = 1
+DEFAULT_MAX_REGRESSION = 0.2
+BENCHMARK_REQUESTOR = "benchmark"
+
+STAGES = ("parse", "nested_map", "searching_and_assigning", "generate_ids", "save_objects_to_json")
+
+
+def _time_stage(fn: Callable[[], Tuple[Any, int]], trace_memory: bool) -> Tuple[Any, Dict[str, Any]]:
+    """Runs fn, which returns (result, number of items processed), and measures it"""
+    gc.collect() # Garbage left by the previous stage shouldn't be collected on this stage's clock
+    if trace_memory:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        result, items = fn()
+        metrics = {
+            "wall_seconds": time.perf_counter() - wall_start,
+            "cpu_seconds": time.process_time() - cpu_start,
+            "items": items,
+        }
+        if trace_memory:
+            metrics["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return result, metrics
+
+
+def _count_objects(collections) -> int:
+    return sum(len(objects) for _, objects in collections)
+
+
+def run_pipeline_once(data_dir: Path, output_dir: Path, trace_memory: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Runs every stage once over data_dir, writing output to output_dir. Returns {stage: metrics}"""
+    transformer_log.clear()
+    pairs = find_csv_pairs(data_dir)
+    if not pairs:
+        raise ValueError(f"No input/mapping pairs (*_mapping.csv) found in '{data_dir}'.")
+    metrics = {}
+
+    def parse():
+        parsed = []
+        for object_type, input_file, mapping_file, input_name in pairs:
+            rows = parse_input_csv_rows(input_file, input_name)
+            mapping, filter_spec = parse_nested_mapping(mapping_file, input_name)
+            if not rows or not mapping:
+                continue
+            validate_mapping_against_parsed_data(mapping, rows, input_name, mapping_file.name)
+            parsed.append((object_type, rows, mapping, build_filter_spec(filter_spec, input_name)))
+        return parsed, sum(len(rows) for _, rows, _, _ in parsed)
+
+    parsed, metrics["parse"] = _time_stage(parse, trace_memory)
+
+    def map_all():
+        collections = [
+            (object_type, map_rows(rows, mapping, filter_spec)) for object_type, rows, mapping, filter_spec in parsed
+        ]
+        return collections, _count_objects(collections)
+
+    collections, metrics["nested_map"] = _time_stage(map_all, trace_memory)
+    parsed = None # Releases the parsed rows before linking
+
+    mapped_objects = _count_objects(collections)
+
+    def link():
+        linked = searching_and_assigning(collections)
+        return linked, mapped_objects
+
+    linked, metrics["searching_and_assigning"] = _time_stage(link, trace_memory)
+    metrics["searching_and_assigning"]["objects_linked"] = mapped_objects - _count_objects(linked)
+
+    def assign_ids():
+        for _, objects in linked:
+            generate_ids(objects, BENCHMARK_REQUESTOR)
+        return None, _count_objects(linked)
+
+    _, metrics["generate_ids"] = _time_stage(assign_ids, trace_memory)
+
+    def save():
+        save_objects_to_json(linked, str(output_dir))
+        return None, _count_objects(linked)
+
+    _, metrics["save_objects_to_json"] = _time_stage(save, trace_memory)
+    transformer_log.clear()
+    return metrics
+
+
+def _summarize(values: List[float]) -> Dict[str, float]:
+    return {"min": min(values), "median": statistics.median(values), "max": max(values)}
+
+
+def summarize_runs(runs: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Per stage min/median/max of wall and CPU time over all runs, plus throughput at the median wall time"""
+    stages = {}
+    for stage in STAGES:
+        stage_runs = [run[stage] for run in runs]
+        wall = _summarize([m["wall_seconds"] for m in stage_runs])
+        summary = {
+            "wall_seconds": wall,
+            "cpu_seconds": _summarize([m["cpu_seconds"] for m in stage_runs]),
+            "items": stage_runs[-1]["items"],
+            "items_per_second": stage_runs[-1]["items"] / wall["median"] if wall["median"] > 0 else None,
+        }
+        if "peak_memory_bytes" in stage_runs[-1]:
+            summary["peak_memory_bytes"] = max(m["peak_memory_bytes"] for m in stage_runs)
+        if "objects_linked" in stage_runs[-1]:
+            summary["objects_linked"] = stage_runs[-1]["objects_linked"]
+        stages[stage] = summary
+    return stages
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if completed.returncode != 0:
+        return None
+    return completed.stdout.strip() or None
+
+
+def run_benchmark(
+    data_dir,
+    repeat: int = 3,
+    trace_memory: bool = False,
+    dataset: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs the pipeline repeat times over data_dir and returns the results as a JSON-serializable dict:
+        {"format_version", "created_at", "commit", "python", "platform", "dataset", "repeat",
+         "stages": {stage: {"wall_seconds": {"min", "median", "max"}, "cpu_seconds": {...}, "items",
+                            "items_per_second", ["peak_memory_bytes"], ["objects_linked"]}},
+         "runs": [{stage: metrics of one run}, ...]}
+    dataset describes the input (e.g. the generator settings) and is stored as-is
+    """
+    if repeat < 1:
+        raise ValueError("repeat must be at least 1")
+    data_dir = Path(data_dir)
+
+    runs = []
+    output_root = Path(tempfile.mkdtemp(prefix="hsds-benchmark-"))
+    try:
+        for n in range(repeat):
+            runs.append(run_pipeline_once(data_dir, output_root / str(n), trace_memory=trace_memory))
+            shutil.rmtree(output_root / str(n), ignore_errors=True)
+    finally:
+        shutil.rmtree(output_root, ignore_errors=True)
+
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {"path": str(data_dir), **(dataset or {})},
+        "repeat": repeat,
+        "stages": summarize_runs(runs),
+        "runs": runs,
+    }
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    max_regression: float = DEFAULT_MAX_REGRESSION,
+) -> List[Dict[str, Any]]:
+    """
+    Compares the median wall time of every stage (and the total) between two results
+    A stage regressed if it is more than max_regression (0.2 = 20%) slower than the baseline
+    """
+    comparison = []
+    totals = [0.0, 0.0]
+    for stage in STAGES:
+        if stage not in baseline.get("stages", {}) or stage not in current.get("stages", {}):
+            continue
+        before = baseline["stages"][stage]["wall_seconds"]["median"]
+        after = current["stages"][stage]["wall_seconds"]["median"]
+        totals[0] += before
+        totals[1] += after
+        comparison.append(_compare_entry(stage, before, after, max_regression))
+    if comparison:
+        comparison.append(_compare_entry("total", totals[0], totals[1], max_regression))
+    return comparison
+
+
+def _compare_entry(stage: str, before: float, after: float, max_regression: float) -> Dict[str, Any]:
+    ratio = after / before if before > 0 else None
+    return {
+        "stage": stage,
+        "baseline_seconds": before,
+        "current_seconds": after,
+        "ratio": ratio,
+        "regressed": ratio is not None and ratio > 1 + max_regression,
+    }
@@ -0,0 +1,176 @@
+"""
+SYNTHETIC: generates HSDS-shaped input CSVs and mapping files at a configurable scale for benchmarking.
+
+A generated directory looks like a real export and is transformed like one:
+    organizations.csv   one row per organization
+    locations.csv       one location per organization (organization_id)
+    services.csv        fan_out services per organization (organization_id)
+    phones.csv          fan_out phones per service (service_id)
+plus one "<input>_<type>_mapping.csv" per input. Organizations and phones each have a semicolon path array
+`path_arrays` columns wide (phones[].number from Phone1;Phone2;..., languages[].name from Language1;...), every input
+has `splits` comma-split fields (attributes[].value, tags2[], ...) and is padded with mapped filler columns up to
+`columns` columns.
+"""
+
+import csv
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List
+
+MAPPING_HEADER = ["path", "input_files_field", "split", "strip", "transform"]
+
+WORDS = [
+    "community", "health", "food", "housing", "legal", "youth", "senior", "family", "care", "support",
+    "center", "services", "network", "alliance", "outreach", "clinic", "pantry", "shelter", "counsel", "aid",
+]
+LANGUAGES = ["en", "es", "fr", "vi", "zh", "ar", "ru", "ko"]
+STATUSES = ["active", "inactive", "defunct"]
+
+
+@dataclass
+class DatasetConfig:
+    rows: int = 1000  # Organizations; services and phones scale with fan_out
+    columns: int = 12  # Columns per input file, padded with filler columns
+    fan_out: int = 3  # Children per parent for each *_id relation
+    path_arrays: int = 2  # Width of each semicolon path array (Phone1;Phone2;...)
+    splits: int = 1  # Split fields per input file
+    seed: int = 0
+
+    def validate(self) -> None:
+        for name in ("rows", "columns", "fan_out", "path_arrays"):
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name} must be at least 1")
+        if self.splits < 0:
+            raise ValueError("splits must not be negative")
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class _InputSpec:
+    """Columns, values and mapping rows of one generated input file."""
+
+    def __init__(self, input_name: str, object_type: str):
+        self.input_name = input_name
+        self.object_type = object_type
+        self.columns: List[str] = []
+        self.mapping_rows: List[List[str]] = []
+        self.generators = []
+
+    def add(self, column: str, generator, path: str = None, split: str = "") -> None:
+        self.columns.append(column)
+        self.generators.append(generator)
+        if path is not None:
+            self.mapping_rows.append([path, column, split, "", ""])
+
+    def add_path_array(self, path: str, prefix: str, width: int, generator) -> None:
+        columns = [f"{prefix}{i}" for i in range(1, width + 1)]
+        for column in columns:
+            self.columns.append(column)
+            self.generators.append(generator)
+        self.mapping_rows.append([path, ";".join(columns), "", "", ""])
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _build_specs(config: DatasetConfig) -> List[_InputSpec]:
+    organizations = _InputSpec("organizations", "organization")
+    organizations.add("ID", lambda rng, i, parent: f"org-{i}", "id")
+    organizations.add("Name", lambda rng, i, parent: _words(rng, 3).title(), "name")
+    organizations.add("Description", lambda rng, i, parent: f"<p>{_words(rng, 12)}</p>", "description")
+    organizations.add("Email", lambda rng, i, parent: f"info{i}@example.org", "email")
+    organizations.add_path_array(
+        "phones[].number", "Phone", config.path_arrays, lambda rng, i, parent: f"555-{rng.randrange(10000):04d}"
+    )
+
+    locations = _InputSpec("locations", "location")
+    locations.add("ID", lambda rng, i, parent: f"loc-{i}", "id")
+    locations.add("OrgID", lambda rng, i, parent: f"org-{parent}", "organization_id")
+    locations.add("Name", lambda rng, i, parent: f"{_words(rng, 2).title()} Site", "name")
+    locations.add("Latitude", lambda rng, i, parent: f"{rng.uniform(25, 49):.5f}", "latitude")
+    locations.add("Longitude", lambda rng, i, parent: f"{rng.uniform(-124, -67):.5f}", "longitude")
+
+    services = _InputSpec("services", "service")
+    services.add("ID", lambda rng, i, parent: f"svc-{i}", "id")
+    services.add("OrgID", lambda rng, i, parent: f"org-{parent}", "organization_id")
+    services.add("Name", lambda rng, i, parent: _words(rng, 2).title(), "name")
+    services.add("Status", lambda rng, i, parent: rng.choice(STATUSES), "status")
+    services.add("Description", lambda rng, i, parent: _words(rng, 20), "description")
+
+    phones = _InputSpec("phones", "phone")
+    phones.add("ID", lambda rng, i, parent: f"phone-{i}", "id")
+    phones.add("ServiceID", lambda rng, i, parent: f"svc-{parent}", "service_id")
+    phones.add("Number", lambda rng, i, parent: f"555-{rng.randrange(10000):04d}", "number")
+    phones.add_path_array(
+        "languages[].name", "Language", config.path_arrays, lambda rng, i, parent: rng.choice(LANGUAGES)
+    )
+
+    specs = [organizations, locations, services, phones]
+    for spec in specs:
+        for n in range(1, config.splits + 1):
+            spec.add(
+                f"Tags{n}",
+                lambda rng, i, parent: ",".join(rng.sample(WORDS, rng.randint(1, 4))),
+                "attributes[].value" if n == 1 else f"tags{n}[]",
+                split=",",
+            )
+        # Filler columns make up the requested width; they are mapped too so mapping cost scales with columns
+        filler = 1
+        while len(spec.columns) < config.columns:
+            spec.add(
+                f"Extra{filler}",
+                lambda rng, i, parent: rng.choice(["", "Y", "N", _words(rng, 2)]),
+                f"extra_{filler}",
+            )
+            filler += 1
+    return specs
+
+
+def _write_input(path: Path, spec: _InputSpec, rows: int, fan_out: int, rng: random.Random) -> int:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(spec.columns)
+        for i in range(rows):
+            parent = i // fan_out
+            writer.writerow([generator(rng, i, parent) for generator in spec.generators])
+    return rows
+
+
+def _write_mapping(path: Path, spec: _InputSpec) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(MAPPING_HEADER)
+        writer.writerow(["", "", "", "", ""]) # No filter
+        writer.writerows(spec.mapping_rows)
+
+
+def generate_dataset(output_dir, config: DatasetConfig = None) -> Dict[str, int]:
+    """
+    Writes a synthetic input directory (inputs and mapping files) to output_dir
+    Returns {input file name: number of rows}
+    """
+    config = config or DatasetConfig()
+    config.validate()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(config.seed)
+
+    row_counts = {
+        "organizations": config.rows,
+        "locations": config.rows,
+        "services": config.rows * config.fan_out,
+        "phones": config.rows * config.fan_out * config.fan_out,
+    }
+    fan_outs = {"organizations": 1, "locations": 1, "services": config.fan_out, "phones": config.fan_out}
+
+    written = {}
+    for spec in _build_specs(config):
+        input_file = output_dir / f"{spec.input_name}.csv"
+        written[input_file.name] = _write_input(
+            input_file, spec, row_counts[spec.input_name], fan_outs[spec.input_name], rng
+        )
+        _write_mapping(output_dir / f"{spec.input_name}_{spec.object_type}_mapping.csv", spec)
+    return written
@@ -0,0 +1,19 @@
+"""
+CONFIG: settings read from environment variables, shared by the transform library and the API.
+"""
+
+import os
+
+
+def read_int_env(env_var: str, default: int) -> int:
+    """
+    Returns env_var as an integer, or default if it is unset or empty
+    Raises RuntimeError if it is set to anything else, so a misconfigured setting stops the process at startup
+    """
+    value = os.getenv(env_var)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise RuntimeError(f"{env_var} must be an integer, got {value!r}") from None
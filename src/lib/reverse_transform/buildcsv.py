@@ -1,5 +1,5 @@
 import csv
-from .reverse_transform import get_path_value
+from .paths import RowExtractor
 
 
 def reverseTransform(dictList, pathsTuple, csvPath):
@@ -11,16 +11,12 @@ def reverseTransform(dictList, pathsTuple, csvPath):
         fields = [field[1] for field in pathsTuple]
         writer.writerow(fields)
 
-        for element in dictList:
-            dataFields = []
-            for field in pathsTuple:
-                try:
-                    entry = get_path_value(element, field[0])
-                    if len(entry) == 1:
-                        dataFields.append(entry[0])
-                    else:
-                        dataFields.append((",".join(map(str, entry))) if entry else "")
-                except (KeyError, ValueError):
-                    dataFields.append("")
+        # Paths are compiled once and evaluated together for every dictionary
+        buildRow = rowBuilder(pathsTuple)
+        writer.writerows(buildRow(element) for element in dictList)
 
-            writer.writerow(dataFields)
+
+def rowBuilder(pathsTuple):
+    '''Returns a function giving the CSV row of one dictionary: the value at each path, multiple values
+    joined with commas, and an empty string where the path can't be followed.'''
+    return RowExtractor([field[0] for field in pathsTuple]).row
@@ -0,0 +1,107 @@
+"""
+PARALLEL: reverse transform whose HSDS files are read by several worker processes.
+
+The directory's files are cut into one contiguous shard per worker (in directory order). Each worker reads its own
+files, as the streaming reverse transform does, and writes every spec's rows to part files: one of top-level rows and
+one of embedded rows with their ids. No HSDS objects are sent between processes, only the top-level ids written.
+
+Once all shards are done, each CSV is its header, the top-level parts in shard order, then the embedded rows of every
+shard (in shard order) whose id wasn't already written. The CSVs are therefore the same as stream_reverse_transform
+writes, whatever order the workers finish in. A single .ndjson file is one unit of work, so it isn't split.
+"""
+
+import csv
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Set, Tuple
+
+from ..transform.parallel import map_in_processes
+from .reverse_transform import CsvMapping
+from .streaming import SpecWriter, append_nested_rows, iter_hsds_objects, spec_outputs, write_objects
+
+
+def split_files(filenames: List[str], shards: int) -> List[List[str]]:
+    """Splits filenames into at most shards contiguous, nearly equal runs (always at least one)"""
+    shards = max(1, min(shards, len(filenames)))
+    size, extra = divmod(len(filenames), shards)
+    runs = []
+    start = 0
+    for shard in range(shards):
+        stop = start + size + (shard < extra)
+        runs.append(filenames[start:stop])
+        start = stop
+    return runs
+
+
+def part_paths(part_dir: Path, shard: int, output: int) -> Tuple[Path, Path]:
+    """Top-level and embedded part files of one output CSV in one shard"""
+    return part_dir / f"{shard}_{output}.csv", part_dir / f"{shard}_{output}.nested.csv"
+
+
+def write_shard(
+    outputs: List[Tuple[CsvMapping, str]],
+    hsds_path: Path,
+    filenames: List[str],
+    part_dir: Path,
+    shard: int,
+) -> List[Tuple[int, Set[str]]]:
+    """
+    Writes the part files of every (spec, entity type) in outputs for the objects of filenames.
+    Returns (top-level rows written, their ids as spilled) per output.
+    """
+    writers: List[Tuple[SpecWriter, str]] = []
+    try:
+        for output, (spec, entity_type) in enumerate(outputs):
+            top_level_part, nested_part = part_paths(part_dir, shard, output)
+            writers.append((SpecWriter(spec, top_level_part, nested_path=nested_part, header=False), entity_type))
+        write_objects(iter_hsds_objects(hsds_path, filenames), writers)
+    finally:
+        for writer, _ in writers:
+            writer.close()
+    return [(writer.rows, writer.top_level_ids) for writer, _ in writers]
+
+
+def parallel_reverse_transform(
+    specs: List[CsvMapping],
+    hsds_path: Path,
+    output_path: Path,
+    workers: int,
+) -> List[Tuple[CsvMapping, Path, int]]:
+    """
+    Writes "<spec name>.csv" to output_path for every spec with a recognized mapping filename, reading the HSDS
+    directory's files in up to workers processes. Returns (spec, output file, rows written) per CSV, like
+    stream_reverse_transform.
+    """
+    outputs = spec_outputs(specs, output_path)
+    filenames = [filename for filename in os.listdir(hsds_path) if filename.endswith(('.json', '.ndjson'))]
+    shards = split_files(filenames, workers)
+
+    written = []
+    part_dir = Path(tempfile.mkdtemp(prefix="reverse_parts_", dir=output_path))
+    try:
+        jobs = [(list(outputs.values()), hsds_path, shard_files, part_dir, shard)
+                for shard, shard_files in enumerate(shards)]
+        shard_results = map_in_processes(write_shard, jobs, workers=workers)
+
+        for output, (output_file, (spec, _)) in enumerate(outputs.items()):
+            rows = 0
+            seen = set()
+            with open(output_file, "w", newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow([field[1] for field in spec.fields])
+                for shard, results in enumerate(shard_results):
+                    top_level_rows, top_level_ids = results[output]
+                    rows += top_level_rows
+                    seen |= top_level_ids
+                    with open(part_paths(part_dir, shard, output)[0], newline='') as part:
+                        shutil.copyfileobj(part, csvfile)
+                for shard in range(len(shards)):
+                    with open(part_paths(part_dir, shard, output)[1], newline='', encoding='utf-8') as part:
+                        rows += append_nested_rows(writer, part, seen)
+            written.append((spec, output_file, rows))
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+    return written
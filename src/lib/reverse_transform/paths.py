@@ -0,0 +1,131 @@
+"""
+PATHS: compiles reverse-mapping paths ("id", "program.name", "locations[].phones[].number") once, so they aren't
+re-split and re-walked for every object.
+
+compile_path(path) returns a PathExtractor with the same results and errors as get_path_value.
+RowExtractor evaluates a whole mapping's paths in one traversal per object. The paths form a trie on their segments,
+so a shared prefix such as locations[].phones[] is walked once for all the fields below it.
+"""
+
+from functools import lru_cache
+from typing import Any, List, Sequence, Tuple
+
+# Marks fields whose path could not be followed; written as an empty cell
+_MISSING = object()
+
+
+def parse_path(path: str) -> Tuple[Tuple[str, bool], ...]:
+    """Splits a path into (key, is list) segments: "locations[].name" -> (("locations", True), ("name", False))"""
+    return tuple((p[:-2], True) if p[-2:] == "[]" else (p, False) for p in path.split('.'))
+
+
+class PathExtractor:
+    """One compiled path; calling it with an object returns the tuple get_path_value would."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.segments = parse_path(path)
+
+    def __call__(self, hsds_directory: Any) -> tuple:
+        curr = [hsds_directory]
+        for key, is_list in self.segments:
+            temp = []
+            for c in curr:
+                try:
+                    temp.append(c[key])
+                except KeyError as ke:
+                    raise ValueError(f"Could not find path \"{key}\" in item {c}.") from ke
+            if is_list:
+                flattened = []
+                for t in temp:
+                    if not isinstance(t, list):
+                        raise ValueError(f"Poorly formatted input. Expected all {key} in "
+                            f"{self.path} to be in a list, but found one in a non-list "
+                            f"in {curr} \n---") from None
+                    flattened += t
+                temp = flattened
+            curr = temp
+        return tuple(curr)
+
+
+@lru_cache(maxsize=1024)
+def compile_path(path: str) -> PathExtractor:
+    """Returns the (cached) compiled form of path"""
+    return PathExtractor(path)
+
+
+def _flatten_lists(values: list):
+    """Concatenates values, or returns None if one of them isn't a list"""
+    flattened = []
+    for value in values:
+        if not isinstance(value, list):
+            return None
+        flattened += value
+    return flattened
+
+
+class _PathNode:
+    """A path segment shared by every field below it"""
+
+    __slots__ = ("key", "is_list", "children", "fields")
+
+    def __init__(self, key: str = "", is_list: bool = False):
+        self.key = key
+        self.is_list = is_list
+        self.children: List["_PathNode"] = []
+        self.fields: List[int] = [] # Indexes of the fields whose path ends here
+
+
+class RowExtractor:
+    """
+    The values of several paths for one object, walking each shared prefix once.
+    row() returns what get_path_value gives for each path, formatted as reverseTransform writes it:
+    a single value as is, several joined with commas, and "" where the path can't be followed.
+    """
+
+    def __init__(self, paths: Sequence[str]):
+        self.width = len(paths)
+        self.root = _PathNode()
+        for index, path in enumerate(paths):
+            node = self.root
+            for key, is_list in parse_path(path):
+                for child in node.children:
+                    if child.key == key and child.is_list == is_list:
+                        node = child
+                        break
+                else:
+                    child = _PathNode(key, is_list)
+                    node.children.append(child)
+                    node = child
+            node.fields.append(index)
+
+    def _evaluate(self, node: _PathNode, curr: list, out: list) -> None:
+        for child in node.children:
+            key = child.key
+            try:
+                temp = [c[key] for c in curr]
+            except KeyError:
+                continue # Every field below child stays missing
+            if child.is_list:
+                temp = _flatten_lists(temp)
+                if temp is None:
+                    continue
+            if child.fields:
+                values = tuple(temp)
+                for index in child.fields:
+                    out[index] = values
+            if child.children:
+                self._evaluate(child, temp, out)
+
+    def row(self, obj: Any) -> List[Any]:
+        out = [_MISSING] * self.width
+        self._evaluate(self.root, [obj], out)
+        row = []
+        for entry in out:
+            if entry is _MISSING:
+                row.append("")
+            elif len(entry) == 1:
+                row.append(entry[0])
+            else:
+                row.append((",".join(map(str, entry))) if entry else "")
+        return row
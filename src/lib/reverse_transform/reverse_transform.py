@@ -4,6 +4,7 @@ import json
 from pathlib import Path
 from dataclasses import dataclass
 from .parser import parse_input_csv
+from .paths import compile_path
 
 
 def ingest_json_directory(directory_path: str) -> list[dict]:
@@ -51,35 +52,7 @@ def get_path_value(hsds_directory: dict, path: str) -> tuple:
             there is not a list, but a singular object, this error will be
             thrown.
     """
-    path_string = path
-
-    path = path.split('.')
-
-    curr = []
-    curr.append(hsds_directory)
-    for p in path:
-        p_is_list = False
-        temp = []
-        if p[-2:] == "[]":
-            p = p[:-2]
-            p_is_list = True
-        for c in curr:
-            try:
-                temp.append(c[p])
-            except KeyError as ke:
-                raise ValueError(f"Could not find path \"{p}\" in item {c}.") from ke
-        if p_is_list:
-            temp2 = []
-            for t in temp:
-                if not isinstance(t, list):
-                    raise ValueError(f"Poorly formatted input. Expected all {p} in "
-                        f"{path_string} to be in a list, but found one in a non-list "
-                        f"in {curr} \n---") from None
-                temp2 += t
-            temp = temp2
-        curr = temp
-
-    return tuple(curr)
+    return compile_path(path)(hsds_directory)
 
 
 @dataclass
@@ -108,54 +81,144 @@ def process_mappings(mapping_dir: Path):
     return mappingData
 
 
-def get_entity_objects(spec: CsvMapping, all_objects: list[dict], hsds_path: Path) -> list[dict] | None:
+def get_entity_type(spec: CsvMapping) -> str | None:
     """
-    Returns the list of dicts relevant to this mapping's entity type, drawn from all_objects.
-    Returns None if the mapping filename doesn't match the expected format.
+    Returns the entity type named by a mapping filename ("<input>_<type>_mapping.csv"),
+    or None if the filename doesn't match that format.
     """
     match = re.match(r".+_([A-Za-z0-9]+)_mapping\.csv", spec.source_file.name)
-    if not match:
-        return None
+    return match.group(1) if match else None
 
-    entity_type = match.group(1)
 
-    entity_ids = {
-        f.stem.split('_', 1)[1]
-        for f in hsds_path.glob(f"{entity_type}_*.json")
-    }
+def nested_list_key(entity_type: str) -> str:
+    """Key under which entities of this type are embedded in their parents, e.g. phone -> phones."""
+    if entity_type.endswith(("s", "sh", "ch", "x", "z")):
+        return entity_type + "es"
+    return entity_type + "s"
 
 
-    from_files = [d for d in all_objects if d.get('id') in entity_ids]
+@dataclass
+class EntityIndex:
+    """
+    Every object an entity type's mapping spec reads, gathered in one pass over the ingested objects.
+
+    Attributes:
+        objects:   Top-level objects, in ingestion order.
+        positions: String id -> positions in objects of the top-level objects with that id.
+        file_ids:  Filename prefix -> ids taken from "<prefix>_<id>.json" filenames, for every
+                   underscore a filename could be split at (so "service_at_location_1.json" is listed
+                   under "service" as well, just as the glob "service_*.json" matches it).
+        nested:    Nested list key (e.g. "phones") -> items of every such list, in traversal order.
+    """
+    objects: list[dict]
+    positions: dict
+    file_ids: dict[str, set[str]]
+    nested: dict[str, list]
+
+    def covers(self, entity_type: str) -> bool:
+        """Whether the index was built for entity_type (see build_entity_index)."""
+        return nested_list_key(entity_type) in self.nested
+
+    def entity_objects(self, entity_type: str) -> list[dict]:
+        """
+        Top-level objects whose id has a file named after entity_type, then embedded objects
+        of that type whose id (if any) wasn't already included.
+        """
+        matched_positions = []
+        for entity_id in self.file_ids.get(entity_type, ()):
+            matched_positions.extend(self.positions.get(entity_id, ()))
+        from_files = [self.objects[position] for position in sorted(matched_positions)]
+
+        seen_ids = {d['id'] for d in from_files if 'id' in d}
+
+        for item in self.nested.get(nested_list_key(entity_type), ()):
+            item_id = item.get('id')
+            if item_id is None or item_id not in seen_ids:
+                from_files.append(item)
+                if item_id is not None:
+                    seen_ids.add(item_id)
+
+        return from_files
+
+
+def walk_nested_lists(obj, keys, visit) -> None:
+    """
+    Calls visit(key, items) for every list found under one of keys, anywhere inside obj.
+    A dict's own lists are visited before anything nested in its values (depth first), which
+    is the order get_entity_objects lists embedded objects in.
+    Objects come from json.load, so containers are plain dicts and lists.
+    """
+    if type(obj) is dict:
+        children = []
+        for key, value in obj.items():
+            kind = type(value)
+            if kind is list:
+                if key in keys:
+                    visit(key, value)
+                children.append(value)
+            elif kind is dict:
+                children.append(value)
+        for child in children:
+            walk_nested_lists(child, keys, visit)
+    elif type(obj) is list:
+        for item in obj:
+            if type(item) in (dict, list):
+                walk_nested_lists(item, keys, visit)
+
+
+def build_entity_index(all_objects: list[dict], hsds_path: Path, entity_types) -> EntityIndex:
+    """
+    Indexes all_objects for the given entity types with a single walk over every object,
+    instead of one walk (and one directory glob) per mapping spec.
 
-    if entity_type.endswith(("s", "sh", "ch", "x", "z")):
-        nested_key = entity_type + "es"
-    else:
-        nested_key = entity_type + "s"
-
-    nested = []
-    # searches through nested entries
-    def collect_nested(obj):
-        if isinstance(obj, dict):
-            if nested_key in obj and isinstance(obj[nested_key], list):
-                nested.extend(obj[nested_key])
-            for v in obj.values():
-                if isinstance(v, (dict, list)):
-                    collect_nested(v)
-        elif isinstance(obj, list):
-            for item in obj:
-                collect_nested(item)
+    Args:
+        all_objects:  Objects read by ingest_json_directory.
+        hsds_path:    Directory the objects were read from; its filenames name each object's type.
+        entity_types: Entity types that will be looked up (see get_entity_type).
 
+    Returns:
+        EntityIndex serving get_entity_objects for every one of entity_types.
+    """
+    # Ids taken from filenames are strings, so only string ids can match one
+    positions = {}
+    for position, obj in enumerate(all_objects):
+        obj_id = obj.get('id')
+        if isinstance(obj_id, str):
+            positions.setdefault(obj_id, []).append(position)
+
+    file_ids = {}
+    for filename in os.listdir(hsds_path):
+        if not filename.endswith('.json'):
+            continue
+        stem = filename[:-len('.json')]
+        split_at = stem.find('_')
+        while split_at != -1:
+            file_ids.setdefault(stem[:split_at], set()).add(stem[split_at + 1:])
+            split_at = stem.find('_', split_at + 1)
+
+    nested = {nested_list_key(entity_type): [] for entity_type in entity_types}
     for parent in all_objects:
-        collect_nested(parent)
+        walk_nested_lists(parent, nested, lambda key, items: nested[key].extend(items))
 
-    seen_ids = {d['id'] for d in from_files if 'id' in d}
+    return EntityIndex(objects=all_objects, positions=positions, file_ids=file_ids, nested=nested)
 
-    for item in nested:
-        item_id = item.get('id')
-        if item_id is None or item_id not in seen_ids:
-            from_files.append(item)
-            if item_id is not None:
-                seen_ids.add(item_id)
 
+def get_entity_objects(
+    spec: CsvMapping,
+    all_objects: list[dict],
+    hsds_path: Path,
+    index: EntityIndex | None = None,
+) -> list[dict] | None:
+    """
+    Returns the list of dicts relevant to this mapping's entity type, drawn from all_objects.
+    Returns None if the mapping filename doesn't match the expected format.
+    Pass an index from build_entity_index (built for every spec's type) when handling several specs,
+    so the objects aren't walked again for each one.
+    """
+    entity_type = get_entity_type(spec)
+    if entity_type is None:
+        return None
 
-    return from_files
+    if index is None or not index.covers(entity_type):
+        index = build_entity_index(all_objects, hsds_path, [entity_type])
+    return index.entity_objects(entity_type)
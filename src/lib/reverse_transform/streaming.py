@@ -0,0 +1,178 @@
+"""
+STREAMING: reverse transform that reads HSDS objects one at a time and appends CSV rows as it goes, so memory use
+doesn't grow with the size of the HSDS export.
+
+Objects are read from every "<type>_<id>.json" file in the HSDS directory and from every line of "<type>.ndjson"
+files (as written by the transformer's --output-format ndjson). A top-level object is routed to the mapping specs of
+its type (from its filename) and its embedded lists (e.g. "phones") to the specs of the embedded type.
+
+The CSVs hold the same rows as the in-memory reverse transform (get_entity_objects): top-level objects first, in
+directory order, then embedded objects whose id wasn't already written. Embedded rows are spilled to a temporary
+file until every top-level id is known. Only those ids are kept in memory. Unlike get_entity_objects, a top-level
+object is only matched to its own file's type, not to any file whose name carries the same id.
+"""
+
+import csv
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .buildcsv import rowBuilder
+from .reverse_transform import CsvMapping, get_entity_type, nested_list_key, walk_nested_lists
+
+
+def file_entity_type(stem: str, obj: Any) -> str | None:
+    """Type of the object in "<type>_<id>.json", where id is the object's own id, or None."""
+    obj_id = obj.get('id') if type(obj) is dict else None
+    if not isinstance(obj_id, str):
+        return None
+    suffix = f"_{obj_id}"
+    if stem.endswith(suffix) and len(stem) > len(suffix):
+        return stem[:-len(suffix)]
+    return None
+
+
+def iter_hsds_objects(hsds_path: Path, filenames: Optional[Iterable[str]] = None) -> Iterator[Tuple[str | None, Any]]:
+    """
+    Yields (entity type or None, object) for every object in an HSDS directory, one file or line at a time.
+    Only the given filenames are read if any are passed (in that order), otherwise the whole directory.
+    """
+    for filename in os.listdir(hsds_path) if filenames is None else filenames:
+        filepath = os.path.join(hsds_path, filename)
+        if filename.endswith('.json'):
+            with open(filepath, 'r', encoding='utf-8') as f:
+                obj = json.load(f)
+            yield file_entity_type(filename[:-len('.json')], obj), obj
+        elif filename.endswith('.ndjson'):
+            entity_type = filename[:-len('.ndjson')]
+            with open(filepath, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield entity_type, json.loads(line)
+
+
+def _id_key(item_id: Any) -> str:
+    """Id as written to the spill file; json keeps e.g. 1 and "1" apart, "" stands for no id"""
+    return "" if item_id is None else json.dumps(item_id)
+
+
+def append_nested_rows(writer, nested_file, seen: set) -> int:
+    """
+    Writes the spilled embedded rows of nested_file whose id isn't in seen, adding their ids to it.
+    Returns the number of rows written.
+    """
+    rows = 0
+    for id_key, *row in csv.reader(nested_file):
+        if not id_key or id_key not in seen:
+            writer.writerow(row)
+            rows += 1
+            if id_key:
+                seen.add(id_key)
+    return rows
+
+
+class SpecWriter:
+    """
+    Open CSV of one mapping spec, plus the spill file of its embedded rows.
+    The spill file is temporary unless nested_path is given (see parallel.py, which also leaves out the header).
+    """
+
+    def __init__(self, spec: CsvMapping, output_file: Path, nested_path: Optional[Path] = None, header: bool = True):
+        self.spec = spec
+        self.output_file = output_file
+        self.rows = 0
+        self.build_row = rowBuilder(spec.fields)
+        self.top_level_ids = set()
+        self.file = open(output_file, "w", newline='')
+        self.writer = csv.writer(self.file)
+        if header:
+            self.writer.writerow([field[1] for field in spec.fields])
+        if nested_path is None:
+            self.nested_file = tempfile.TemporaryFile("w+", newline='', encoding='utf-8')
+        else:
+            self.nested_file = open(nested_path, "w+", newline='', encoding='utf-8')
+        self.nested_writer = csv.writer(self.nested_file)
+
+    def write_top_level(self, obj: Dict[str, Any]) -> None:
+        self.writer.writerow(self.build_row(obj))
+        self.rows += 1
+        if 'id' in obj:
+            self.top_level_ids.add(_id_key(obj['id']))
+
+    def write_nested(self, item: Dict[str, Any]) -> None:
+        self.nested_writer.writerow([_id_key(item.get('id')), *self.build_row(item)])
+
+    def finish(self) -> None:
+        """Appends the embedded rows whose id wasn't written yet and closes the files"""
+        try:
+            self.nested_file.seek(0)
+            self.rows += append_nested_rows(self.writer, self.nested_file, self.top_level_ids)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.nested_file.close()
+        self.file.close()
+
+
+def spec_outputs(specs: List[CsvMapping], output_path: Path) -> Dict[Path, Tuple[CsvMapping, str]]:
+    """
+    Output file -> (spec, entity type) for every spec with a recognized mapping filename.
+    Specs writing the same file replace earlier ones, as in the in-memory reverse transform.
+    """
+    outputs = {}
+    for spec in specs:
+        entity_type = get_entity_type(spec)
+        if entity_type is not None:
+            outputs[output_path / f"{spec.name}.csv"] = (spec, entity_type)
+    return outputs
+
+
+def write_objects(objects: Iterable[Tuple[str | None, Any]], writers: List[Tuple[SpecWriter, str]]) -> None:
+    """
+    Sends every (entity type, object) to the writers of its type, and the items of its embedded lists to the
+    writers of the embedded type. writers holds (writer, entity type) pairs.
+    """
+    by_type: Dict[str, List[SpecWriter]] = {}
+    by_nested_key: Dict[str, List[SpecWriter]] = {}
+    for writer, entity_type in writers:
+        by_type.setdefault(entity_type, []).append(writer)
+        by_nested_key.setdefault(nested_list_key(entity_type), []).append(writer)
+
+    def write_nested(key, items):
+        for item in items:
+            for writer in by_nested_key[key]:
+                writer.write_nested(item)
+
+    for entity_type, obj in objects:
+        for writer in by_type.get(entity_type, ()):
+            writer.write_top_level(obj)
+        walk_nested_lists(obj, by_nested_key, write_nested)
+
+
+def stream_reverse_transform(
+    specs: List[CsvMapping],
+    hsds_path: Path,
+    output_path: Path,
+) -> List[Tuple[CsvMapping, Path, int]]:
+    """
+    Writes "<spec name>.csv" to output_path for every spec with a recognized mapping filename,
+    reading the HSDS directory once. Returns (spec, output file, rows written) per CSV.
+    Specs writing the same file replace earlier ones, as in the in-memory reverse transform.
+    """
+    writers: List[Tuple[SpecWriter, str]] = []
+    try:
+        for output_file, (spec, entity_type) in spec_outputs(specs, output_path).items():
+            writers.append((SpecWriter(spec, output_file), entity_type))
+
+        write_objects(iter_hsds_objects(hsds_path), writers)
+
+        for writer, _ in writers:
+            writer.finish()
+    finally:
+        for writer, _ in writers:
+            writer.close()
+
+    return [(writer.spec, writer.output_file, writer.rows) for writer, _ in writers]
@@ -1,12 +1,54 @@
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
+from itertools import batched, chain
 import re
-from .parser import parse_input_csv, parse_nested_mapping, validate_mapping_against_parsed_data
-from .mapper import nested_map, get_process_order
-from .relationships import identify_parent_relationships
-from .logger import transformer_log
+import zipfile
+from time import perf_counter
+from .parser import (
+    InputPath,
+    as_input_path,
+    iter_input_csv,
+    iter_input_csv_records,
+    parse_input_csv_rows,
+    parse_nested_mapping,
+    read_csv_header,
+    validate_mapping_against_columns,
+    validate_mapping_against_parsed_data,
+)
+from .mapper import get_process_order
+from .compiler import build_filter_spec
+from .columnar import map_rows_columnar
+from .mapping_cache import get_mapping_cache
+from .incremental import (
+    LinkState,
+    ObjectChanges,
+    changed_object_ids,
+    changed_types,
+    embedded_members,
+    file_digest,
+    find_objects_to_relink,
+    key_type,
+    link_state_line,
+    load_link_state,
+    load_row_objects,
+    map_rows_incremental,
+    mapping_version,
+    parse_row_lines,
+    read_row_state,
+    remove_stale_row_states,
+    row_state_id,
+    rows_state_path,
+    save_link_state,
+    save_row_state,
+)
+from .parallel import imap_in_processes, map_in_processes
+from .relationships import identify_parent_relationships, parent_id_fields
+from .logger import call_measured, measure, timed_stage, transformer_log
+from .profiling import TransformProfile, get_transform_profile
 from .relations import HSDS_RELATIONS
 from .custom_transform.transforms_loader import TransformsRegistry
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Any, Optional
 from uuid import UUID, uuid5
 
 # TODO: Initialize UUID with a proper fixed value
@@ -15,21 +57,45 @@ NAMESPACE = UUID("{12345678-1234-5678-1234-567812345678}")
 # Global counter for hsds-object ID generation
 _id_counter = 0
 
+# Objects searching_and_assigning goes through between calls to its progress callback
+LINK_PROGRESS_INTERVAL = 1000
 
+
+@timed_stage("build_collections")
 def build_collections(
-    data_directory: str,
+    data_directory: InputPath,
     custom_transforms_registry: Optional[TransformsRegistry] = None,
+    streaming: bool = False,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    state_dir: Optional[str] = None,
+    changes: Optional[ObjectChanges] = None,
+    progress: Optional[Callable[[int], None]] = None,
 ):
     """
     From multiple mapping and input CSV files, returns a list of tuples like: [("organization", [dicts]), ("location", [dicts]), ...]
     Each mapping file name MUST follow this format: "<input_file_name>_<object_type>_mapping.csv
     This function pairs each input CSV with its correspodning mapping file and converts flat CSV rows into nested dictionaries
+    With streaming=True, rows are mapped as they are read from each CSV instead of parsing the whole file first,
+    and the mapping is validated against the header row
+    With workers > 1, each input/mapping pair is mapped in its own worker process; results keep the serial order
+    With chunk_size set, every input is also split into chunks of that many rows so one large file is mapped across
+    all workers; output order and row indexes are the same as a serial run
+    data_directory may also be a zipfile.Path, in which case files are read straight from the archive; open archives
+    can't be sent to worker processes, so those are always mapped serially
+    With state_dir set, the run is incremental: rows already mapped by the previous run with the same mapping are
+    loaded from the row state kept there instead of being mapped again (see incremental.py); chunk_size is not used.
+    If changes is given, what changed since that run is recorded into it for searching_and_assigning_incremental
+    If progress is given, it is called with the number of objects mapped since its last call: after every batch of
+    rows when files are mapped in this process, otherwise once per file as its results come back
     """
     transformer_log.section("Build Collections")
     transformer_log.log(f"Input directory: {data_directory}")
     
-    data_directory = Path(data_directory) # Converts provided folder path into a Path object
-    
+    data_directory = as_input_path(data_directory) # Converts provided folder path into a Path object
+    if isinstance(data_directory, zipfile.Path):
+        workers = None
+
     if not any(data_directory.iterdir()):
         raise ValueError(f"Input directory '{data_directory}' is empty.")
 
@@ -45,6 +111,90 @@ def build_collections(
         else:
             raise ValueError(f"No mapping files (*_mapping.csv) found in '{data_directory}'.")
 
+    pairs = find_csv_pairs(data_directory, mapping_files)
+
+    # Pairs are independent until linking, so they can be mapped in parallel; the registry is re-loaded in each worker
+    # Every pair is measured where it is mapped (possibly a worker process) and comes back as (result, metrics)
+    call = partial(call_measured, trace_memory=transformer_log.trace_memory)
+    remapped_counts = None
+    if state_dir is not None:
+        state_files = [rows_state_path(state_dir, mapping_file) for _, _, mapping_file, _ in pairs]
+        incremental_results = map_in_processes(
+            call,
+            [
+                (map_input_csv_incremental, input_file, mapping_file, input_name, state_file, custom_transforms_registry)
+                for (_, input_file, mapping_file, input_name), state_file in zip(pairs, state_files)
+            ],
+            workers=workers,
+        )
+        remove_stale_row_states(state_dir, state_files)
+        measured = [(result and result[0], metrics) for result, metrics in incremental_results]
+        remapped_counts = [result and result[1] for result, _ in incremental_results]
+        if changes is not None:
+            for (object_type, _, mapping_file, _), (result, _) in zip(pairs, incremental_results):
+                # A skipped pair has no row state, so its type is linked again as a whole
+                changes.record(mapping_file.name, object_type, *(result[2] if result else (None, None, None)))
+    elif chunk_size:
+        measured = map_pairs_in_chunks(pairs, custom_transforms_registry, streaming, workers, chunk_size)
+    else:
+        # A callback can't be sent to worker processes, so batches are only reported while mapping in this one
+        if workers is None or workers <= 1:
+            batch_progress, progress = progress, None
+        else:
+            batch_progress = None
+        measured = map_in_processes(
+            call,
+            [
+                (map_input_csv, input_file, mapping_file, input_name, custom_transforms_registry, streaming, batch_progress)
+                for _, input_file, mapping_file, input_name in pairs
+            ],
+            workers=workers,
+        )
+
+    for (object_type, input_file, mapping_file, _), (objects, metrics) in zip(pairs, measured):
+        transformer_log.record_file(
+            mapping_file.name,
+            input_file=input_file.name,
+            object_type=object_type,
+            objects=len(objects) if objects is not None else 0,
+            skipped=objects is None,
+            **metrics,
+        )
+
+        # Skipped pairs (empty input or mapping) come back as None
+        if objects is None:
+            continue
+
+        results.append((object_type, objects)) # Adds tuple of object type and list of dictionaries. For example: ("organization", [{x}, {y}, ...])
+        transformer_log.log(f"  {object_type}: {len(objects)} object(s) from {input_file.name}")
+        if progress is not None:
+            progress(len(objects))
+
+    if remapped_counts is not None:
+        transformer_log.log(f"Rows mapped (new or changed since the last run): {sum(filter(None, remapped_counts))}")
+
+    # Summary of build_collections
+    total_objects = sum(len(objs) for _, objs in results)
+    transformer_log.log(f"Total collections built: {len(results)}")
+    transformer_log.log(f"Total objects created: {total_objects}")
+    
+    return results
+
+
+def find_csv_pairs(
+    data_directory: InputPath,
+    mapping_files: Optional[List[InputPath]] = None,
+) -> List[Tuple[str, InputPath, InputPath, str]]:
+    """
+    Pairs every "<input_file_name>_<object_type>_mapping.csv" in data_directory with its input CSV
+    Returns tuples like ("organization", input_file, mapping_file, input_name); mappings without an input are skipped
+    """
+    data_directory = as_input_path(data_directory)
+    if mapping_files is None:
+        mapping_files = list(data_directory.glob("*_mapping.csv"))
+
+    pairs = [] # List of tuples like ("organization", input_file, mapping_file, input_name)
+
     # Goes through every CSV file in the folder that ends with "_mapping.csv"
     for mapping_file in mapping_files:
         match = re.match(r"(.+)_([A-Za-z0-9]+)_mapping\.csv", mapping_file.name) # Parses and extracts name before "_mapping" using regex
@@ -64,21 +214,143 @@ def build_collections(
         # Skips this mapping if the matching input CSV doesn't exist
         if not input_file.exists():
             continue
-        
+
+        pairs.append((object_type, input_file, mapping_file, input_name))
+
+    return pairs
+
+
+def map_input_csv(
+    input_file: InputPath,
+    mapping_file: InputPath,
+    input_name: str,
+    custom_transforms_registry: Optional[TransformsRegistry] = None,
+    streaming: bool = False,
+    progress: Optional[Callable[[int], None]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Maps every row of one input CSV with its mapping file and returns the list of mapped dictionaries
+    Returns None if the input or mapping file is empty and should be skipped
+    Runs on its own (e.g. in a worker process started by build_collections)
+    If stats is given, row counts are added to it (see map_rows and load_input_csv); progress is passed to map_rows
+    """
+    loaded = load_input_csv(input_file, mapping_file, input_name, streaming=streaming, stats=stats)
+    if loaded is None:
+        return None
+
+    input_rows, mapping, filter_spec = loaded
+    return map_rows(input_rows, mapping, filter_spec, custom_transforms_registry, stats=stats, progress=progress)
+
+
+def map_input_csv_incremental(
+    input_file: InputPath,
+    mapping_file: InputPath,
+    input_name: str,
+    state_file: Path,
+    custom_transforms_registry: Optional[TransformsRegistry] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Optional[Tuple[List[Dict[str, Any]], int, Tuple[Optional[str], str, Optional[set]]]]:
+    """
+    Incremental counterpart to map_input_csv: if neither the input nor its mapping changed since the previous run,
+    the objects are loaded from state_file without mapping anything. Otherwise only records that aren't in
+    state_file are mapped (rows are always streamed), then state_file is replaced with this run's records
+    Returns (mapped dictionaries, number of rows actually mapped, (row state found, row state written, ids of the
+    changed objects or None if the whole type changed)), or None if the pair is skipped
+    """
+    input_file = as_input_path(input_file)
+    version = mapping_version(mapping_file, read_csv_header(input_file), custom_transforms_registry)
+    input_digest = file_digest(input_file)
+    header, lines = read_row_state(state_file)
+    previous_state = row_state_id(header)
+    state = row_state_id({"version": version, "input": input_digest})
+
+    if previous_state == state:
+        objects = load_row_objects(lines)
+        if stats is not None:
+            stats["rows"] = stats.get("rows", 0) + len(lines)
+            stats["filtered_rows"] = stats.get("filtered_rows", 0) + len(lines) - len(objects)
+            stats["reused_rows"] = stats.get("reused_rows", 0) + len(lines)
+        return objects, 0, (previous_state, state, set())
+
+    loaded = load_input_csv(input_file, mapping_file, input_name, stats=stats, records=True)
+    if loaded is None:
+        return None
+
+    input_records, mapping, filter_spec = loaded
+    # Stored records are only reused for the same mapping version; otherwise every row is mapped again
+    previous_rows = parse_row_lines(lines) if header.get("version") == version else None
+    objects, rows, remapped = map_rows_incremental(
+        input_records,
+        mapping,
+        filter_spec,
+        dict(previous_rows or ()),
+        custom_transforms_registry,
+        stats=stats,
+    )
+    save_row_state(state_file, {"version": version, "input": input_digest}, rows)
+    changed_ids = changed_object_ids(previous_rows, rows) if previous_rows is not None else None
+    return objects, remapped, (previous_state, state, changed_ids)
+
+
+def load_input_csv(
+    input_file: InputPath,
+    mapping_file: InputPath,
+    input_name: str,
+    streaming: bool = False,
+    stats: Optional[Dict[str, Any]] = None,
+    records: bool = False,
+) -> Optional[Tuple[Iterable[Dict[str, Any]], Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """
+    Reads an input CSV and its mapping file and validates the mapping against the input columns
+    Returns (input_rows, mapping, filter_spec) where filter_spec is the glom path-based filter for the mapping,
+    or None if the input or mapping file is empty and should be skipped
+    With records=True, input_rows yields (raw record, row) pairs instead (see iter_input_csv_records) and is
+    always streamed
+    If stats is given and the mapping file is skipped, the input's rows are counted in its "skipped_rows"
+    """
+    input_file = as_input_path(input_file)
+    mapping_file = as_input_path(mapping_file)
+    streaming = streaming or records
+
+    if streaming:
+        # Lazily yields rows like {"organizations": {"id": "1", "name": "Blueprint"}}, peeking at the first one
+        # so empty files are still skipped
+        if records:
+            input_rows = iter_input_csv_records(input_file, input_name)
+        else:
+            input_rows = iter_input_csv(input_file, input_name)
+        first_row = next(input_rows, None)
+        if first_row is None:
+            print(f"Warning: Input file '{input_file.name}' is empty or has no valid rows. Skipping.")
+            return None
+        input_rows = chain([first_row], input_rows)
+    else:
         # Parses through input CSV rows and returns something like [{"organizations": {"id": "1", "name": "Blueprint"}}, ...]
-        input_rows = parse_input_csv(str(input_file), input_name)
-        
+        input_rows = parse_input_csv_rows(input_file, input_name)
+
         if not input_rows:
             print(f"Warning: Input file '{input_file.name}' is empty or has no valid rows. Skipping.")
-            continue
+            return None
 
-        # Parses the mapping file into a nested structure and optional filter
-        mapping, filter_spec = parse_nested_mapping(str(mapping_file), input_name)
+    # Parses the mapping file into a nested structure and optional filter, reusing the result for a mapping
+    # file with the same content
+    mapping, filter_spec = get_mapping_cache().get_or_parse(mapping_file, input_name, parse_nested_mapping, "csv")
 
-        if not mapping:
-            print(f"Warning: Mapping file '{mapping_file.name}' is empty or invalid. Skipping.")
-            continue
+    if not mapping:
+        print(f"Warning: Mapping file '{mapping_file.name}' is empty or invalid. Skipping.")
+        if stats is not None:
+            stats["skipped_rows"] = stats.get("skipped_rows", 0) + sum(1 for _ in input_rows)
+        return None
 
+    if streaming:
+        validate_mapping_against_columns(
+            mapping_spec=mapping,
+            columns=read_csv_header(input_file),
+            filename=input_name,
+            mapping_file=mapping_file.name,
+        )
+    else:
         validate_mapping_against_parsed_data(
             mapping_spec=mapping,
             input_rows=input_rows,
@@ -86,36 +358,92 @@ def build_collections(
             mapping_file=mapping_file.name,
         )
 
-        objects = [] # Converted object list
-
-        # Build a glom path-based filter for nested_map, if it was provided
-        nested_map_filter = None
-        if filter_spec is not None:
-            column_name = filter_spec.get("column")
-            match_value = filter_spec.get("value")
-            if column_name and match_value is not None:
-                nested_map_filter = {"path": f"{input_name}.{column_name}", "value": match_value}
-
-        for row_index, row in enumerate(input_rows):
-            mapped_dictionary = nested_map(
-                row,
-                mapping,
-                filter_spec=nested_map_filter,
-                transreg=custom_transforms_registry,
-                row_index=row_index,
-            )
-            if mapped_dictionary is not None:
-                objects.append(mapped_dictionary)
+    return input_rows, mapping, build_filter_spec(filter_spec, input_name)
 
-        results.append((object_type, objects)) # Adds tuple of object type and list of dictionaries. For example: ("organization", [{x}, {y}, ...])
-        transformer_log.log(f"  {object_type}: {len(objects)} object(s) from {input_file.name}")
 
-    # Summary of build_collections
-    total_objects = sum(len(objs) for _, objs in results)
-    transformer_log.log(f"Total collections built: {len(results)}")
-    transformer_log.log(f"Total objects created: {total_objects}")
-    
-    return results
+def map_rows(
+    input_rows: Iterable[Dict[str, Any]],
+    mapping: Dict[str, Any],
+    filter_spec: Optional[Dict[str, Any]] = None,
+    custom_transforms_registry: Optional[TransformsRegistry] = None,
+    start_index: int = 0,
+    stats: Optional[Dict[str, Any]] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Maps rows with a nested mapping and its glom path-based filter, returning the mapped dictionaries
+    Row indexes (used in CustomTransformError) count from start_index, so a chunk of a larger file reports
+    the same row_index as a serial run over the whole file
+    If stats is given, the rows read and dropped by the filter are added to its "rows" and "filtered_rows"
+    If progress is given, it is called with the number of objects mapped from every batch of rows as they are mapped
+    """
+    # Compile the mapping (and its filter, if provided) once for every row, reusing the plan of an earlier file or
+    # chunk with the same mapping
+    plan = get_mapping_cache().get_or_compile(mapping, filter_spec, custom_transforms_registry)
+
+    # Simple fields are mapped a column at a time over batches of rows; the output is the same as plan.apply per row
+    return map_rows_columnar(plan, input_rows, start_index=start_index, stats=stats, progress=progress)
+
+
+def map_pairs_in_chunks(
+    pairs: List[Tuple[str, Path, Path, str]],
+    custom_transforms_registry: Optional[TransformsRegistry],
+    streaming: bool,
+    workers: Optional[int],
+    chunk_size: int,
+) -> List[Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]]:
+    """
+    Splits every input file into chunks of chunk_size rows and maps all chunks in one process pool,
+    so a single very large input can use every worker
+    Inputs are read and validated here. Chunks are read only as workers free up (see imap_in_processes), so with
+    streaming=True no input is ever held whole; chunk results are stitched back together in row order
+    Returns one (list of mapped dictionaries or None for skipped pairs, metrics) per pair, like
+    call_measured(map_input_csv, ...); times are summed over reading the input and mapping its chunks
+    """
+    trace_memory = transformer_log.trace_memory
+    mapped: List[Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]] = []
+    chunk_pairs = [] # Index in mapped of every chunk handed out, in job order
+
+    def iter_chunk_jobs():
+        for _, input_file, mapping_file, input_name in pairs:
+            stats: Dict[str, Any] = {}
+            with measure(trace_memory, process_peak=False) as metrics:
+                loaded = load_input_csv(input_file, mapping_file, input_name, streaming=streaming, stats=stats)
+            metrics = {**stats, **metrics}
+            mapped.append((None if loaded is None else [], metrics))
+            if loaded is None:
+                continue
+
+            input_rows, mapping, filter_spec = loaded
+            chunks = batched(input_rows, chunk_size)
+            start_index = 0
+            while True:
+                # Reading (and, streamed, parsing) the input counts towards the file's times
+                with measure(trace_memory, process_peak=False) as read_metrics:
+                    chunk = next(chunks, None)
+                add_chunk_metrics(metrics, read_metrics)
+                if chunk is None:
+                    break
+                chunk_pairs.append(len(mapped) - 1)
+                yield (map_rows, chunk, mapping, filter_spec, custom_transforms_registry, start_index)
+                start_index += len(chunk)
+
+    for job, (chunk_objects, chunk_metrics) in enumerate(
+        imap_in_processes(partial(call_measured, trace_memory=trace_memory), iter_chunk_jobs(), workers=workers)
+    ):
+        objects, metrics = mapped[chunk_pairs[job]]
+        objects.extend(chunk_objects)
+        add_chunk_metrics(metrics, chunk_metrics)
+    return mapped
+
+
+def add_chunk_metrics(metrics: Dict[str, Any], chunk_metrics: Dict[str, Any]) -> None:
+    """Adds the metrics of one chunk to its file's: counts and times are summed, memory peaks take the maximum"""
+    for name, value in chunk_metrics.items():
+        if name == "peak_memory_bytes":
+            metrics[name] = max(metrics.get(name, 0), value)
+        else:
+            metrics[name] = metrics.get(name, 0) + value
 
 
 SINGULAR_CHILD_CASES = { # (target_collection, original_type)
@@ -126,6 +454,72 @@ SINGULAR_CHILD_CASES = { # (target_collection, original_type)
     ("taxonomy_term", "taxonomy_detail"),
 }
 
+# Legacy parent_id fields dropped once linking is done
+LEGACY_ID_FIELDS = frozenset(f"{name}_id" for name in HSDS_RELATIONS)
+
+
+def plural_key(entity_type: str) -> str:
+    """Key of a list of entity_type objects, using english plural ending rules: phone -> phones, address -> addresses"""
+    if entity_type.endswith(("s", "sh", "ch", "x", "z")):
+        return f"{entity_type}es"
+    return f"{entity_type}s"
+
+
+@dataclass(frozen=True)
+class ParentLink:
+    """
+    How an object is embedded into a matching target, resolved once per (object type, target type)
+    mode "list"     -> appended to the first of keys already holding a list on the target, otherwise to keys[-1]
+    mode "singular" -> stored under keys[0] on the target
+    mode "parent"   -> the target is stored under keys[0] on the object instead
+    mode None       -> not embedded
+    """
+    mode: Optional[str]
+    keys: Tuple[str, ...] = ()
+
+
+def resolve_parent_link(original_type: str, target_collection: str) -> ParentLink:
+    # Edge case where service_at_location has both service_id and location_id
+    if original_type == "service_at_location":
+        if target_collection == "service":
+            return ParentLink("list", ("service_at_locations",))
+        if target_collection == "location":
+            return ParentLink("parent", ("location",))
+        return ParentLink(None)
+
+    # SINGULAR EMBED CASE (HARD CODED)
+    if (target_collection, original_type) in SINGULAR_CHILD_CASES:
+        return ParentLink("singular", (original_type,))
+
+    # By default we link using a list
+    # First check if theres already a list under the singular key (e.g. "location")
+    # If not try the plural form (+s), which is created if neither exists
+    return ParentLink("list", (original_type, plural_key(original_type)))
+
+
+def build_parent_links(relations: Dict[str, List[str]] = HSDS_RELATIONS) -> Dict[Tuple[str, str], ParentLink]:
+    """
+    (object type, target type) -> ParentLink for every edge of relations, both ways round
+    (a service carries an organization_id although the DAG edge is organization -> service)
+    """
+    links = {}
+    for child, parents in relations.items():
+        for parent in parents:
+            links[(child, parent)] = resolve_parent_link(child, parent)
+            links[(parent, child)] = resolve_parent_link(parent, child)
+    return links
+
+
+PARENT_LINKS = build_parent_links()
+
+
+def get_parent_link(original_type: str, target_collection: str) -> ParentLink:
+    """ParentLink of the pair from PARENT_LINKS; pairs outside HSDS_RELATIONS are resolved on first use"""
+    link = PARENT_LINKS.get((original_type, target_collection))
+    if link is None:
+        link = PARENT_LINKS[(original_type, target_collection)] = resolve_parent_link(original_type, target_collection)
+    return link
+
 
 
 def find_in_collection(
@@ -153,6 +547,26 @@ def find_in_collection(
     return None
 
 
+def build_collection_index(
+    collection_map: Dict[str, List[Dict[str, Any]]],
+    id_field: str = "id",
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Builds a per-collection index of {collection_name: {id: dict}} so parents can be found with a hash lookup
+    instead of a linear scan of the collection
+    Mirrors find_in_collection: dicts with no (or a non-string) id are skipped, and the first dict with a given id wins
+    """
+    collection_index = {}
+    for collection_name, items in collection_map.items():
+        index = {}
+        for d in items or ():
+            target_id = d.get(id_field)
+            if isinstance(target_id, str) and target_id not in index:
+                index[target_id] = d
+        collection_index[collection_name] = index
+    return collection_index
+
+
 def append_to_list_field(
     target: Dict[str, Any],
     key: str,
@@ -176,6 +590,8 @@ def attach_original_to_targets(
     relations: List[Tuple[str, str]],
     *,
     id_field: str = "id",
+    collection_index: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None,
+    profile: Optional[TransformProfile] = None,
 ) -> List[Tuple[str, Dict[str, Any]]]:
     """
     Attaches "original" to matching targets in collection_map based on relations
@@ -185,6 +601,8 @@ def attach_original_to_targets(
     original -> dict (the dictionary to embed into matching targets)
     relations -> list[(str, str)] (tuples of (collection_name, id) to search for. If empty: skip)
     id_field -> str (field used as identifier)
+    collection_index -> dict[str, dict[str, dict]] (optional index from build_collection_index, used instead of scanning)
+    profile -> TransformProfile (optional; each relation's lookup and attach is timed into it)
 
     Looks through the specified collections for objects with the given IDs and attaches the original dictionary to them
     Most links are stored as lists, except for the special case where a service has one Organization
@@ -197,64 +615,52 @@ def attach_original_to_targets(
     if not relations:
         return embedded_objects
 
+    if profile is not None:
+        for relation in relations:
+            start = perf_counter()
+            attached = attach_original_to_targets(
+                collection_map, original_type, original, [relation],
+                id_field=id_field, collection_index=collection_index,
+            )
+            profile.record_relation(original_type, relation[0], bool(attached), perf_counter() - start)
+            embedded_objects.extend(attached)
+        return embedded_objects
+
     for target_collection, target_id in relations:
         # Skips empty/invalid ids
         if not target_id:
             continue
 
-        target = find_in_collection(
-            collection_map=collection_map,
-            collection_name=target_collection,
-            target_id=target_id,
-            id_field=id_field,
-        )
+        if collection_index is not None:
+            target = collection_index.get(target_collection, {}).get(target_id)
+        else:
+            target = find_in_collection(
+                collection_map=collection_map,
+                collection_name=target_collection,
+                target_id=target_id,
+                id_field=id_field,
+            )
         if target is None:
             # Skips if no corresponding dict
             continue
 
-        # Edge case where service_at_location has both service_id and location_id
-        if original_type == "service_at_location":
-            if target_collection == "service":
-                append_to_list_field(target, "service_at_locations", original)
-                embedded_objects.append(("service_at_location", original))
-            elif target_collection == "location":
-                original["location"] = target
-                embedded_objects.append(("location", target))
-            continue
-
-        # SINGULAR EMBED CASE (HARD CODED)
-        if (target_collection, original_type) in SINGULAR_CHILD_CASES:
-            target[original_type] = original
-            embedded_objects.append((original_type, original))
-            continue
-
-        # By default we link using a list
-        # First check if theres already a list under the singular key (e.g. "location")
-        # If not try the plural form (+s)
-        # If not, creates a new list
-        if original_type.endswith(("s", "sh", "ch", "x", "z")):
-            list_key_candidates = [original_type, f"{original_type}es"]
-        else:
-            list_key_candidates = [original_type, f"{original_type}s"]
-
-        appended = False
-        for candidate_key in list_key_candidates:
-            if isinstance(target.get(candidate_key), list):
-                append_to_list_field(target, candidate_key, original)
-                embedded_objects.append((original_type, original))
-                appended = True
-                break
-
-        if not appended:
-            plural_key = original_type # Adds base word
-            # Adds s or es based on english plural ending rules
-            if original_type.endswith(("s", "sh", "ch", "x", "z")):
-                plural_key += "es"
+        # The embed key and mode only depend on the two types, so they come from the precomputed table
+        link = get_parent_link(original_type, target_collection)
+        if link.mode == "list":
+            for key in link.keys[:-1]:
+                existing = target.get(key)
+                if isinstance(existing, list):
+                    existing.append(original)
+                    break
             else:
-                plural_key += "s"
-
-            append_to_list_field(target, plural_key, original)
+                append_to_list_field(target, link.keys[-1], original)
+            embedded_objects.append((original_type, original))
+        elif link.mode == "singular":
+            target[link.keys[0]] = original
             embedded_objects.append((original_type, original))
+        elif link.mode == "parent":
+            original[link.keys[0]] = target
+            embedded_objects.append((target_collection, target))
 
     return embedded_objects
 
@@ -317,26 +723,33 @@ def generate_ids(data: Any, requestor_identifier: Optional[str] = None, visited:
 
 # Remove legacy *_id fields from all objects after linking
 def remove_legacy_id_fields(obj):
-    if isinstance(obj, list):
-        for item in obj:
-            remove_legacy_id_fields(item)
-    elif isinstance(obj, dict):
-        keys_to_remove = []
-        for k in obj.keys():
-            if k.endswith("_id"):
-                base_name = k[:-3]
-                if base_name in HSDS_RELATIONS:
-                    keys_to_remove.append(k)
-        for k in keys_to_remove:
-            del obj[k]
-        for v in obj.values():
-            remove_legacy_id_fields(v)
-
-
+    """
+    Deletes every LEGACY_ID_FIELDS key from the dicts in obj, however deeply nested
+    Walks with a stack of the dicts and lists still to clean, so leaf values are never visited
+    """
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, list):
+            pending.extend([v for v in item if isinstance(v, (dict, list))])
+        elif isinstance(item, dict):
+            if not LEGACY_ID_FIELDS.isdisjoint(item):
+                for k in [k for k in item if k in LEGACY_ID_FIELDS]:
+                    del item[k]
+            pending.extend([v for v in item.values() if isinstance(v, (dict, list))])
+
+
+@timed_stage("searching_and_assigning")
 def searching_and_assigning(
     collections: List[Tuple[str, List[Dict[str, Any]]]],
     requestor_identifier: Optional[str] = None,
+    progress: Optional[Callable[[int], None]] = None,
 ) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Embeds every object into the parents its *_id fields point to and returns the collections left at the top level
+    If progress is given, it is called with the number of objects embedded since its last call, every
+    LINK_PROGRESS_INTERVAL objects and once more when linking is done
+    """
     transformer_log.section("Searching and Assigning")
     
     if not collections:
@@ -357,14 +770,22 @@ def searching_and_assigning(
     for name, objs in collections:
         transformer_log.log(f"  {name}: {len(objs)}")
 
+    # Index every collection by id once so parents are found by hash lookup. Linking only adds children to
+    # the indexed objects and never changes their ids, so the index stays valid for the whole pass
+    collection_index = build_collection_index(collection_map)
+    profile = get_transform_profile() # Relations are only timed while profiling
+
     # Correct order to process object types
     process_order = get_process_order(collections)
     transformer_log.log(f"Process order: {' -> '.join(process_order)}")
 
-    # Creates a list to track which objects should be deleted
+    # Tracks which objects should be deleted by identity (id(obj)), so bookkeeping never compares
+    # nested dicts by value. The objects stay alive in collection_map, so their ids can't be reused
     to_delete = {}
     for name, _ in collections:
-        to_delete[name] = [] # Each collection starts with a empty list
+        to_delete[name] = set() # Each collection starts with an empty set
+
+    linked = reported = 0
 
     # Iterates through each object type in the correct order
     for obj_type in process_order:
@@ -372,25 +793,35 @@ def searching_and_assigning(
         if not objects: # If no objects, skip to next
             continue
         
+        # parent_id fields of this collection, found once instead of testing every key of every object
+        id_fields = parent_id_fields(objects)
+
         # Loops through each object in collection
-        for original in list(objects):
-            relations = identify_parent_relationships(original) # Dynamically infers relations from *_id fields
+        for position, original in enumerate(list(objects), 1):
+            if progress is not None and position % LINK_PROGRESS_INTERVAL == 0:
+                progress(linked - reported)
+                reported = linked
+
+            relations = identify_parent_relationships(original, id_fields) # Dynamically infers relations from *_id fields
             if not relations: # If object has no relation, skip it
                 continue
 
-            embedded = attach_original_to_targets(collection_map, obj_type, original, relations)
+            embedded = attach_original_to_targets(
+                collection_map, obj_type, original, relations, collection_index=collection_index, profile=profile
+            )
 
             for embedded_type, embedded_obj in embedded:
-                if embedded_obj not in to_delete[embedded_type]:
-                    to_delete[embedded_type].append(embedded_obj)
+                ids_to_remove = to_delete[embedded_type]
+                if id(embedded_obj) not in ids_to_remove:
+                    ids_to_remove.add(id(embedded_obj))
+                    linked += 1
+
+    if progress is not None:
+        progress(linked - reported)
     
-    # Goes through each collection type and removes objs that were attached
-    for c_name, objs_to_remove in to_delete.items():
-        updated_objects = [] # New list exluding deleted items
-        for o in collection_map[c_name]:
-            if o not in objs_to_remove:
-                updated_objects.append(o)
-        collection_map[c_name] = updated_objects # Replaces old list with updated list
+    # Goes through each collection type once and removes objs that were attached
+    for c_name, ids_to_remove in to_delete.items():
+        collection_map[c_name] = [o for o in collection_map[c_name] if id(o) not in ids_to_remove]
 
     for name, objects in collection_map.items():
         remove_legacy_id_fields(objects)
@@ -414,8 +845,108 @@ def searching_and_assigning(
         total_remaining += len(objs)
     
     # Log how many were embedded
-    total_deleted = sum(len(objs) for objs in to_delete.values())
+    total_deleted = sum(len(ids) for ids in to_delete.values())
     transformer_log.log(f"Objects embedded into parents: {total_deleted}")
+    transformer_log.count("objects_linked", total_deleted)
     transformer_log.log(f"Total top-level objects remaining: {total_remaining}")
 
     return final_result
+
+
+@timed_stage("searching_and_assigning")
+def searching_and_assigning_incremental(
+    collections: List[Tuple[str, List[Dict[str, Any]]]],
+    state_dir: Path,
+    changes: ObjectChanges,
+    requestor_identifier: Optional[str] = None,
+) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    searching_and_assigning for an incremental run (build_collections with state_dir and changes)
+    Top-level objects that nothing in changes affects are loaded as the last run linked them (see incremental.py),
+    and only the objects of the others are linked again; the result is the same as searching_and_assigning
+    Every object is linked when ids are generated (they depend on the whole run), when a type appears twice or
+    when objects can't be told apart by a string id
+    """
+    names = [name for name, _ in collections]
+    if requestor_identifier is not None or len(set(names)) != len(names):
+        return searching_and_assigning(collections, requestor_identifier)
+
+    sources = {source: [object_type, state] for source, (object_type, _, state) in changes.sources.items()}
+    process_order = get_process_order(collections)
+    previous = load_link_state(state_dir)
+
+    types = set()
+    if previous is not None:
+        types = changed_types(previous, changes)
+        if not types and not changes.ids and [name for name, _ in previous.order] == process_order:
+            # Nothing changed: the last run's linked objects are the result. Links are only saved from objects with
+            # distinct string ids, so these are too
+            linked = iter(previous.objects())
+            if sources != previous.sources:
+                save_link_state(state_dir, LinkState(sources, previous.order, previous.roots))
+            return [(name, [next(linked) for _ in range(count)]) for name, count in previous.order]
+
+    # Every collection's object keys (see object_key), in collection order
+    collection_keys = {}
+    for name, objects in collections:
+        object_ids = [obj.get("id") for obj in objects]
+        if not all(isinstance(object_id, str) for object_id in object_ids):
+            return searching_and_assigning(collections)
+        collection_keys[name] = [f"{name}:{object_id}" for object_id in object_ids]
+    objects_by_key = dict(zip(chain.from_iterable(collection_keys.values()),
+                              chain.from_iterable(objects for _, objects in collections)))
+    if len(objects_by_key) != sum(len(keys) for keys in collection_keys.values()):
+        return searching_and_assigning(collections)
+
+    # Parent references are found before linking removes the parent ids
+    id_fields = {name: parent_id_fields(objects) for name, objects in collections}
+    refs, valid = find_objects_to_relink(previous, objects_by_key, id_fields, changes.ids, types)
+    transformer_log.log(f"Objects linked again (changed since the last run): {len(refs)} of {len(objects_by_key)}")
+
+    # Which objects linking embeds into which, so each new top-level object's members are known without walking it
+    embedded: Dict[str, List[str]] = {}
+    for key, parents in refs.items():
+        object_type = key_type(key)
+        for parent in parents:
+            if parent not in refs:
+                continue
+            link = get_parent_link(object_type, key_type(parent))
+            if link.mode == "parent":
+                embedded.setdefault(key, []).append(parent)
+            elif link.mode is not None:
+                embedded.setdefault(parent, []).append(key)
+
+    linked = searching_and_assigning([
+        (name, [obj for obj, key in zip(objects, collection_keys[name]) if key in refs])
+        for name, objects in collections
+    ])
+    relinked_roots = {id(obj) for _, objects in linked for obj in objects}
+
+    valid = sorted(valid)
+    previous_roots = {
+        previous.entries[root][0][0]: (previous.roots[root], obj)
+        for root, obj in zip(valid, previous.objects(valid) if valid else ())
+    }
+
+    collection_map = dict(collections)
+    results, order, roots = [], [], []
+    for name in process_order:
+        top_level = []
+        for obj, key in zip(collection_map[name], collection_keys[name]):
+            if key in previous_roots:
+                line, linked_obj = previous_roots[key]
+                top_level.append(linked_obj)
+                roots.append(line)
+            elif id(obj) in relinked_roots:
+                members = embedded_members(key, embedded)
+                # A parent that exists has its children embedded, so only references to missing parents are kept
+                member_refs = list(dict.fromkeys(
+                    parent for member in members for parent in refs[member] if parent not in objects_by_key
+                ))
+                top_level.append(obj)
+                roots.append(link_state_line(members, member_refs, obj))
+        results.append((name, top_level))
+        order.append((name, len(top_level)))
+
+    save_link_state(state_dir, LinkState(sources, order, roots))
+    return results
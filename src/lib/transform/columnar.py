@@ -0,0 +1,249 @@
+"""
+COLUMNAR: evaluates the simple parts of a compiled MappingPlan a column at a time over a batch of rows.
+
+Most mapping rows are plain "<filename>.<column>" copies with an optional strip or split. Instead of walking the plan
+once per row, those fields are computed for the whole batch at once: the column is pulled out of the rows (by value
+index when the rows are CompactRows sharing a header), then stripping, blank filtering and splitting run as one pass
+over the column. Each output object is then assembled from the finished columns.
+
+Everything else (path arrays, attributes[], lists, and fields with a custom transform, which may depend on being
+called row by row) is still evaluated row-wise with the plan's own nodes while the row's object is assembled, so the
+output (including key order) is identical to MappingPlan.apply / nested_map.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from .compiler import ConstantNode, LeafNode, MappingPlan, ObjectNode, PlanNode, is_blank
+from .profiling import get_transform_profile
+from .rows import CompactRow, RowHeader
+
+# Number of rows evaluated together; bounds the extra memory used by intermediate columns
+COLUMNAR_BATCH_ROWS = 4096
+
+# Marks values that are left out of their object (blank values)
+_OMIT = object()
+
+
+class _Parts(tuple):
+    """Cleaned parts of a split value, turned into a fresh list (or template dicts) for every row"""
+
+
+class LeafColumn:
+    """Column-at-a-time LeafNode without a transform: extract, strip, drop blanks, split."""
+
+    def __init__(self, node: LeafNode):
+        self.node = node
+
+    def clean(self, value):
+        """Strip, blank check and split of one value, as in LeafNode.evaluate"""
+        node = self.node
+        if not isinstance(value, str):
+            return _OMIT if is_blank(value) else value
+
+        for char_to_strip in node.strip_chars:
+            value = value.replace(char_to_strip, "")
+        if not node.split:
+            return value if value.strip() else _OMIT
+
+        # Same cleanup as LeafNode: strip wrappers and drop blank parts such as "{}"
+        parts = _Parts(part for part in (p.strip().strip('{}').strip() for p in value.split(node.split)) if part)
+        return parts if parts else _OMIT
+
+    def evaluate(self, rows: Sequence[Any], header: Optional[RowHeader]) -> List[Any]:
+        node = self.node
+        index = header.path_index(node.path) if header is not None else None
+        if index is not None:
+            # CSV values (str or None) repeat a lot within a column, so each distinct value is cleaned once
+            values = [row.values[index] for row in rows]
+            if node.strip_chars or node.split:
+                cleaned = {value: self.clean(value) for value in set(values)}
+            else:
+                cleaned = {value: value if value is not None and value.strip() else _OMIT for value in set(values)}
+                if len(cleaned) == len(values) and _OMIT not in cleaned.values():
+                    # Nothing to drop (e.g. an id column), so the values are the column
+                    return values
+            column = [cleaned[value] for value in values]
+        else:
+            column = [self.clean(value) for value in map(node.accessor, rows)]
+
+        if not node.split:
+            return column
+
+        # Split results must not be shared between rows, as linking and id generation update objects in place
+        template = node.template
+        if template:
+            return [[{template: part} for part in v] if type(v) is _Parts else v for v in column]
+        return [list(v) if type(v) is _Parts else v for v in column]
+
+
+class ConstantColumn:
+    def __init__(self, node: ConstantNode):
+        self.value = _OMIT if is_blank(node.value) else node.value
+
+    def evaluate(self, rows: Sequence[Any], header: Optional[RowHeader]) -> List[Any]:
+        return [self.value] * len(rows)
+
+
+class ObjectColumn:
+    """A nested object whose fields are all columnar, e.g. {"location": {"name": ..., "city": ...}}."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.keys = tuple(k for k, _ in fields)
+
+    def evaluate(self, rows: Sequence[Any], header: Optional[RowHeader]) -> List[Any]:
+        objects = assemble_objects(self.keys, [column.evaluate(rows, header) for _, column in self.fields])
+        return [obj if obj else _OMIT for obj in objects]
+
+
+def assemble_objects(keys: Sequence[str], columns: Sequence[List[Any]]) -> List[Dict[str, Any]]:
+    """Builds one dict per row from finished columns, in key order, leaving out blank values"""
+    if not columns:
+        return []
+    return [
+        {k: value for k, value in zip(keys, values) if value is not _OMIT}
+        for values in zip(*columns)
+    ]
+
+
+def compile_column(node: PlanNode):
+    """Returns a column evaluator for node, or None if it has to be evaluated row by row"""
+    if isinstance(node, LeafNode):
+        return LeafColumn(node) if node.transform_name is None else None
+    if isinstance(node, ConstantNode):
+        return ConstantColumn(node)
+    if type(node) is ObjectNode and node.expand is None:
+        fields = [(k, compile_column(child)) for k, child in node.children]
+        if fields and all(column is not None for _, column in fields):
+            return ObjectColumn(fields)
+    return None
+
+
+def shared_header(rows: Sequence[Any]) -> Optional[RowHeader]:
+    """Returns the RowHeader of a batch if every row is a CompactRow with that header"""
+    if not rows or type(rows[0]) is not CompactRow:
+        return None
+    header = rows[0].header
+    for row in rows:
+        if type(row) is not CompactRow or row.header is not header:
+            return None
+    return header
+
+
+class ColumnarPlan:
+    """
+    Runs a MappingPlan over batches of rows, evaluating its simple top-level fields column-at-a-time
+    map_rows() returns the same objects as calling plan.apply() on every row and dropping filtered rows
+    """
+
+    def __init__(self, plan: MappingPlan):
+        self.plan = plan
+        self.fields = None # (key, column evaluator or None, node) per top-level field, if any field is columnar
+
+        root = plan.root
+        if type(root) is ObjectNode and root.expand is None:
+            fields = [(k, compile_column(node), node) for k, node in root.children]
+            profile = get_transform_profile()
+            if profile is not None:
+                fields = [
+                    (k, profile.timed_column(plan, k, column) if column is not None else None, node)
+                    for k, column, node in fields
+                ]
+            if any(column is not None for _, column, _ in fields):
+                self.fields = fields
+                self.keys = tuple(k for k, _, _ in fields)
+                self.all_columnar = all(column is not None for _, column, _ in fields)
+
+    def map_rows(self, rows: Sequence[Any], start_index: int = 0) -> List[Any]:
+        plan = self.plan
+        if self.fields is None:
+            objects = []
+            for row_index, row in enumerate(rows, start=start_index):
+                mapped = plan.apply(row, row_index=row_index)
+                if mapped is not None:
+                    objects.append(mapped)
+            return objects
+
+        if plan.filter_path is None:
+            kept_rows = rows
+            kept_indexes = range(start_index, start_index + len(rows))
+        else:
+            kept_rows = []
+            kept_indexes = []
+            for row_index, row in enumerate(rows, start=start_index):
+                if plan.matches_filter(row):
+                    kept_rows.append(row)
+                    kept_indexes.append(row_index)
+
+        header = shared_header(kept_rows)
+        if self.all_columnar:
+            return assemble_objects(self.keys, [column.evaluate(kept_rows, header) for _, column, _ in self.fields])
+
+        fields = [
+            (k, column.evaluate(kept_rows, header) if column is not None else None, node)
+            for k, column, node in self.fields
+        ]
+
+        objects = []
+        for position, (row, row_index) in enumerate(zip(kept_rows, kept_indexes)):
+            obj = {}
+            for k, values, node in fields:
+                if values is not None:
+                    value = values[position]
+                    if value is not _OMIT:
+                        obj[k] = value
+                else:
+                    value = node.evaluate(row, row_index, None)
+                    if not is_blank(value):
+                        obj[k] = value
+            objects.append(obj)
+        return objects
+
+
+def iter_batches(rows: Iterable[Any], batch_rows: int = COLUMNAR_BATCH_ROWS):
+    """Yields (start offset, batch) pairs; lists are sliced without copying rows one by one"""
+    if isinstance(rows, (list, tuple)):
+        for start in range(0, len(rows), batch_rows):
+            yield start, rows[start:start + batch_rows]
+        return
+
+    batch = []
+    start = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_rows:
+            yield start, batch
+            start += len(batch)
+            batch = []
+    if batch:
+        yield start, batch
+
+
+def map_rows_columnar(
+    plan: MappingPlan,
+    rows: Iterable[Any],
+    start_index: int = 0,
+    batch_rows: int = COLUMNAR_BATCH_ROWS,
+    stats: Optional[Dict[str, Any]] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> List[Any]:
+    """
+    Maps rows (a list or any iterable, e.g. a streamed CSV) with plan in columnar batches
+    If stats is given, the number of rows read and dropped by the filter are added to its "rows" and "filtered_rows"
+    If progress is given, it is called after every batch with the number of objects that batch mapped
+    """
+    engine = ColumnarPlan(plan)
+    objects = []
+    rows_read = 0
+    for offset, batch in iter_batches(rows, batch_rows):
+        mapped = engine.map_rows(batch, start_index + offset)
+        objects.extend(mapped)
+        rows_read = offset + len(batch)
+        if progress is not None:
+            progress(len(mapped))
+
+    if stats is not None:
+        # Every row the filter keeps becomes exactly one object
+        stats["rows"] = stats.get("rows", 0) + rows_read
+        stats["filtered_rows"] = stats.get("filtered_rows", 0) + rows_read - len(objects)
+    return objects
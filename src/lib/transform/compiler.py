@@ -0,0 +1,515 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict
+from glom import glom, Path
+from .custom_transform.transforms_loader import TransformsRegistry
+from .custom_transform.custom_transform_error import CustomTransformError
+from .rows import CompactRow
+from .profiling import get_transform_profile
+
+"""
+COMPILE_MAPPING: turns a nested mapping spec (the output of parse_nested_mapping / parse_json_mapping) into a
+MappingPlan - a fixed tree of nodes with resolved column accessors, pre-decoded strip sets and bound transform
+callables. The plan is built once per mapping file and then applied to every input row, so none of the spec has
+to be re-interpreted per row.
+
+Every node mirrors one case of the original recursive process_value walk and produces exactly the same output.
+"""
+
+ESCAPE_SEQUENCES = {
+    '\\n': '\n',      # newline
+    '\\t': '\t',      # tab
+    '\\r': '\r',      # carriage return
+    '\\"': '"',       # double quote
+    "\\'": "'",       # single quote
+    '\\\\': '\\',     # backslash
+}
+
+
+def is_blank(val) -> bool:
+    """Check if a value is considered blank/empty and should be omitted from the generated JSON object."""
+    if val is None:
+        return True
+    if isinstance(val, str):
+        return val.strip() == ""
+    if isinstance(val, (list, dict)):
+        return len(val) == 0
+    return False
+
+
+def decode_escape_sequences(s: str) -> str:
+    """
+    Helper to decode common escape sequences from CSV string representations.
+        Args: s: input string containing escape sequence
+    """
+    for escaped, actual in ESCAPE_SEQUENCES.items():
+        s = s.replace(escaped, actual)
+    return s
+
+
+def parse_strip_chars(strip_val) -> tuple:
+    """
+    Decodes a strip directive into the sequence of substrings to remove.
+    Strings are semicolon-separated (e.g. "<p>;</p>;\\n"), anything else is used as-is.
+    """
+    if not strip_val:
+        return ()
+    if isinstance(strip_val, str):
+        strip_chars = []
+        for char in strip_val.split(';'):
+            cleaned_char = char.strip(' ')
+            if cleaned_char:
+                strip_chars.append(decode_escape_sequences(cleaned_char))
+        return tuple(strip_chars)
+    return tuple(strip_val)
+
+
+def make_accessor(path) -> Callable[[Any], Any]:
+    """
+    Returns a callable resolving a mapping path against a row.
+
+    Input rows are always two levels deep ({filename: {column: value}}), so "<filename>.<column>" paths are
+    resolved with two plain dict lookups, or by value index for CompactRows. Every way of splitting the path into a filename and a column is
+    precomputed, which keeps columns whose names contain dots or spaces working. Anything that isn't found
+    that way (genuinely nested inputs, objects, missing columns) falls back to glom.
+    """
+    if not isinstance(path, str):
+        return lambda root: glom(root, path, default=None)
+
+    spec = Path.from_text(path)
+    splits = []
+    index = path.find('.')
+    while index != -1:
+        splits.append((path[:index], path[index + 1:]))
+        index = path.find('.', index + 1)
+
+    def accessor(root):
+        if type(root) is CompactRow:
+            # Compact rows resolve the path to a value index once per input file
+            index = root.header.path_index(path)
+            if index is not None:
+                return root.values[index]
+        elif isinstance(root, dict):
+            for filename, column in splits:
+                columns = root.get(filename)
+                if isinstance(columns, dict) and column in columns:
+                    return columns[column]
+        return glom(root, spec, default=None)
+
+    return accessor
+
+
+def column_label(path: str) -> str:
+    """Column name of a "<filename>.<column>" path, used as the label of attributes[].value items."""
+    return path.split('.')[-1] if '.' in path else path
+
+
+class PlanNode:
+    """Base class for compiled mapping nodes."""
+
+    def evaluate(self, root, row_index: int | None, parent_index: int | None):
+        raise NotImplementedError
+
+    def child_nodes(self):
+        """(key, node) pairs of the nodes this node evaluates; "[]" keys are array items"""
+        return ()
+
+
+class ConstantNode(PlanNode):
+    """Case 3: a primitive in the spec is returned as-is."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def evaluate(self, root, row_index, parent_index):
+        return self.value
+
+
+class FieldNode(PlanNode):
+    """Shared strip/transform handling for leaf path specifications."""
+
+    def __init__(self, spec: Dict[str, Any], transreg: TransformsRegistry | None):
+        self.path = spec["path"]
+        self.strip_chars = parse_strip_chars(spec.get("strip"))
+        self.transreg = transreg
+        self.transform_name = None
+        self.transform_fn = None
+        if transreg is not None and spec.get("transform"):
+            self.transform_name = spec["transform"]
+            try:
+                self.transform_fn = transreg.get_transform(self.transform_name)
+            except Exception:
+                # Unknown names are looked up again when a value reaches them so the
+                # registry error surfaces at the same point it always has
+                self.transform_fn = None
+
+    def strip(self, val):
+        if self.strip_chars and isinstance(val, str):
+            for char_to_strip in self.strip_chars:
+                val = val.replace(char_to_strip, "")
+        return val
+
+    def transform(self, val, row_index):
+        """Apply the bound custom transform, if any."""
+        if self.transform_name is None:
+            return val
+        transform_fn = self.transform_fn or self.transreg.get_transform(self.transform_name)
+        try:
+            return transform_fn(val)
+        except CustomTransformError:
+            raise
+        except Exception as exc:
+            raise CustomTransformError(
+                "Field transformation failed.",
+                function_name=self.transform_name,
+                row_index=row_index,
+                cause=exc,
+                mapping_path=self.path,
+            ) from exc
+
+
+class LeafNode(FieldNode):
+    """
+    Case 1A-2: single input field, e.g. {"path": "organizations.organization_name"}.
+    With a split directive the value becomes a list, wrapped as [{template: part}] when a template key is set.
+    """
+
+    def __init__(self, spec, transreg, template=None):
+        super().__init__(spec, transreg)
+        self.accessor = make_accessor(self.path)
+        self.split = spec.get("split") or None
+        self.template = template
+
+    def evaluate(self, root, row_index, parent_index):
+        extracted_val = self.strip(self.accessor(root))
+
+        # Return None for empty strings to maintain consistency with path array handling
+        if extracted_val == "" or extracted_val is None:
+            return None
+
+        if self.split and isinstance(extracted_val, str):
+            # Split on delimiter, clean wrappers, then filter blanks so placeholders
+            # like "{}" don't become array items with empty string values.
+            parts = []
+            for part in extracted_val.split(self.split):
+                cleaned = part.strip().strip('{}').strip()
+                if cleaned:
+                    parts.append(cleaned)
+            if self.template:
+                result = [{self.template: part} for part in parts]
+            else:
+                result = parts
+            return self.transform(result, row_index)
+
+        return self.transform(extracted_val, row_index)
+
+
+class MultiLeafNode(FieldNode):
+    """
+    Case 1A-1: multiple input fields (semicolon-separated in the mapping file),
+    e.g. {"path": ["organizations.Phone1Number", "organizations.Phone2Number"]}.
+    """
+
+    def __init__(self, spec, transreg, array_context=False):
+        super().__init__(spec, transreg)
+        self.accessors = [make_accessor(p) for p in self.path]
+        self.array_context = array_context
+
+    def extract(self, accessor, root, row_index):
+        val = self.strip(accessor(root))
+        if val == "" or val is None:
+            return None
+        return self.transform(val, row_index)
+
+    def evaluate(self, root, row_index, parent_index):
+        # When parent_index is set, only use the path at that index
+        if parent_index is not None and parent_index < len(self.accessors):
+            try:
+                return self.extract(self.accessors[parent_index], root, row_index)
+            except Exception:
+                return None
+
+        # Extract values from all paths, preserving None values for alignment logic
+        extracted_values = []
+        for accessor in self.accessors:
+            try:
+                extracted_values.append(self.extract(accessor, root, row_index))
+            except Exception:
+                extracted_values.append(None)
+
+        # In array context return everything so sibling fields can align by index
+        if self.array_context:
+            return extracted_values
+        filtered = [v for v in extracted_values if v is not None]
+        return filtered if len(filtered) > 1 else (filtered[0] if filtered else None)
+
+
+class AlignedObjectNode(PlanNode):
+    """
+    Case 1B-1: an object with one or more path arrays whose values are aligned by index,
+    e.g. phones[].number and phones[].type both mapped from semicolon-separated fields.
+    """
+
+    def __init__(self, path_array_items, regular_items, array_context, attributes_context):
+        # (key, accessors, labels) - labels are only kept for attributes[].value
+        self.fields = []
+        for k, v in path_array_items:
+            labels = [column_label(p) for p in v["path"]] if attributes_context and k == "value" else None
+            self.fields.append((k, [make_accessor(p) for p in v["path"]], labels))
+        self.max_len = max(len(accessors) for _, accessors, _ in self.fields)
+        self.regular = regular_items
+        self.array_context = array_context
+
+    def child_nodes(self):
+        return self.regular
+
+    def evaluate(self, root, row_index, parent_index):
+        # When parent_index is set, only use values at that index
+        if parent_index is not None:
+            item = {}
+            for k, accessors, _ in self.fields:
+                if parent_index < len(accessors):
+                    try:
+                        val = accessors[parent_index](root)
+                        if val != "" and val is not None:
+                            item[k] = val
+                    except Exception:
+                        pass
+            for k, node in self.regular:
+                processed_val = node.evaluate(root, row_index, parent_index)
+                if not is_blank(processed_val):
+                    item[k] = processed_val
+            return [item] if item else []
+
+        # aligned_values[n][i] = value at index i for the n-th path array
+        aligned_values = []
+        for _, accessors, _ in self.fields:
+            values = []
+            for accessor in accessors:
+                try:
+                    val = accessor(root)
+                    values.append(val if val != "" else None)
+                except Exception:
+                    values.append(None)
+            aligned_values.append(values)
+
+        if self.array_context:
+            aligned_result = []
+            for i in range(self.max_len):
+                item = {}
+                for (k, _, labels), values in zip(self.fields, aligned_values):
+                    if i < len(values) and not is_blank(values[i]):
+                        if labels is not None:
+                            # attributes[].value: set value and label directly on the item
+                            item["value"] = values[i]
+                            item["label"] = labels[i] if i < len(labels) else ""
+                        else:
+                            item[k] = values[i]
+                # Regular fields are added to each aligned item, resolved at the same index
+                for k, node in self.regular:
+                    processed_val = node.evaluate(root, row_index, i)
+                    if not is_blank(processed_val):
+                        item[k] = processed_val
+                if item:
+                    aligned_result.append(item)
+            return aligned_result
+
+        # Not in array context - use first value from each path array
+        result = {}
+        for (k, _, _), values in zip(self.fields, aligned_values):
+            if values and not is_blank(values[0]):
+                result[k] = values[0]
+        for k, node in self.regular:
+            processed_val = node.evaluate(root, row_index, parent_index)
+            if not is_blank(processed_val):
+                result[k] = processed_val
+        return result
+
+
+class ObjectNode(PlanNode):
+    """
+    Case 1B: a nested object structure without path arrays.
+    A single-key object in array context may expand into one object per value (case 1B-2).
+    """
+
+    def __init__(self, children, expand=None):
+        self.children = children
+        self.expand = expand
+
+    def child_nodes(self):
+        return self.children if self.expand is None else [*self.children, self.expand]
+
+    def evaluate(self, root, row_index, parent_index):
+        if self.expand is not None:
+            k, node = self.expand
+            processed = node.evaluate(root, row_index, parent_index)
+            if isinstance(processed, list) and len(processed) > 1:
+                return [{k: val} for val in processed if not is_blank(val)]
+
+        result_dict = {}
+        for k, node in self.children:
+            processed_val = node.evaluate(root, row_index, parent_index)
+            if not is_blank(processed_val):
+                result_dict[k] = processed_val
+        return result_dict
+
+
+class SplitListNode(PlanNode):
+    """Case 2a: an array holding a single split field, e.g. languages[].name with split ","."""
+
+    def __init__(self, node):
+        self.node = node
+
+    def child_nodes(self):
+        return [("[]", self.node)]
+
+    def evaluate(self, root, row_index, parent_index):
+        processed = self.node.evaluate(root, row_index, parent_index)
+        return processed if isinstance(processed, list) else [processed]
+
+
+class ListNode(PlanNode):
+    """Case 2b: an array structure; items expanded by path array alignment are flattened."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def child_nodes(self):
+        return [("[]", node) for node in self.items]
+
+    def evaluate(self, root, row_index, parent_index):
+        flattened = []
+        for node in self.items:
+            item = node.evaluate(root, row_index, parent_index)
+            if isinstance(item, list):
+                flattened.extend([i for i in item if not is_blank(i)])
+            elif not is_blank(item):
+                flattened.append(item)
+        return flattened
+
+
+def _is_path_array(v) -> bool:
+    return isinstance(v, dict) and "path" in v and isinstance(v.get("path"), list)
+
+
+def compile_node(value, transreg: TransformsRegistry | None, array_context=False, template=None,
+                 attributes_context=False) -> PlanNode:
+    """
+    Compiles one level of a mapping spec. The flags mirror the context process_value used to thread through
+    its recursion; they only depend on the position in the spec, so they are resolved here once.
+    """
+    if isinstance(value, dict):
+        if "path" in value:
+            if isinstance(value["path"], list):
+                return MultiLeafNode(value, transreg, array_context=array_context)
+            return LeafNode(value, transreg, template=template)
+
+        items = list(value.items())
+        path_array_items = [(k, v) for k, v in items if _is_path_array(v)]
+
+        if path_array_items:
+            regular_items = [
+                (k, compile_node(v, transreg, attributes_context=attributes_context))
+                for k, v in items if not _is_path_array(v)
+            ]
+            return AlignedObjectNode(path_array_items, regular_items, array_context, attributes_context)
+
+        expand = None
+        if array_context and len(items) == 1:
+            k, v = items[0]
+            expand = (k, compile_node(v, transreg, array_context=True, attributes_context=attributes_context))
+
+        # Entering an array context if any child is a list
+        in_array = any(isinstance(v, list) for v in value.values())
+        children = []
+        for k, v in items:
+            is_attributes_key = (k == "attributes" and isinstance(v, list))
+            children.append((k, compile_node(
+                v,
+                transreg,
+                array_context=in_array,
+                template=k if isinstance(v, dict) and "split" in v and "path" in v else None,
+                attributes_context=is_attributes_key or attributes_context,
+            )))
+        return ObjectNode(children, expand=expand)
+
+    if isinstance(value, list):
+        if len(value) == 1 and isinstance(value[0], dict) and len(value[0]) == 1:
+            key, val = list(value[0].items())[0]
+            if isinstance(val, dict) and "path" in val and "split" in val:
+                return SplitListNode(compile_node(
+                    val, transreg, array_context=True, template=key, attributes_context=attributes_context
+                ))
+        return ListNode([
+            compile_node(item, transreg, array_context=True, attributes_context=attributes_context)
+            for item in value
+        ])
+
+    return ConstantNode(value)
+
+
+class MappingPlan:
+    """
+    A compiled mapping spec plus its optional row filter.
+    Build it once with compile_mapping() and call apply() for every row.
+    """
+
+    def __init__(self, root: PlanNode, filter_spec: Dict[str, Any] | None = None):
+        self.root = root
+        self.filter_path = None
+        if filter_spec is not None:
+            self.filter_path = filter_spec.get("path")
+            self.filter_value = filter_spec.get("value")
+            self.filter_str = str(self.filter_value).strip() if self.filter_value is not None else ""
+            if self.filter_path is not None:
+                self.filter_accessor = make_accessor(self.filter_path)
+
+    def matches_filter(self, root_data) -> bool:
+        """Returns False if the row should be skipped because it does not match the filter."""
+        if self.filter_path is None:
+            return True
+        try:
+            actual_value = self.filter_accessor(root_data)
+            # If path doesn't exist, warn that the filter column might not exist/names might mismatch
+            if actual_value is None:
+                print(f"WARNING: Filter path '{self.filter_path}' returned None. Column may not exist in CSV data or has no value.")
+            # Normalize comparison - strip whitespace and convert to string
+            actual_str = str(actual_value).strip() if actual_value is not None else ""
+            return actual_str == self.filter_str
+        except Exception as e:
+            print(f"WARNING: Filter failed for path '{self.filter_path}' with value '{self.filter_value}': {e}")
+            return False
+
+    def apply(self, root_data, row_index: int | None = None) -> dict | list | None:
+        """Maps a single row, returning None when the row is filtered out."""
+        if not self.matches_filter(root_data):
+            return None
+        return self.root.evaluate(root_data, row_index, None)
+
+
+def compile_mapping(mapping_spec: Dict[str, Any], filter_spec: Dict[str, Any] | None = None,
+                    transreg: TransformsRegistry | None = None) -> MappingPlan:
+    """
+    Compiles a nested mapping spec and an optional glom path-based filter ({"path": ..., "value": ...})
+    into a reusable MappingPlan.
+    While a profile is active (see profiling.profile_transform), the plan's nodes are timed.
+    """
+    plan = MappingPlan(compile_node(mapping_spec, transreg), filter_spec)
+    profile = get_transform_profile()
+    if profile is not None:
+        profile.instrument_plan(plan)
+    return plan
+
+
+def build_filter_spec(filter_spec: Dict[str, Any] | None, filename: str) -> Dict[str, Any] | None:
+    """
+    Converts a parsed mapping filter ({"column": ..., "value": ...}) into the path-based
+    filter used by nested_map and compile_mapping, or None if no filter applies.
+    """
+    if filter_spec is None:
+        return None
+    column_name = filter_spec.get("column")
+    match_value = filter_spec.get("value")
+    if column_name and match_value is not None:
+        return {"path": f"{filename}.{column_name}", "value": match_value}
+    return None
+
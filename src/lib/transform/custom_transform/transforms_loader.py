@@ -47,8 +47,16 @@ class TransformsRegistry:
         module = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(module)
 
+        self.module_path = module_path
         self._transforms = module.transforms
 
+    def __reduce__(self):
+        """
+        Pickles the registry by its module path, so worker processes re-load the module
+        themselves instead of receiving its (unpicklable) functions.
+        """
+        return (TransformsRegistry, (self.module_path,))
+
     def get_transform(self, name: str) -> Callable:
         """
         Looks up specific field-level transformations by their string name.
@@ -0,0 +1,506 @@
+"""
+INCREMENTAL: state kept between runs so a re-transform only re-maps input rows that changed, only re-links the
+objects those rows affect, and only rewrites output files whose content changed.
+
+The state directory (by default next to the output directory, see default_state_dir) holds:
+    - one "<mapping file stem>.rows" file per input/mapping pair: a header line with the mapping version and the
+      input file's digest, then one "<record fingerprint>\t<mapped object as compact JSON>" line per input record,
+      in input order (the JSON is empty for records the mapping filtered out)
+    - links.state: every top-level object of the last linking pass as linked, with the objects embedded in it and
+      the parents they point to
+    - outputs.json: the output directory, format and a SHA-256 per output file written by the last run
+
+The mapping version hashes the mapping file, the input's header row and the custom transforms module. If neither it
+nor the input file changed, the pair's objects are loaded from its row state in one read and nothing is mapped.
+Otherwise each record is fingerprinted from its raw CSV text, and records whose fingerprint is already stored are
+loaded from the stored JSON instead of being mapped again.
+
+Mapping reports what changed (ObjectChanges), by id where it can tell and by object type otherwise. Top-level objects
+none of whose embedded objects or parent ids changed are taken from links.state; the others are linked again from
+their current objects, so the output is the same as a full run.
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import cached_property
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .mapping_cache import get_mapping_cache
+from .custom_transform.transforms_loader import TransformsRegistry
+from .parser import InputPath, as_input_path
+from .relationships import identify_parent_relationships
+from .outputs import COMPACT_SEPARATORS, OUTPUT_FORMATS, iter_output_entries
+
+# Bump when the state format (or what a fingerprint covers) changes so older state is ignored
+INCREMENTAL_FORMAT_VERSION = 2
+
+MANIFEST_FILENAME = "outputs.json"
+LINKS_FILENAME = "links.state"
+ROWS_SUFFIX = ".rows"
+# Record fingerprints are hex blake2b digests of 16 bytes, so a row state line's JSON starts at a fixed offset
+FINGERPRINT_LENGTH = 32
+
+# An object as "<object type>:<id>" (see object_key)
+ObjectKey = str
+
+
+def default_state_dir(output_dir: str) -> Path:
+    """Returns the state directory used for output_dir, e.g. "out" -> ".out.hsds-state" in the same parent"""
+    output_dir = Path(output_dir).resolve()
+    return output_dir.parent / f".{output_dir.name}.hsds-state"
+
+
+def record_fingerprint(record: str) -> str:
+    return hashlib.blake2b(record.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def file_digest(input_file: InputPath) -> str:
+    with as_input_path(input_file).open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def mapping_version(
+    mapping_file: InputPath,
+    columns: List[str],
+    custom_transforms_registry: Optional[TransformsRegistry] = None,
+) -> str:
+    """Hashes everything besides the records that a pair's mapped objects depend on"""
+    digest = hashlib.sha256()
+    digest.update(f"{INCREMENTAL_FORMAT_VERSION}\0".encode("utf-8"))
+    digest.update(as_input_path(mapping_file).read_bytes())
+    digest.update(b"\0")
+    digest.update(json.dumps(columns).encode("utf-8"))
+
+    module_path = getattr(custom_transforms_registry, "module_path", None)
+    if module_path is not None:
+        digest.update(b"\0")
+        digest.update(Path(module_path).read_bytes())
+    return digest.hexdigest()
+
+
+def rows_state_path(state_dir: Path, mapping_file: Any) -> Path:
+    return Path(state_dir) / f"{mapping_file.stem}{ROWS_SUFFIX}"
+
+
+def row_state_id(header: Dict[str, Any]) -> Optional[str]:
+    """Identifies the row state a header belongs to (mapping version and input digest), None if there is none"""
+    if not header:
+        return None
+    return f"{header.get('version')}:{header.get('input')}"
+
+
+def read_row_state(path: Path) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Returns the header and record lines stored for a pair by the last run,
+    or ({}, []) if there are none or they can't be read
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            header_line, _, body = f.read().partition("\n")
+        header = json.loads(header_line)
+    except (OSError, ValueError):
+        # Missing or corrupt state only means every row is mapped again
+        return {}, []
+    # Not splitlines(): mapped JSON may hold separators like U+2028 that it splits on
+    lines = body.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return header, lines
+
+
+def parse_row_lines(lines: List[str]) -> List[Tuple[str, str]]:
+    return [(line[:FINGERPRINT_LENGTH], line[FINGERPRINT_LENGTH + 1:]) for line in lines]
+
+
+def load_row_objects(lines: List[str]) -> List[Dict[str, Any]]:
+    """Objects of a pair's stored records, in input order, parsed in one go"""
+    return json.loads("[" + ",".join(filter(None, [line[FINGERPRINT_LENGTH + 1:] for line in lines])) + "]")
+
+
+def save_row_state(path: Path, header: Dict[str, Any], rows: List[Tuple[str, str]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(partial_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+        f.writelines(f"{fingerprint}\t{mapped_json}\n" for fingerprint, mapped_json in rows)
+    os.replace(partial_path, path)
+
+
+def map_rows_incremental(
+    input_records: Iterable[Tuple[str, Dict[str, Any]]],
+    mapping: Dict[str, Any],
+    filter_spec: Optional[Dict[str, Any]],
+    previous_rows: Dict[str, str],
+    custom_transforms_registry: Optional[TransformsRegistry] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str]], int]:
+    """
+    Maps (raw record, row) pairs like collections.map_rows, reusing the stored result for records seen by the last
+    run (previous_rows is {record fingerprint: mapped JSON})
+    Returns (objects, (fingerprint, mapped JSON) of every record for the next run, number of rows actually mapped)
+    If stats is given, counts are added to its "rows", "filtered_rows" and "reused_rows"
+    """
+    objects: List[Optional[Dict[str, Any]]] = []
+    rows: List[Tuple[str, str]] = []
+    mapped: Dict[str, str] = {} # Records first mapped by this run, so duplicates are only mapped once
+    reused: List[Tuple[int, str]] = [] # (position in objects, stored JSON), parsed together at the end
+    plan = None # Only compiled if a row has to be mapped
+
+    for row_index, (record, row) in enumerate(input_records):
+        fingerprint = record_fingerprint(record)
+        mapped_json = previous_rows.get(fingerprint)
+        if mapped_json is None:
+            mapped_json = mapped.get(fingerprint)
+
+        if mapped_json is None:
+            if plan is None:
+                plan = get_mapping_cache().get_or_compile(mapping, filter_spec, custom_transforms_registry)
+            mapped_dictionary = plan.apply(row, row_index=row_index)
+
+            if mapped_dictionary is None:
+                mapped_json = ""
+            else:
+                mapped_json = json.dumps(mapped_dictionary, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+                objects.append(mapped_dictionary)
+            mapped[fingerprint] = mapped_json
+        elif mapped_json:
+            reused.append((len(objects), mapped_json))
+            objects.append(None)
+        rows.append((fingerprint, mapped_json))
+
+    if reused:
+        # A fresh object for every row, as linking embeds objects into their parents in place
+        parsed = json.loads("[" + ",".join([mapped_json for _, mapped_json in reused]) + "]")
+        for (position, _), mapped_dictionary in zip(reused, parsed):
+            objects[position] = mapped_dictionary
+
+    if stats is not None:
+        stats["rows"] = stats.get("rows", 0) + len(rows)
+        stats["filtered_rows"] = stats.get("filtered_rows", 0) + len(rows) - len(objects)
+        stats["reused_rows"] = stats.get("reused_rows", 0) + len(rows) - len(mapped)
+    return objects, rows, len(mapped)
+
+
+def changed_object_ids(
+    previous_rows: List[Tuple[str, str]],
+    rows: List[Tuple[str, str]],
+) -> Optional[Set[str]]:
+    """
+    ids of the objects mapped from records that were added, removed or changed between two runs of a pair,
+    or None if the change can't be told by id (an affected object has no string id, or records were reordered)
+    """
+    previous_counts = Counter(fingerprint for fingerprint, _ in previous_rows)
+    counts = Counter(fingerprint for fingerprint, _ in rows)
+    changed = {fingerprint for fingerprint in previous_counts.keys() | counts.keys()
+               if previous_counts[fingerprint] != counts[fingerprint]}
+
+    # Objects are listed (and embedded into their parents) in record order
+    if ([fingerprint for fingerprint, _ in previous_rows if fingerprint not in changed]
+            != [fingerprint for fingerprint, _ in rows if fingerprint not in changed]):
+        return None
+
+    ids = set()
+    for fingerprint, mapped_json in chain(previous_rows, rows):
+        if fingerprint in changed and mapped_json:
+            object_id = json.loads(mapped_json).get("id")
+            if not isinstance(object_id, str):
+                return None
+            ids.add(object_id)
+    return ids
+
+
+def object_key(object_type: str, object_id: str) -> ObjectKey:
+    """Identifies an object across runs; object types never contain ":" """
+    return f"{object_type}:{object_id}"
+
+
+def key_type(key: ObjectKey) -> str:
+    return key.partition(":")[0]
+
+
+class ObjectChanges:
+    """
+    What changed in the mapped objects since the last incremental run, filled in by build_collections for
+    searching_and_assigning_incremental
+    ids holds the keys (see object_key) of objects that were added, removed or changed, and types the object types
+    that changed as a whole (e.g. their mapping was edited). sources maps every mapping file name to its object type,
+    the row state the changes were found against and the row state this run wrote
+    """
+
+    def __init__(self):
+        self.ids: Set[ObjectKey] = set()
+        self.types: Set[str] = set()
+        self.sources: Dict[str, Tuple[str, Optional[str], Optional[str]]] = {}
+
+    def record(
+        self,
+        source: str,
+        object_type: str,
+        previous_state: Optional[str],
+        state: Optional[str],
+        ids: Optional[Set[str]],
+    ) -> None:
+        """Records one pair's changes; ids None means the whole type changed"""
+        self.sources[source] = (object_type, previous_state, state)
+        if ids is None:
+            self.types.add(object_type)
+        else:
+            self.ids.update(object_key(object_type, object_id) for object_id in ids)
+
+
+@dataclass
+class LinkState:
+    """
+    links.state as written by the last incremental run
+    sources: mapping file name -> [object type, row state it was linked from]
+    order: [object type, number of top-level objects] in output order
+    roots: one line per top-level object: a JSON [keys of the objects embedded in it (itself first), keys of the
+    missing parents they point to] and the linked object as JSON, separated by a tab
+    """
+    sources: Dict[str, List[Optional[str]]]
+    order: List[Tuple[str, int]]
+    roots: List[str]
+
+    def objects(self, indexes: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Parses the linked objects of the given roots (all by default) in one go"""
+        lines = self.roots if indexes is None else [self.roots[index] for index in indexes]
+        return json.loads("[" + ",".join([line.partition("\t")[2] for line in lines]) + "]")
+
+    @cached_property
+    def entries(self) -> List[Tuple[List[ObjectKey], List[ObjectKey]]]:
+        """(members, parent references) of every root, parsed in one go"""
+        return json.loads("[" + ",".join([line.partition("\t")[0] for line in self.roots]) + "]")
+
+
+def load_link_state(state_dir: Path) -> Optional[LinkState]:
+    path = Path(state_dir) / LINKS_FILENAME
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            header_line, _, body = f.read().partition("\n")
+        header = json.loads(header_line)
+    except (OSError, ValueError):
+        return None
+    if header.get("version") != INCREMENTAL_FORMAT_VERSION:
+        return None
+
+    roots = body.split("\n")
+    if roots[-1] == "":
+        roots.pop()
+    return LinkState(header["sources"], [tuple(entry) for entry in header["order"]], roots)
+
+
+def link_state_line(members: List[ObjectKey], refs: List[ObjectKey], linked: Dict[str, Any]) -> str:
+    entry = json.dumps([members, refs], ensure_ascii=False, separators=COMPACT_SEPARATORS)
+    return f"{entry}\t{json.dumps(linked, ensure_ascii=False, separators=COMPACT_SEPARATORS)}"
+
+
+def save_link_state(state_dir: Path, state: LinkState) -> None:
+    path = Path(state_dir) / LINKS_FILENAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = path.with_name(f"{LINKS_FILENAME}.tmp")
+    with open(partial_path, "w", encoding="utf-8") as f:
+        header = {"version": INCREMENTAL_FORMAT_VERSION, "sources": state.sources, "order": state.order}
+        f.write(json.dumps(header) + "\n")
+        f.writelines(f"{line}\n" for line in state.roots)
+    os.replace(partial_path, path)
+
+
+def changed_types(previous: LinkState, changes: ObjectChanges) -> Set[str]:
+    """
+    Object types changed as a whole: those reported by mapping, plus the types of pairs that were added or removed
+    or whose row state isn't the one the last linking pass was done from
+    """
+    types = set(changes.types)
+    for source in previous.sources.keys() | changes.sources.keys():
+        previous_type, linked_state = previous.sources.get(source, (None, None))
+        object_type, previous_state, _ = changes.sources.get(source, (None, None, None))
+        if previous_type != object_type or linked_state is None or linked_state != previous_state:
+            types.update(filter(None, (previous_type, object_type)))
+    return types
+
+
+def find_objects_to_relink(
+    previous: Optional[LinkState],
+    objects_by_key: Dict[ObjectKey, Dict[str, Any]],
+    id_fields: Dict[str, List[Tuple[str, str]]],
+    changed_ids: Set[ObjectKey],
+    types: Set[str],
+) -> Tuple[Dict[ObjectKey, List[ObjectKey]], Set[int]]:
+    """
+    Returns ({key: parent references} of the current objects to link again, indexes of the previous roots that are
+    still valid). id_fields holds parent_id_fields of every collection
+    A previous root is invalid once any object embedded in it changed or is linked again, or once a missing parent
+    one of them points to appears. Every object of an invalid root is linked again, which can invalidate the other roots it is
+    embedded in or points into, until nothing changes
+    """
+    if previous is None:
+        # Nothing was linked before, so everything is linked now
+        return {
+            key: [f"{parent_type}:{parent_id}"
+                  for parent_type, parent_id in identify_parent_relationships(obj, id_fields[key.partition(":")[0]])]
+            for key, obj in objects_by_key.items()
+        }, set()
+
+    entries = previous.entries
+    member_roots = defaultdict(list)
+    ref_roots = defaultdict(list)
+    invalid: Set[int] = set()
+    pending: List[ObjectKey] = []
+
+    def invalidate(root: int) -> None:
+        if root not in invalid:
+            invalid.add(root)
+            pending.extend(entries[root][0])
+
+    for root, (members, refs) in enumerate(entries):
+        for key in members:
+            member_roots[key].append(root)
+        for key in refs:
+            ref_roots[key].append(root)
+        if types and any(key_type(key) in types for key in chain(members, refs)):
+            invalidate(root)
+
+    # Objects that changed, belong to a changed type or weren't linked by the last run
+    pending.extend(changed_ids)
+    pending.extend(key for key in objects_by_key if key not in member_roots or (types and key_type(key) in types))
+
+    parent_refs: Dict[ObjectKey, List[ObjectKey]] = {}
+    seen: Set[ObjectKey] = set()
+    while pending:
+        key = pending.pop()
+        if key in seen:
+            continue
+        seen.add(key)
+        for root in chain(member_roots.get(key, ()), ref_roots.get(key, ())):
+            invalidate(root)
+
+        obj = objects_by_key.get(key)
+        if obj is None:
+            # Removed since the last run
+            continue
+        object_type = key_type(key)
+        parent_refs[key] = [
+            object_key(parent_type, parent_id)
+            for parent_type, parent_id in identify_parent_relationships(obj, id_fields[object_type])
+        ]
+        # Linked again, this object is embedded into the parents it points to now
+        for parent in parent_refs[key]:
+            for root in member_roots.get(parent, ()):
+                invalidate(root)
+
+    return parent_refs, set(range(len(entries))) - invalid
+
+
+def embedded_members(root: ObjectKey, embedded: Dict[ObjectKey, List[ObjectKey]]) -> List[ObjectKey]:
+    """Keys of the objects found in root after linking (root first), following embedded: {key: keys embedded in it}"""
+    members = []
+    seen = set()
+    pending = [root]
+    while pending:
+        key = pending.pop()
+        if key not in seen:
+            seen.add(key)
+            members.append(key)
+            pending.extend(embedded.get(key, ()))
+    return members
+
+
+def remove_stale_row_states(state_dir: Path, keep: Iterable[Path]) -> None:
+    """Deletes row state for mapping files that are gone from the input directory"""
+    keep = {Path(path).name for path in keep}
+    for path in Path(state_dir).glob(f"*{ROWS_SUFFIX}"):
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+
+
+def _load_manifest(manifest_path: Path, output_dir: str) -> Dict[str, str]:
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if manifest.get("output_dir") != str(Path(output_dir).resolve()):
+        return {}
+    return manifest.get("files", {})
+
+
+def save_objects_incremental(
+    objects_data,
+    output_dir: str,
+    state_dir: Path,
+    output_format: str = "files",
+) -> Dict[str, int]:
+    """
+    Writes objects like outputs.save_objects, but only rewrites files whose content changed since the last
+    incremental run and removes files that run wrote but this one doesn't (e.g. deleted objects)
+    Returns counts of files {"written", "unchanged", "removed"}
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}'. Expected one of: {', '.join(OUTPUT_FORMATS)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = Path(state_dir) / MANIFEST_FILENAME
+    previous_files = _load_manifest(manifest_path, output_dir)
+    current_files: Dict[str, str] = {}
+    counts = {"written": 0, "unchanged": 0, "removed": 0}
+
+    for filename, text_chunks in iter_output_entries(objects_data, output_format):
+        filepath = os.path.join(output_dir, filename)
+        digest = hashlib.sha256()
+
+        if output_format == "files":
+            # Single objects are small, so they are hashed in memory before deciding to write
+            data = "".join(text_chunks).encode("utf-8")
+            digest.update(data)
+            content_hash = digest.hexdigest()
+            if previous_files.get(filename) == content_hash and os.path.exists(filepath):
+                counts["unchanged"] += 1
+            else:
+                with open(filepath, "wb") as f:
+                    f.write(data)
+                counts["written"] += 1
+        else:
+            # Per-type and bundle files can be large, so they are streamed to a temp file and only moved into
+            # place if their content changed
+            partial_path = f"{filepath}.tmp"
+            with open(partial_path, "wb") as f:
+                for text in text_chunks:
+                    data = text.encode("utf-8")
+                    digest.update(data)
+                    f.write(data)
+            content_hash = digest.hexdigest()
+            if previous_files.get(filename) == content_hash and os.path.exists(filepath):
+                os.remove(partial_path)
+                counts["unchanged"] += 1
+            else:
+                os.replace(partial_path, filepath)
+                counts["written"] += 1
+
+        current_files[filename] = content_hash
+
+    for filename in previous_files.keys() - current_files.keys():
+        filepath = os.path.join(output_dir, filename)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+            counts["removed"] += 1
+
+    Path(state_dir).mkdir(parents=True, exist_ok=True)
+    partial_manifest = manifest_path.with_name(f"{MANIFEST_FILENAME}.tmp")
+    with open(partial_manifest, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "output_dir": str(Path(output_dir).resolve()),
+                "output_format": output_format,
+                "files": current_files,
+            },
+            f,
+        )
+    os.replace(partial_manifest, manifest_path)
+
+    return counts
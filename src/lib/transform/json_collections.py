@@ -1,14 +1,18 @@
 import json
 import re
-from pathlib import Path
-from typing import Any, Dict, List, Tuple
+import zipfile
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from .parser import validate_mapping_against_parsed_data
-from .mapper import nested_map
-from .logger import transformer_log
+from .parser import InputPath, as_input_path, open_input_file, validate_mapping_against_parsed_data
+from .compiler import build_filter_spec
+from .columnar import map_rows_columnar
+from .mapping_cache import get_mapping_cache
+from .parallel import map_in_processes
+from .logger import call_measured, timed_stage, transformer_log
 
 
-def parse_input_json(input_file: str, filename: str) -> list[dict]:
+def parse_input_json(input_file: InputPath, filename: str) -> list[dict]:
     """
     Reads a JSON file containing an array of record objects and returns them
     in the same shape that parse_input_csv() produces:
@@ -17,7 +21,7 @@ def parse_input_json(input_file: str, filename: str) -> list[dict]:
     Raises ValueError if the file is not valid JSON or not a top-level array.
     """
     try:
-        with open(input_file, "r", encoding="utf-8") as f:
+        with open_input_file(input_file) as f:
             data = json.load(f)
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON in '{input_file}': {e}")
@@ -47,7 +51,7 @@ def parse_input_json(input_file: str, filename: str) -> list[dict]:
     return rows
 
 
-def parse_json_mapping(mapping_file: str, filename: str) -> tuple[dict, dict | None]:
+def parse_json_mapping(mapping_file: InputPath, filename: str) -> tuple[dict, dict | None]:
     """
     Reads a JSON mapping file and converts it into the same (mapping_spec, filter_spec)
     tuple that parse_nested_mapping() returns.
@@ -64,7 +68,7 @@ def parse_json_mapping(mapping_file: str, filename: str) -> tuple[dict, dict | N
     Raises ValueError for structural problems.
     """
     try:
-        with open(mapping_file, "r", encoding="utf-8") as f:
+        with open_input_file(mapping_file) as f:
             raw = json.load(f)
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON in mapping file '{mapping_file}': {e}")
@@ -156,16 +160,34 @@ def parse_json_mapping(mapping_file: str, filename: str) -> tuple[dict, dict | N
     return mapping, filter_spec
 
 
-def build_collections_from_json(data_directory: str) -> List[Tuple[str, List[Dict[str, Any]]]]:
+@timed_stage("build_collections")
+def build_collections_from_json(
+    data_directory: InputPath,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> List[Tuple[str, List[Dict[str, Any]]]]:
     """
     JSON counterpart to build_collections(). Discovers *_mapping.json files,
     pairs them with <input_name>.json source files, validates, transforms,
     and returns the same [(object_type, [dicts])] structure.
 
+    With workers > 1, each source/mapping pair is mapped in its own worker
+    process; results keep the serial order.
+
+    data_directory may also be a zipfile.Path, in which case files are read
+    straight from the archive (serially, since open archives can't be sent to
+    worker processes).
+
+    progress, if given, is called like in build_collections(): with the number
+    of objects mapped since its last call, after every batch of records when
+    files are mapped in this process and once per file otherwise.
+
     Returns an empty list if no JSON mapping files are found (not an error).
     Raises ValueError for validation failures.
     """
-    data_directory = Path(data_directory)
+    data_directory = as_input_path(data_directory)
+    if isinstance(data_directory, zipfile.Path):
+        workers = None
     results: List[Tuple[str, List[Dict[str, Any]]]] = []
 
     json_mapping_files = list(data_directory.glob("*_mapping.json"))
@@ -176,6 +198,8 @@ def build_collections_from_json(data_directory: str) -> List[Tuple[str, List[Dic
     transformer_log.log(f"Input directory: {data_directory}")
     transformer_log.log(f"Found {len(json_mapping_files)} JSON mapping file(s)")
 
+    pairs = []
+
     for mapping_file in json_mapping_files:
         match = re.match(r"(.+)_([A-Za-z0-9]+)_mapping\.json", mapping_file.name)
         if not match:
@@ -190,42 +214,38 @@ def build_collections_from_json(data_directory: str) -> List[Tuple[str, List[Dic
         if not input_file.exists():
             continue
 
-        input_rows = parse_input_json(str(input_file), input_name)
-
-        if not input_rows:
-            print(f"Warning: JSON input file '{input_file.name}' is empty or has no valid records. Skipping.")
-            continue
-
-        mapping, filter_spec = parse_json_mapping(str(mapping_file), input_name)
-
-        if not mapping:
-            print(f"Warning: JSON mapping file '{mapping_file.name}' is empty or invalid. Skipping.")
-            continue
-
-        validate_mapping_against_parsed_data(
-            mapping_spec=mapping,
-            input_rows=input_rows,
-            filename=input_name,
-            mapping_file=mapping_file.name,
-            input_extension="json",
+        pairs.append((object_type, input_file, mapping_file, input_name))
+
+    # A callback can't be sent to worker processes, so batches are only reported while mapping in this one
+    if workers is None or workers <= 1:
+        batch_progress, progress = progress, None
+    else:
+        batch_progress = None
+    measured = map_in_processes(
+        partial(call_measured, trace_memory=transformer_log.trace_memory),
+        [
+            (map_input_json, input_file, mapping_file, input_name, batch_progress)
+            for _, input_file, mapping_file, input_name in pairs
+        ],
+        workers=workers,
+    )
+
+    for (object_type, input_file, mapping_file, _), (objects, metrics) in zip(pairs, measured):
+        transformer_log.record_file(
+            mapping_file.name,
+            input_file=input_file.name,
+            object_type=object_type,
+            objects=len(objects) if objects is not None else 0,
+            skipped=objects is None,
+            **metrics,
         )
-
-        objects = []
-
-        nested_map_filter = None
-        if filter_spec is not None:
-            column_name = filter_spec.get("column")
-            match_value = filter_spec.get("value")
-            if column_name and match_value is not None:
-                nested_map_filter = {"path": f"{input_name}.{column_name}", "value": match_value}
-
-        for row in input_rows:
-            mapped_dictionary = nested_map(row, mapping, filter_spec=nested_map_filter)
-            if mapped_dictionary is not None:
-                objects.append(mapped_dictionary)
+        if objects is None:
+            continue
 
         results.append((object_type, objects))
         transformer_log.log(f"  {object_type}: {len(objects)} object(s) from {input_file.name}")
+        if progress is not None:
+            progress(len(objects))
 
     if results:
         total_objects = sum(len(objs) for _, objs in results)
@@ -233,3 +253,47 @@ def build_collections_from_json(data_directory: str) -> List[Tuple[str, List[Dic
         transformer_log.log(f"Total JSON objects created: {total_objects}")
 
     return results
+
+
+def map_input_json(
+    input_file: InputPath,
+    mapping_file: InputPath,
+    input_name: str,
+    progress: Optional[Callable[[int], None]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Maps every record of one JSON source file with its JSON mapping file.
+
+    Returns None if the source or mapping file is empty and should be skipped.
+    Raises ValueError for validation failures.
+    If stats and progress are given, they are used like collections.map_rows does.
+    """
+    input_file = as_input_path(input_file)
+    mapping_file = as_input_path(mapping_file)
+
+    input_rows = parse_input_json(input_file, input_name)
+
+    if not input_rows:
+        print(f"Warning: JSON input file '{input_file.name}' is empty or has no valid records. Skipping.")
+        return None
+
+    mapping, filter_spec = get_mapping_cache().get_or_parse(mapping_file, input_name, parse_json_mapping, "json")
+
+    if not mapping:
+        print(f"Warning: JSON mapping file '{mapping_file.name}' is empty or invalid. Skipping.")
+        if stats is not None:
+            stats["skipped_rows"] = stats.get("skipped_rows", 0) + len(input_rows)
+        return None
+
+    validate_mapping_against_parsed_data(
+        mapping_spec=mapping,
+        input_rows=input_rows,
+        filename=input_name,
+        mapping_file=mapping_file.name,
+        input_extension="json",
+    )
+
+    plan = get_mapping_cache().get_or_compile(mapping, build_filter_spec(filter_spec, input_name))
+
+    return map_rows_columnar(plan, input_rows, stats=stats, progress=progress)
@@ -1,31 +1,251 @@
 """
 Simple logging system for the transformer.
 Collects metrics about the transformation process.
+
+Besides free-text entries, the log keeps structured metrics:
+    stages  wall/CPU time and memory of each pipeline stage (build_collections, searching_and_assigning, ...);
+            CPU time is that of the thread running the stage
+    files   the same per input file, with its row, object and filtered/skipped row counts and rows per second
+    totals  counters summed over the run (rows, objects mapped and linked, filtered and skipped rows)
+get_metrics() returns them as a JSON-serializable dict and format_metrics() as text.
+
+Stages also record the process's peak resident set size so far (max_rss_bytes, not available on Windows). It is a
+high-water mark over the life of the process, so it is not reported per file. When the log is created with
+trace_memory=True, stages and files record peak_memory_bytes: the most Python memory allocated at once during the
+stage or file, above what was already allocated when it started (via tracemalloc, which slows the run down).
+
+transformer_log always refers to the log of the current run: the process-wide log by default, or the one
+activated with capture_transformer_log() (the API does this so concurrent transforms don't share metrics).
 """
 
-class TransformerLog:
-    """Accumulates log entries during the transformation"""
-    
+import functools
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# Counters that are summed over the per-file metrics in get_metrics()
+FILE_COUNTERS = ("rows", "objects", "filtered_rows", "skipped_rows")
+
+
+def max_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far, or None where it isn't available"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024 # Bytes on macOS, kilobytes elsewhere
+
+
+class _TracedBlock:
+    """A measure() block tracing memory, with the highest peak seen before a nested block reset tracemalloc's peak"""
+
+    __slots__ = ("peak",)
+
     def __init__(self):
-        self.entries = []
-    
+        self.peak = 0
+
+
+@contextmanager
+def measure(trace_memory: bool = False, process_peak: bool = True):
+    """
+    Measures the enclosed block, yielding a dict that is filled in when the block exits:
+    {"wall_seconds", "cpu_seconds", ["max_rss_bytes" if process_peak], ["peak_memory_bytes" if trace_memory]}
+    cpu_seconds is the CPU time of the thread running the block, so other runs in the same process aren't counted
+    (neither are worker processes, which measure their own files). max_rss_bytes is the process's peak RSS so far,
+    not the block's; peak_memory_bytes is the block's own peak allocation above what was allocated when it started,
+    also when blocks are nested
+    """
+    metrics: Dict[str, Any] = {}
+    if trace_memory:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        allocated, peak = tracemalloc.get_traced_memory()
+        # Blocks tracing memory in the current run, outermost first (tracemalloc has a single peak, shared by all)
+        traced_blocks = get_transformer_log().traced_blocks
+        for outer in traced_blocks:
+            outer.peak = max(outer.peak, peak)
+        tracemalloc.reset_peak()
+        block = _TracedBlock()
+        traced_blocks.append(block)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield metrics
+    finally:
+        metrics["wall_seconds"] = time.perf_counter() - wall_start
+        metrics["cpu_seconds"] = time.thread_time() - cpu_start
+        if process_peak:
+            rss = max_rss_bytes()
+            if rss is not None:
+                metrics["max_rss_bytes"] = rss
+        if trace_memory:
+            traced_blocks.remove(block)
+            peak = max(block.peak, tracemalloc.get_traced_memory()[1])
+            metrics["peak_memory_bytes"] = max(peak - allocated, 0)
+            if started_tracing:
+                tracemalloc.stop()
+
+
+def call_measured(fn: Callable[..., Any], *args: Any, trace_memory: bool = False):
+    """
+    Calls fn(*args, stats=stats) and returns (result, metrics), where metrics are the counts fn put in stats plus
+    measure()'s timings (and peak allocation with trace_memory). Module-level so it can run in worker processes,
+    which can't write to the parent's log; bind trace_memory with functools.partial to pass it to map_in_processes
+    """
+    stats: Dict[str, Any] = {}
+    with measure(trace_memory, process_peak=False) as metrics:
+        result = fn(*args, stats=stats)
+    return result, {**stats, **metrics}
+
+
+class TransformerLog:
+    """Accumulates log entries and metrics during the transformation"""
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.traced_blocks: List[_TracedBlock] = [] # measure() blocks of this run that are tracing memory
+        self.clear()
+
     def log(self, message: str):
         """Add a log entry"""
         self.entries.append(message)
-    
+
     def section(self, title: str):
         """Add a section header"""
         self.entries.append("")
         self.entries.append(f"=== {title} ===")
-    
+
     def get_log(self) -> str:
         """Return all log entries as a single string"""
         return "\n".join(self.entries)
-    
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measures the enclosed block as a pipeline stage; the metrics are recorded even if it raises"""
+        with measure(self.trace_memory) as metrics:
+            try:
+                yield metrics
+            finally:
+                self.stages[name] = metrics
+
+    def record_file(self, filename: str, **metrics: Any):
+        """Record (or update) the metrics of one input file"""
+        file_metrics = self.files.setdefault(filename, {})
+        file_metrics.update(metrics)
+        rows, wall = file_metrics.get("rows"), file_metrics.get("wall_seconds")
+        if rows is not None and wall:
+            file_metrics["rows_per_second"] = rows / wall
+
+    def count(self, name: str, amount: int = 1):
+        """Add to a run-wide counter, e.g. objects_linked"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return stages, per-file metrics and totals as a JSON-serializable dict"""
+        totals: Dict[str, Any] = {counter: 0 for counter in FILE_COUNTERS}
+        for file_metrics in self.files.values():
+            for counter in FILE_COUNTERS:
+                totals[counter] += file_metrics.get(counter, 0)
+        totals["objects_mapped"] = totals.pop("objects")
+        totals["skipped_files"] = sum(1 for file_metrics in self.files.values() if file_metrics.get("skipped"))
+        totals.update(self.counters)
+
+        mapping_stage = self.stages.get("build_collections")
+        if mapping_stage and mapping_stage["wall_seconds"] > 0:
+            totals["rows_per_second"] = totals["rows"] / mapping_stage["wall_seconds"]
+
+        return {
+            "stages": {name: dict(metrics) for name, metrics in self.stages.items()},
+            "files": {name: dict(metrics) for name, metrics in self.files.items()},
+            "totals": totals,
+        }
+
+    def format_metrics(self) -> str:
+        """Return the metrics as a readable block of text"""
+        metrics = self.get_metrics()
+        lines = ["", "=== Metrics ==="]
+        for name, stage in metrics["stages"].items():
+            lines.append(f"Stage {name}: {_format_timing(stage)}")
+        for name, file_metrics in metrics["files"].items():
+            counts = ", ".join(
+                f"{counter}: {file_metrics[counter]}" for counter in FILE_COUNTERS if counter in file_metrics
+            )
+            per_second = file_metrics.get("rows_per_second")
+            rate = f", {per_second:.0f} rows/s" if per_second is not None else ""
+            lines.append(f"File {name}: {_format_timing(file_metrics)}; {counts}{rate}")
+        lines.append("Totals: " + ", ".join(
+            f"{name}: {value:.0f}" if isinstance(value, float) else f"{name}: {value}"
+            for name, value in metrics["totals"].items()
+        ))
+        return "\n".join(lines)
+
     def clear(self):
-        """Clear all log entries"""
+        """Clear all log entries and metrics"""
         self.entries = []
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.counters: Dict[str, int] = {}
+
+
+def _format_timing(metrics: Dict[str, Any]) -> str:
+    text = f"{metrics.get('wall_seconds', 0):.3f}s wall, {metrics.get('cpu_seconds', 0):.3f}s CPU"
+    if "peak_memory_bytes" in metrics:
+        text += f", peak {metrics['peak_memory_bytes'] / 1048576:.1f} MiB allocated"
+    if "max_rss_bytes" in metrics:
+        text += f", process max RSS {metrics['max_rss_bytes'] / 1048576:.1f} MiB"
+    return text
+
+
+# Process-wide log, used unless a run activates its own with capture_transformer_log()
+default_transformer_log = TransformerLog()
+_active_log: ContextVar[Optional[TransformerLog]] = ContextVar("transformer_log", default=None)
+
+
+def get_transformer_log() -> TransformerLog:
+    """Return the log of the current run"""
+    return _active_log.get() or default_transformer_log
+
+
+class _CurrentTransformerLog:
+    """Forwards to get_transformer_log(), so modules can keep a module-level reference to transformer_log"""
+
+    def __getattr__(self, name: str):
+        return getattr(get_transformer_log(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(get_transformer_log(), name, value)
+
+
+@contextmanager
+def capture_transformer_log(trace_memory: bool = False):
+    """Activates a fresh TransformerLog for the current thread/context and yields it"""
+    log = TransformerLog(trace_memory=trace_memory)
+    token = _active_log.set(log)
+    try:
+        yield log
+    finally:
+        _active_log.reset(token)
+
+
+def timed_stage(name: str):
+    """Decorator recording every call of the function as stage name of the current run's log"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_transformer_log().stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
 
 
 # Global logger instance for use across the transformer
-transformer_log = TransformerLog()
+transformer_log = _CurrentTransformerLog()
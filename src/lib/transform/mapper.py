@@ -1,9 +1,9 @@
 from __future__ import annotations
+from collections.abc import Mapping
 from typing import Any, Dict, List
-from glom import glom
 from .relations import HSDS_RELATIONS
+from .mapping_cache import get_mapping_cache
 from .custom_transform.transforms_loader import TransformsRegistry
-from .custom_transform.custom_transform_error import CustomTransformError
 
 """
 NESTED_MAP: deals with layer 1 - essentially moving from a flat spreadsheet/csv into a nested format with potentially
@@ -15,10 +15,12 @@ def nested_map(data: Any, mapping_spec: Dict[str, Any],
                row_index: int | None = None
                ) -> dict | list | None:
     """
-    Process a mapping specification and transform data using glom
-    Fixed to always use the root data for path resolution - so the path doesn't get lost during 
+    Maps one row (or other data) with a mapping specification, returning None if filter_spec filters it out
+    The spec is compiled into a MappingPlan (see compiler.py for how each part of it is handled) and paths are
+    always resolved against the root data. Plans are memoised per spec, filter and registry by the mapping cache,
+    so mapping many rows with the same spec only compiles it once
     """
-    if not isinstance(data, (dict, list, tuple)):
+    if not isinstance(data, (Mapping, list, tuple)):
         """
         Checking to ensure data is the correct type
         """
@@ -32,418 +34,53 @@ def nested_map(data: Any, mapping_spec: Dict[str, Any],
     if root_data is None:
         root_data = data
         
-    # If a filter is provided, ensure this row matches before processing
-    if filter_spec is not None:
-        try:
-            filter_path = filter_spec.get("path")
-            filter_value = filter_spec.get("value")
-            if filter_path is not None:
-                actual_value = glom(root_data, filter_path, default=None)
-                # If path doesn't exist, warn that the filter column might not exist/names might mismatch
-                if actual_value is None:
-                    print(f"WARNING: Filter path '{filter_path}' returned None. Column may not exist in CSV data or has no value.")
-                # Normalize comparison - strip whitespace and convert to string
-                actual_str = str(actual_value).strip() if actual_value is not None else ""
-                filter_str = str(filter_value).strip() if filter_value is not None else ""
-                if actual_str != filter_str:
-                    return None
-        except Exception as e:
-            # If path doesn't exist or glom fails, skip this row and log the error
-            print(f"WARNING: Filter failed for path '{filter_path}' with value '{filter_value}': {e}")
-            return None
-        
-    def process_value(value, array_context=False, template=None, attributes_context=False, parent_index=None):
-        """
-        Recursively processes mapping values to transform flat CSV data into nested structures.
-        Handles three main cases: path specs (leaf data extraction), nested objects, and arrays.
-        
-        Args:
-            value: The mapping spec or data value to process (dict, list, or scalar).
-            template: The parent key name when processing a leaf path spec with split.
-                      Used to wrap split parts in objects (e.g., {name: "part"}).
-            array_context: Boolean flag indicating when currently processing inside an 
-                           array structure (ex. phones[]), handling multiple path arrays 
-                           (ex. phones[].number, phones[].name) by aligning indices.
-            attributes_context: Boolean flag indicating when currently processing 
-                                inside an attributes[] structure. Creates attribute 
-                                objects with both value and label (column name) fields.
-            parent_index: Integer index that signifies nested path arrays should only 
-                          use the path at this index over expanding all paths. 
-                          Ensures child objects align with their respective parents.
-        """
-
-        nonlocal transreg
-        
-        def is_blank(val):
-            """Check if a value is considered blank/empty and should be omitted from the generated JSON object."""
-            if val is None:
-                return True
-            if isinstance(val, str):
-                return val.strip() == ""
-            if isinstance(val, (list, dict)):
-                return len(val) == 0
-            return False
-
-        def decode_escape_sequences(s):
-            """
-            Helper to decode common escape sequences from CSV string representations.
-                Args: s: input string containing escape sequence
-            """
-            escape_map = {
-                '\\n': '\n',      # newline
-                '\\t': '\t',      # tab
-                '\\r': '\r',      # carriage return
-                '\\"': '"',       # double quote
-                "\\'": "'",       # single quote
-                '\\\\': '\\',     # backslash
-            }
-            for escaped, actual in escape_map.items():
-                s = s.replace(escaped, actual)
-            return s
-
-        def apply_strip(extracted_val, value):
-            """Apply strip characters to a single extracted value if specified."""
-            if "strip" in value and value["strip"] and isinstance(extracted_val, str):
-                strip_val = value["strip"]
-                if isinstance(strip_val, str):
-                    strip_chars = []
-                    for char in strip_val.split(';'):
-                        cleaned_char = char.strip(' ')
-                        if cleaned_char:
-                            cleaned_char = decode_escape_sequences(cleaned_char)
-                            strip_chars.append(cleaned_char)
-                else:
-                    strip_chars = strip_val
-                
-                for char_to_strip in strip_chars:
-                    extracted_val = extracted_val.replace(char_to_strip, "")
-            
-            return extracted_val
-
-        def apply_transform(val, value):
-            """Apply a named custom transform from the registry if specified."""
-            if transreg is not None and "transform" in value and value["transform"]:
-                function_name = value["transform"]
-                transform_fn = transreg.get_transform(function_name)
-                try:
-                    val = transform_fn(val)
-                except CustomTransformError:
-                    raise
-                except Exception as exc:
-                    raise CustomTransformError(
-                        "Field transformation failed.",
-                        function_name=function_name,
-                        row_index=row_index,
-                        cause=exc,
-                        mapping_path=value.get("path"),
-                    ) from exc
-            return val
-
-        # Case 1: Value is a dictionary - could be a path specification or nested object
-        if isinstance(value, dict):
-            # Case 1A: Dictionary contains a "path" key - this is a path specification for data extraction
-            if "path" in value:
-                path = value["path"]
-                
-                # Case 1A-1: Path is a list - multiple input fields (semicolon-separated in mapping file)
-                # Example: {"path": ["organizations.Phone1Number", "organizations.Phone2Number"]}
-                if isinstance(path, list):
-                    # Sub-Case 1A-1-parent: When parent_index is set, only use path at that index
-                    if parent_index is not None and parent_index < len(path):
-                        p = path[parent_index]
-                        try:
-                            val = glom(root_data, p, default=None)
-                            val = apply_strip(val, value)
-                            if val == "" or val is None:
-                                return None
-                            val = apply_transform(val, value)
-                            return val
-                        except Exception:
-                            return None
-                    
-                    # Extract values from all paths in the list, preserving None values for alignment logic
-                    extracted_values = []
-                    for p in path:
-                        try:
-                            val = glom(root_data, p, default=None)
-                            # Strip characters if specified
-                            val = apply_strip(val, value)
-                            # Convert empty strings to None for consistent filtering later
-                            if val == "" or val is None:
-                                val = None
-                            else:
-                                val = apply_transform(val, value)
-                            extracted_values.append(val)
-                        except Exception:
-                            # If path extraction fails, store None to maintain index alignment
-                            extracted_values.append(None)
-                    
-                    # Sub-Case 1A-1a: In array context (e.g., processing phones[].number)
-                    # Return all values including None to allow proper index-based alignment with other fields
-                    # Example: phones[].number and phones[].name need to align by index (0 with 0, 1 with 1)
-                    if array_context:
-                        return extracted_values
-                    # Sub-Case 1A-1b: Not in array context (e.g., processing a regular field with multiple sources)
-                    # Filter out None values and return single value if only one exists, list if multiple
-                    else:
-                        filtered = [v for v in extracted_values if v is not None]
-                        return filtered if len(filtered) > 1 else (filtered[0] if filtered else None)
-                
-                # Case 1A-2: Path is a string - single input field (existing behavior, backward compatible)
-                # Example: {"path": "organizations.organization_name"}
-                else:
-                    # Extract the value from the root data using the glom path
-                    extracted_val = glom(root_data, path, default=None)
-
-                    # Strip characters if specified
-                    extracted_val = apply_strip(extracted_val, value)
-                    
-                    # Return None for empty strings to maintain consistency with path array handling
-                    if extracted_val == "" or extracted_val is None:
-                        return None
-                    
-                    # Sub-Case 1A-2a: Path spec with split directive (comma-separated or other delimiter)
-                    # Example: {"path": "organizations.languages", "split": ","}
-                    if "split" in value and value["split"]:
-                        split_char = value["split"]
-                        if isinstance(extracted_val, str):
-                            # Split on delimiter, clean wrappers, then filter blanks.
-                            # This prevents placeholders like "{}" from becoming
-                            # array items with empty string values.
-                            parts = []
-                            for part in extracted_val.split(split_char):
-                                cleaned = part.strip().strip('{}').strip()
-                                if cleaned:
-                                    parts.append(cleaned)
-
-                            # If template is provided, wrap each part with that key (e.g., [{"name": "English"}, {"name": "Spanish"}])
-                            if template:
-                                result = [{template: part} for part in parts]
-                            else:
-                                # Otherwise return flat list of strings
-                                result = parts
-                            return apply_transform(result, value)
-
-                    # Sub-Case 1A-2b: No split directive - return value as-is
-                    extracted_val = apply_transform(extracted_val, value)
-                    return extracted_val
-            # Case 1B: Dictionary does NOT contain "path" key - this is a nested object structure
-            # Example: {"phones": [{"number": {"path": ...}, "name": {"path": ...}}]}
-            else:
-                items = list(value.items())
-
-                # Separate items into two categories:
-                # 1. Items with path arrays (multiple semicolon-separated fields)
-                # 2. Regular items (single paths or nested structures)
-                path_array_items = {}
-                regular_items = {}
-                
-                for k, v in items:
-                    # Check if this item has a path array (list of paths from semicolon-separated fields)
-                    if isinstance(v, dict) and "path" in v and isinstance(v.get("path"), list):
-                        path_array_items[k] = v
-                    else:
-                        regular_items[k] = v
-                
-                # Case 1B-1: Object contains one or more path arrays (multiple fields to align)
-                # Example: phones[].number and phones[].name both have semicolon-separated fields
-                if path_array_items:
-                    # Get all path lists and determine maximum length for alignment
-                    # This ensures we create items for all available indices across all fields
-                    all_paths = {k: v["path"] for k, v in path_array_items.items()}
-                    max_len = max(len(paths) for paths in all_paths.values())
-                    
-                    # Sub-Case 1B-1-parent: When parent_index is set, only use values at that index
-                    if parent_index is not None:
-                        item = {}
-                        for k, paths in all_paths.items():
-                            if parent_index < len(paths):
-                                p = paths[parent_index]
-                                try:
-                                    val = glom(root_data, p, default=None)
-                                    if val != "" and val is not None:
-                                        item[k] = val
-                                except Exception:
-                                    pass
-                        # Process regular items with the same parent_index
-                        for k, v in regular_items.items():
-                            processed_val = process_value(v, array_context=False, attributes_context=attributes_context, parent_index=parent_index)
-                            if not is_blank(processed_val):
-                                item[k] = processed_val
-                        # Return as single-item list since we're likely in array context
-                        return [item] if item else []
-                    
-                    # Extract all values from all path arrays, preserving index positions
-                    # aligned_values[k][i] = value at index i for field k
-                    aligned_values = {}
-                    for k, paths in all_paths.items():
-                        aligned_values[k] = []
-                        for p in paths:
-                            try:
-                                val = glom(root_data, p, default=None)
-                                # Store None for empty strings to maintain index alignment
-                                aligned_values[k].append(val if val != "" else None)
-                            except Exception:
-                                # Path extraction failed - store None to preserve index structure
-                                aligned_values[k].append(None)
-                    
-                    # Sub-Case 1B-1a: In array context - create multiple aligned items
-                    if array_context:
-                        aligned_result = []
-                        # Extract column names as labels for attributes[].value case
-                        labels = {}
-                        if attributes_context:
-                            for k, paths in all_paths.items():
-                                if k == "value":
-                                    # Extract column names from paths (remove filename prefix)
-                                    labels[k] = [p.split('.')[-1] if '.' in p else p for p in paths]
-                        
-                        # Create one item per index, aligning all fields at the same index
-                        for i in range(max_len):
-                            item = {}
-                            # Add all path array values at this index (aligned by index)
-                            for k in all_paths.keys():
-                                if i < len(aligned_values[k]) and not is_blank(aligned_values[k][i]):
-                                    # Special handling for attributes[].value: merge value and label directly into item
-                                    # Instead of creating nested structure, set both fields at the same level
-                                    if attributes_context and k == "value" and k in labels:
-                                        # Set value and label fields directly on the item (not nested under "value")
-                                        item["value"] = aligned_values[k][i]
-                                        item["label"] = labels[k][i] if i < len(labels[k]) else ""
-                                    else:
-                                        # Regular field - just store the value
-                                        item[k] = aligned_values[k][i]
-                            # Add regular items (non-path-array fields) to each aligned item
-                            # These are processed once and added to all items (e.g., a shared "type" field)
-                            if regular_items:
-                                for k, v in regular_items.items():
-                                    processed_val = process_value(v, array_context=False, attributes_context=attributes_context, parent_index=i)
-                                    if not is_blank(processed_val):
-                                        item[k] = processed_val
-                            # Only add items that have at least one non-None value
-                            if item:
-                                aligned_result.append(item)
-                        return aligned_result if aligned_result else []
-                    
-                    # Sub-Case 1B-1b: Not in array context - use first value from each path array
-                    result = {}
-                    for k in all_paths.keys():
-                        if aligned_values[k] and not is_blank(aligned_values[k][0]):
-                            result[k] = aligned_values[k][0]
-                    # Add regular items normally
-                    for k, v in regular_items.items():
-                        processed_val = process_value(v, array_context=False, attributes_context=attributes_context, parent_index=parent_index)
-                        if not is_blank(processed_val):
-                            result[k] = processed_val
-                    return result
-                
-                # Case 1B-2: Single field with path array in array context - expansion case
-                # Example: phones[].number with paths ["Phone1Number", "Phone2Number"]
-                # The path array returns a list, and we need to expand the single-item dict into multiple items
-                if array_context and len(items) == 1:
-                    k, v = items[0]
-                    # Process the value - if it's a path array, this will return a list
-                    processed = process_value(v, array_context=True, attributes_context=attributes_context, parent_index=parent_index)
-                    # If we got a list with multiple items, expand the dict into multiple dicts
-                    if isinstance(processed, list) and len(processed) > 1:
-                        # Special handling for attributes[].value: create objects with value and label
-                        if attributes_context and k == "value" and isinstance(v, dict) and "path" in v and isinstance(v.get("path"), list):
-                            # Extract labels from paths
-                            paths = v["path"]
-                            labels = [p.split('.')[-1] if '.' in p else p for p in paths]
-                            # Create attribute objects with both value and label
-                            return [{"value": val, "label": labels[i]} for i, val in enumerate(processed) if not is_blank(val) and i < len(labels)]
-                        else:
-                            # Regular expansion - just create dicts with the field and value
-                            return [{k: val} for val in processed if not is_blank(val)]
-                
-                # No path arrays - process normally
-                
-                # Determine if we're entering an array context by checking if any child is a list
-                in_array = any(isinstance(v, list) for v in value.values())
-                
-                # Recursively process all items in the nested object
-                # Pass template=k when there's a split, array_context, attributes_context, and parent_index
-                # Special handling: when key is "attributes" and value is a list, we're entering attributes context
-                # Filter out blank values - only include non-blank fields
-                result_dict = {}
-                for k, v in items:
-                    # Check if this key-value pair represents attributes[] (key is "attributes" and value is a list)
-                    # When processing the list value, we should be in attributes context
-                    is_attributes_key = (k == "attributes" and isinstance(v, list))
-                    processed_val = process_value(
-                        v,
-                        array_context=in_array,
-                        template=k if isinstance(v, dict) and "split" in v and "path" in v else None,
-                        attributes_context=is_attributes_key or attributes_context,
-                        parent_index=parent_index
-                    )
-                    if not is_blank(processed_val):
-                        result_dict[k] = processed_val
-                return result_dict
-        # Case 2: Value is a list - processing an array structure (e.g., phones[])
-        # When we encounter a list, we're definitely in an array context
-        elif isinstance(value, list):
-            # Sub-Case 2a: Special handling for split in arrays
-            # Create array of objects if split and path are present
-            if (len(value) == 1 and isinstance(value[0], dict) and len(value[0]) == 1):
-                key, val = list(value[0].items())[0]
-                if isinstance(val, dict) and "path" in val and "split" in val:
-                    # Process the path spec with split, passing the key as template to wrap results.
-                    processed = process_value(val, array_context=True, template=key, attributes_context=attributes_context, parent_index=parent_index)
-                    return processed if isinstance(processed, list) else [processed]
-            
-            # Sub-Case 2b: Process items with array_context=True, 
-            # This ensures that path arrays within array items are handled correctly
-            processed = [process_value(item, array_context=True, attributes_context=attributes_context, parent_index=parent_index) for item in value]
-
-            # Flatten if any items returned lists (from aligned path arrays)
-            flattened = []
-            for item in processed:
-                if isinstance(item, list):
-                    # Item was expanded into multiple items (from path array alignment)
-                    # Filter out blank items from the expanded list
-                    flattened.extend([i for i in item if not is_blank(i)])
-                elif not is_blank(item):  # Skip blank items
-                    flattened.append(item)
-            return flattened if flattened else []
-
-        # Case 3: Value is a primitive (string, number, bool, None, etc.)
-        # Return the value as-is - no processing needed
-        else:
-            # Return scalar
-            return value
-    
-    out = process_value(mapping_spec)
-
-    return out
+    plan = get_mapping_cache().get_or_compile(mapping_spec, filter_spec, transreg)
+    return plan.apply(root_data, row_index=row_index)
 
 """
 GET_PROCESS_ORDER: Returns the order in which the inputted mapped HSDS entities should be processed with 
 the first index representing the first entity to be processed. 
 """
 
-def get_process_order(groups: List[(str, List[Dict[str, Any]])]) -> List[str]:
-    keys = [k for (k, _) in groups]
-    order = []
-
-    if(len(keys) > 0):
-        order.append(keys[0])
-
-    for k in keys[1::]:
-        idx = len(order)
+def get_ancestors(entity: str, relations: Dict[str, List[str]] = HSDS_RELATIONS) -> frozenset:
+    """
+    Every entity reachable from entity through the relationship DAG (its parents, their parents, ...).
+    Each ancestor is visited once, however many paths lead to it
+    """
+    reached = set()
+    pending = list(relations[entity])
+    while pending:
+        ent = pending.pop()
+        if ent not in reached:
+            reached.add(ent)
+            pending.extend(relations[ent])
+    return frozenset(reached)
 
-        # Perform BFS through relationship DAG
-        edges = HSDS_RELATIONS[k]
-        while(len(edges) > 0):
-            ent = edges[0]
 
-            # Postition entity at an index that is before all its ancestors.
-            if(ent in order):
-                idx = min(idx, order.index(ent))
+def get_depths(entities: List[str], relations: Dict[str, List[str]] = HSDS_RELATIONS) -> Dict[str, int]:
+    """
+    Length of the longest path from each entity to a root of the relationship DAG, so every entity is deeper than
+    all of its ancestors. Walked depth-first in post-order, visiting each reachable entity once
+    """
+    depths: Dict[str, int] = {}
+    for entity in entities:
+        pending = [(entity, False)]
+        while pending:
+            ent, expanded = pending.pop()
+            if ent in depths:
+                continue
+            if expanded:
+                depths[ent] = 1 + max((depths[parent] for parent in relations[ent]), default=0)
+            else:
+                pending.append((ent, True))
+                pending.extend((parent, False) for parent in relations[ent] if parent not in depths)
+    return depths
 
-            edges = edges[1::] + HSDS_RELATIONS[ent]
 
-        order.insert(idx, k)
+def get_process_order(groups: List[(str, List[Dict[str, Any]])],
+                      relations: Dict[str, List[str]] = HSDS_RELATIONS) -> List[str]:
+    keys = [k for (k, _) in groups]
+    depths = get_depths(keys, relations)
 
-    return order
+    # Deepest entities first so each one comes before all its ancestors; sorted() keeps input order among ties
+    return sorted(keys, key=lambda k: -depths[k])
@@ -0,0 +1,236 @@
+"""
+MAPPING_CACHE: caches parsed mapping files (the (mapping_spec, filter_spec) tuple returned by parse_nested_mapping /
+parse_json_mapping) so a mapping file seen before is not parsed again, and the MappingPlans compiled from mapping
+specs so a spec mapped before is not compiled again.
+
+Parsed entries are keyed by a SHA-256 of the mapping file's content together with the input name (mapping paths are
+prefixed with it) and the parser kind, so an edited mapping file is a new entry and never a stale hit.
+There are two levels:
+    - an in-process LRU of up to max_entries parsed mappings
+    - an optional on-disk cache (one JSON file per entry in cache_dir), shared between processes and restarts,
+      holding up to max_disk_entries files; the least recently used files are removed first
+Compiled plans (see get_or_compile) are only kept in process, in a second LRU of up to max_entries plans keyed by a
+snapshot of the spec and filter and by the transforms registry they were compiled with.
+
+The default cache used by build_collections / build_collections_from_json is configured from the environment:
+    HSDS_MAPPING_CACHE_SIZE         in-process entries (default 128, 0 disables the cache)
+    HSDS_MAPPING_CACHE_DIR          directory for the on-disk cache (unset disables it)
+    HSDS_MAPPING_CACHE_DISK_ENTRIES files kept in the on-disk cache (default 1024)
+or with configure_mapping_cache().
+
+Cached specs and plans are shared between callers, so they must be treated as read-only (the mapping compiler never
+mutates specs and mapping a row never changes a plan).
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config import read_int_env
+from .compiler import MappingPlan, compile_mapping
+from .custom_transform.transforms_loader import TransformsRegistry
+from .parser import InputPath, as_input_path
+from .profiling import get_transform_profile
+
+# Bump when the parsed mapping format changes so old on-disk entries are ignored
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_DISK_ENTRIES = 1024
+
+ParsedMapping = Tuple[Dict[str, Any], Optional[Dict[str, Any]]]
+MappingParser = Callable[[InputPath, str], ParsedMapping]
+
+
+class MappingCache:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        cache_dir: Optional[str] = None,
+        max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.plan_hits = 0
+        self._entries: "OrderedDict[str, ParsedMapping]" = OrderedDict()
+        self._plans: "OrderedDict[Tuple[str, Optional[TransformsRegistry]], MappingPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self.cache_dir is not None
+
+    def get_or_parse(self, mapping_file: InputPath, input_name: str, parser: MappingParser, kind: str) -> ParsedMapping:
+        """
+        Returns parser(mapping_file, input_name), reusing an earlier result for a mapping file with the same content
+        kind names the parser ("csv" or "json") so both formats can share one cache
+        """
+        if not self.enabled:
+            return parser(mapping_file, input_name)
+
+        key = self.make_key(as_input_path(mapping_file).read_bytes(), input_name, kind)
+
+        with self._lock:
+            parsed = self._entries.get(key)
+            if parsed is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return parsed
+
+        parsed = self._read_disk(key)
+        if parsed is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            parsed = parser(mapping_file, input_name)
+            self._write_disk(key, parsed)
+
+        self._remember(key, parsed)
+        return parsed
+
+    def get_or_compile(
+        self,
+        mapping: Dict[str, Any],
+        filter_spec: Optional[Dict[str, Any]] = None,
+        transreg: Optional[TransformsRegistry] = None,
+    ) -> MappingPlan:
+        """
+        Returns compile_mapping(mapping, filter_spec, transreg), reusing the plan compiled for an equal spec and filter
+        with the same registry. The key is a snapshot (repr) of the spec taken on every call, so a spec changed
+        since is compiled again. Plans compiled while a profile is active are instrumented for that profile only,
+        so they are neither cached nor taken from the cache
+        """
+        if self.max_entries <= 0 or get_transform_profile() is not None:
+            return compile_mapping(mapping, filter_spec=filter_spec, transreg=transreg)
+
+        key = (repr((mapping, filter_spec)), transreg)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.plan_hits += 1
+                return plan
+
+        plan = compile_mapping(mapping, filter_spec=filter_spec, transreg=transreg)
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+        return plan
+
+    @staticmethod
+    def make_key(content: bytes, input_name: str, kind: str) -> str:
+        digest = hashlib.sha256(content)
+        digest.update(f"\0{kind}\0{input_name}\0{CACHE_FORMAT_VERSION}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def clear(self) -> None:
+        """Empties the in-process cache, including compiled plans. On-disk entries are kept"""
+        with self._lock:
+            self._entries.clear()
+            self._plans.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, parsed: ParsedMapping) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = parsed
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[ParsedMapping]:
+        if self.cache_dir is None:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            parsed = (entry["mapping"], entry["filter"])
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, unreadable or corrupt entries are treated as misses and rewritten
+            return None
+
+        try:
+            os.utime(path) # Marks the entry as recently used for eviction
+        except OSError:
+            pass
+        return parsed
+
+    def _write_disk(self, key: str, parsed: ParsedMapping) -> None:
+        if self.cache_dir is None or self.max_disk_entries <= 0:
+            return
+
+        mapping, filter_spec = parsed
+        path = self._disk_path(key)
+        partial_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(partial_path, "w", encoding="utf-8") as f:
+                json.dump({"mapping": mapping, "filter": filter_spec}, f)
+            # Atomic so processes sharing the directory never read a half-written entry
+            os.replace(partial_path, path)
+        except OSError:
+            partial_path.unlink(missing_ok=True)
+            return
+
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue # Removed by another process
+
+        excess = len(entries) - self.max_disk_entries
+        if excess <= 0:
+            return
+
+        entries.sort()
+        for _, path in entries[:excess]:
+            path.unlink(missing_ok=True)
+
+
+_default_cache: Optional[MappingCache] = None
+
+
+def get_mapping_cache() -> MappingCache:
+    """Returns the process-wide cache, creating it from the environment on first use"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = MappingCache(
+            max_entries=read_int_env("HSDS_MAPPING_CACHE_SIZE", DEFAULT_MAX_ENTRIES),
+            cache_dir=os.getenv("HSDS_MAPPING_CACHE_DIR") or None,
+            max_disk_entries=read_int_env("HSDS_MAPPING_CACHE_DISK_ENTRIES", DEFAULT_MAX_DISK_ENTRIES),
+        )
+    return _default_cache
+
+
+def configure_mapping_cache(
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    cache_dir: Optional[str] = None,
+    max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+) -> MappingCache:
+    """Replaces the process-wide cache (worker processes started afterwards still read the environment)"""
+    global _default_cache
+    _default_cache = MappingCache(max_entries=max_entries, cache_dir=cache_dir, max_disk_entries=max_disk_entries)
+    return _default_cache
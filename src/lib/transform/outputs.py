@@ -1,5 +1,18 @@
+import io
 import os
 import json
+import zipfile
+
+OUTPUT_FORMATS = ("files", "ndjson", "bundle")
+
+BUNDLE_FILENAME = "hsds_bundle.json"
+
+# Write in large blocks and without indentation so bulk outputs are cheap on network filesystems
+WRITE_BUFFER_BYTES = 1024 * 1024
+COMPACT_SEPARATORS = (",", ":")
+
+# Amount of compressed zip data collected before it is handed to the caller
+ZIP_STREAM_CHUNK_BYTES = 64 * 1024
 
 
 def save_objects_to_json(objects_data, output_dir):
@@ -16,3 +29,147 @@ def save_objects_to_json(objects_data, output_dir):
                 
                 with open(filepath, 'w', encoding='utf-8') as f:
                     json.dump(obj_dict, f, indent=2, ensure_ascii=False)
+
+
+def group_objects_by_type(objects_data):
+    """Merge repeated object types (e.g. from several input files) into {object_type: [object_lists]}."""
+    grouped = {}
+    for object_type, objects_list in objects_data:
+        grouped.setdefault(object_type, []).append(objects_list)
+    return grouped
+
+
+def iter_ndjson_lines(object_lists):
+    """Yield one compact JSON line per object that has an id."""
+    for objects_list in object_lists:
+        for obj_dict in objects_list:
+            if obj_dict.get('id'):
+                yield json.dumps(obj_dict, ensure_ascii=False, separators=COMPACT_SEPARATORS) + "\n"
+
+
+def iter_bundle_chunks(grouped):
+    """Yield the text of a {"organization": [...], ...} bundle one object at a time."""
+    yield "{"
+    for type_index, (object_type, object_lists) in enumerate(grouped.items()):
+        if type_index:
+            yield ","
+        yield json.dumps(object_type) + ":["
+        first = True
+        for objects_list in object_lists:
+            for obj_dict in objects_list:
+                if not obj_dict.get('id'):
+                    continue
+                if not first:
+                    yield ","
+                yield json.dumps(obj_dict, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+                first = False
+        yield "]"
+    yield "}"
+
+
+def save_objects_to_ndjson(objects_data, output_dir):
+    """
+    Save objects as newline-delimited JSON, one "<object_type>.ndjson" file per object type.
+    Like save_objects_to_json, objects without an id are not written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    for object_type, object_lists in group_objects_by_type(objects_data).items():
+        filepath = os.path.join(output_dir, f"{object_type}.ndjson")
+        with open(filepath, 'w', encoding='utf-8', buffering=WRITE_BUFFER_BYTES) as f:
+            f.writelines(iter_ndjson_lines(object_lists))
+
+
+def save_objects_to_bundle(objects_data, output_dir):
+    """
+    Save all objects to a single JSON file shaped like {"organization": [...], "service": [...]}.
+    Objects are streamed into the file one at a time instead of building the whole document in memory.
+    Like save_objects_to_json, objects without an id are not written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    filepath = os.path.join(output_dir, BUNDLE_FILENAME)
+    with open(filepath, 'w', encoding='utf-8', buffering=WRITE_BUFFER_BYTES) as f:
+        f.writelines(iter_bundle_chunks(group_objects_by_type(objects_data)))
+
+
+def save_objects(objects_data, output_dir, output_format="files"):
+    """
+    Save objects in the requested output format:
+    "files" (one pretty-printed JSON file per object), "ndjson" (one file per object type) or "bundle" (one file)
+    """
+    if output_format == "files":
+        save_objects_to_json(objects_data, output_dir)
+    elif output_format == "ndjson":
+        save_objects_to_ndjson(objects_data, output_dir)
+    elif output_format == "bundle":
+        save_objects_to_bundle(objects_data, output_dir)
+    else:
+        raise ValueError(f"Unknown output format '{output_format}'. Expected one of: {', '.join(OUTPUT_FORMATS)}")
+
+
+def iter_output_entries(objects_data, output_format="files"):
+    """
+    Yield (filename, text_chunks) for every file save_objects would write in the given format,
+    without touching the filesystem.
+    """
+    if output_format == "files":
+        # Later objects with the same type and id replace earlier ones, like overwriting the file on disk
+        entries = {}
+        for object_type, objects_list in objects_data:
+            for obj_dict in objects_list:
+                obj_id = obj_dict.get('id')
+                if obj_id:
+                    entries[f"{object_type}_{obj_id}.json"] = obj_dict
+        for filename, obj_dict in entries.items():
+            yield filename, [json.dumps(obj_dict, indent=2, ensure_ascii=False)]
+    elif output_format == "ndjson":
+        for object_type, object_lists in group_objects_by_type(objects_data).items():
+            yield f"{object_type}.ndjson", iter_ndjson_lines(object_lists)
+    elif output_format == "bundle":
+        yield BUNDLE_FILENAME, iter_bundle_chunks(group_objects_by_type(objects_data))
+    else:
+        raise ValueError(f"Unknown output format '{output_format}'. Expected one of: {', '.join(OUTPUT_FORMATS)}")
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink that collects zip bytes until they are drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self.size += len(b)
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def iter_zipped_objects(objects_data, output_format="files", chunk_bytes=ZIP_STREAM_CHUNK_BYTES):
+    """
+    Yield a zip archive of the objects (laid out like save_objects) as a stream of byte chunks.
+    Objects are serialized and compressed as the archive is consumed, so neither an output directory
+    nor the whole archive has to exist at once.
+    """
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as out_zip:
+        for filename, text_chunks in iter_output_entries(objects_data, output_format):
+            # Per-type and bundle entries can grow past 2 GiB, and their size isn't known up front
+            with out_zip.open(filename, "w", force_zip64=output_format != "files") as entry:
+                for text in text_chunks:
+                    entry.write(text.encode("utf-8"))
+                    if buffer.size >= chunk_bytes:
+                        yield buffer.drain()
+            if buffer.size >= chunk_bytes:
+                yield buffer.drain()
+    yield buffer.drain()
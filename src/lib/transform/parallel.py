@@ -0,0 +1,65 @@
+"""
+Helpers for spreading independent transformer work over worker processes.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+
+# Jobs submitted per worker ahead of the result being consumed, so workers never wait for the next job
+PENDING_JOBS_PER_WORKER = 2
+
+
+def map_in_processes(
+    fn: Callable[..., Any],
+    jobs: Iterable[Sequence[Any]],
+    workers: Optional[int] = None,
+) -> List[Any]:
+    """
+    Calls fn(*job) for every job and returns the results in job order, so merged output is deterministic
+    With workers > 1 (and more than one job) the calls run in a process pool; otherwise they run in this process
+    fn must be a module-level function and every job argument must be picklable
+    The first exception raised by a job is re-raised here and any jobs that haven't started are cancelled
+    """
+    jobs = list(jobs)
+    if workers is None or workers <= 1 or len(jobs) <= 1:
+        return [fn(*job) for job in jobs]
+
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+    try:
+        futures = [executor.submit(fn, *job) for job in jobs]
+        return [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def imap_in_processes(
+    fn: Callable[..., Any],
+    jobs: Iterable[Sequence[Any]],
+    workers: Optional[int] = None,
+    max_pending: Optional[int] = None,
+) -> Iterator[Any]:
+    """
+    Like map_in_processes, but jobs are taken from the iterable only as results are consumed and the results are
+    yielded in job order, so jobs can be produced lazily (e.g. chunks of a streamed file) without holding them all
+    At most max_pending jobs (by default PENDING_JOBS_PER_WORKER per worker) are submitted and not yet yielded
+    With workers <= 1 every job runs in this process when its result is requested
+    """
+    if workers is None or workers <= 1:
+        for job in jobs:
+            yield fn(*job)
+        return
+
+    if max_pending is None:
+        max_pending = workers * PENDING_JOBS_PER_WORKER
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = deque()
+        for job in jobs:
+            pending.append(executor.submit(fn, *job))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -1,24 +1,81 @@
 import csv
 import os
-from typing import Any, Dict
+import zipfile
+from pathlib import Path
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, TextIO, Union
+
+from .rows import CompactRow, iter_compact_rows
+
+# Input and mapping files can be filesystem paths or members of an open zip archive (zipfile.Path),
+# which are read straight from the archive without extracting it
+InputPath = Union[str, os.PathLike, zipfile.Path]
+
+def as_input_path(input_path: InputPath) -> Union[Path, zipfile.Path]:
+    """
+    Returns input_path as a Path, leaving zipfile.Path members as they are
+    """
+    return input_path if isinstance(input_path, zipfile.Path) else Path(input_path)
+
+def open_input_file(input_file: InputPath, newline: str | None = None) -> TextIO:
+    """
+    Opens an input or mapping file as UTF-8 text, streaming zipfile.Path members from their archive
+    """
+    if isinstance(input_file, zipfile.Path):
+        return input_file.open('r', encoding='utf-8', newline=newline)
+    return open(input_file, mode='r', newline=newline, encoding='utf-8')
+
+def iter_input_csv(input_file, filename) -> Iterator[Mapping]:
+    """
+    Generator counterpart to parse_input_csv_rows: yields one {"organization": {"columns": "value"}} row
+    per record as the file is read, so callers can map rows without holding the whole file in memory
+    Rows are CompactRows (see rows.py) sharing the file's header instead of one dict per row
+    """
+    with open_input_file(input_file, newline='') as csv_file:
+        filename = as_input_path(input_file).stem
+        yield from iter_compact_rows(filename, csv.reader(csv_file))
+
+def iter_input_csv_records(input_file, filename) -> Iterator[tuple[str, Mapping]]:
+    """
+    Like iter_input_csv, but yields (record, row) pairs where record is the raw CSV text the row was read from
+    (every line of it, with any blank lines before it, and the header for the first row), so a row can be
+    fingerprinted without serializing it again
+    """
+    with open_input_file(input_file, newline='') as csv_file:
+        lines = []
+
+        def read_lines():
+            for line in csv_file:
+                lines.append(line)
+                yield line
+
+        # csv.reader only reads the lines of the record it returns, so after every row lines holds its record
+        for row in iter_compact_rows(as_input_path(input_file).stem, csv.reader(read_lines())):
+            record = "".join(lines)
+            lines.clear()
+            yield record, row
 
 def parse_input_csv(input_file, filename) -> list:
     """
     Takes a csv file and return a list of dictionaries of the form: 
     [{"organization" : { "columns": "value"}}], where every dictionary is a row
     """
-    with open(input_file, mode='r', newline='', encoding='utf-8') as csv_file:
-        reader = csv.DictReader(csv_file)
-        
-        filename = os.path.splitext(os.path.basename(input_file))[0]
+    return [row.to_dict() if isinstance(row, CompactRow) else row for row in iter_input_csv(input_file, filename)]
 
-        input = []
-        for row in reader:
-            # Normalize header keys by trimming whitespace
-            normalized = { (k.strip() if isinstance(k, str) else k): v for k, v in row.items() }
-            input.append({filename: normalized})
+def parse_input_csv_rows(input_file, filename) -> list[Mapping]:
+    """
+    Like parse_input_csv, but the rows are read-only CompactRows sharing the file's header (see rows.py), which take
+    far less memory than dicts. Used by the transform pipeline, which only reads its rows
+    """
+    return list(iter_input_csv(input_file, filename))
 
-    return input
+def read_csv_header(input_file) -> list[str]:
+    """
+    Returns the (whitespace-trimmed) column names from the header row of a csv file
+    """
+    with open_input_file(input_file, newline='') as csv_file:
+        header = next(csv.reader(csv_file), [])
+    return [column.strip() for column in header]
 
 def parse_nested_mapping(mapping_file, filename) -> tuple[dict, dict | None]:
     """
@@ -34,7 +91,7 @@ def parse_nested_mapping(mapping_file, filename) -> tuple[dict, dict | None]:
     mapping: dict = {}
     filter_spec: dict | None = None
 
-    with open(mapping_file, 'r', newline='', encoding='utf-8') as file:
+    with open_input_file(mapping_file, newline='') as file:
         reader = csv.reader(file)
 
         # Row 1: header
@@ -172,14 +229,38 @@ def validate_mapping_against_parsed_data(
     first_row = input_rows[0]
 
     # checks if row follows structuere: { filename: {column: value, ... } }
-    # If it does, it pulls out its inner column dict
-    if isinstance(first_row, dict) and filename in first_row and isinstance(first_row[filename], dict):
-        data_row = first_row[filename]
+    # If it does, it pulls out its inner columns
+    if isinstance(first_row, CompactRow) and first_row.header.filename == filename:
+        # Compact rows share their header, so no row needs to be unpacked
+        columns = first_row.header.keys
+    elif isinstance(first_row, Mapping) and filename in first_row and isinstance(first_row[filename], Mapping):
+        columns = first_row[filename].keys()
     else:
         # if not it treats the row as the set of columns itself
-        data_row = first_row
+        columns = first_row.keys()
+
+    validate_mapping_against_columns(
+        mapping_spec=mapping_spec,
+        columns=columns,
+        filename=filename,
+        mapping_file=mapping_file,
+        input_extension=input_extension,
+    )
+
+
+def validate_mapping_against_columns(
+    mapping_spec: Dict[str, Any],
+    columns,
+    filename: str,
+    mapping_file: str,
+    input_extension: str = "csv",
+) -> None:
+    """
+    Check that every column referenced in a mapping is one of the given column names
+    (e.g. the header row of a csv that is being streamed instead of fully parsed)
+    """
 
-    original_fields = {str(k).strip() for k in data_row.keys() if str(k).strip()}
+    original_fields = {str(k).strip() for k in columns if str(k).strip()}
 
     referenced_cols: set[str] = set()
 
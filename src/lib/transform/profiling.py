@@ -0,0 +1,207 @@
+"""
+PROFILING: opt-in cost breakdown of a transform, for finding the mapping rows, relations and custom transforms that
+make a run slow.
+
+    with profile_transform() as profile:
+        collections = build_collections(data_dir)
+        searching_and_assigning(collections)
+    print(profile.format_report())
+
+While a profile is active, every plan built by compile_mapping is instrumented and linking times each relation:
+    mapping nodes      calls, total and self time (total minus nested nodes) per node, labelled by the input file
+                       and the output path, e.g. "orgs: phones[].number". Fields mapped column-at-a-time count one
+                       call per row
+    relations          lookups, matches and time of attach_original_to_targets per (child type -> parent type)
+    custom transforms  calls, errors and time per transform function (also part of their node's self time)
+
+Nothing is instrumented when no profile is active. Only work done in this process is profiled, so worker processes
+(--workers) are not covered.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+_active_profile: ContextVar[Optional["TransformProfile"]] = ContextVar("transform_profile", default=None)
+
+
+def get_transform_profile() -> Optional["TransformProfile"]:
+    """Return the active profile, or None when profiling is off"""
+    return _active_profile.get()
+
+
+@contextmanager
+def profile_transform():
+    """Activates a fresh TransformProfile for the current thread/context and yields it"""
+    profile = TransformProfile()
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+def plan_source(node) -> str:
+    """Input name of a compiled plan, taken from the first "<input>.<column>" path it reads"""
+    path = getattr(node, "path", None)
+    if isinstance(path, list):
+        path = path[0] if path else None
+    if isinstance(path, str):
+        return path.split(".", 1)[0]
+    for _, child in node.child_nodes():
+        source = plan_source(child)
+        if source:
+            return source
+    return ""
+
+
+def child_path(parent: str, key: str) -> str:
+    """Output path of a child node: phones + [] -> phones[], location + city -> location.city"""
+    if key.startswith("["):
+        return parent + key
+    return f"{parent}.{key}" if parent else key
+
+
+def node_label(source: str, path: str) -> str:
+    return f"{source}: {path}" if path else source
+
+
+class _TimedColumn:
+    """Wraps a columnar field evaluator, counting one call per row"""
+
+    def __init__(self, column, stats: List[float]):
+        self.column = column
+        self.stats = stats
+
+    def evaluate(self, rows, header):
+        start = perf_counter()
+        try:
+            return self.column.evaluate(rows, header)
+        finally:
+            elapsed = perf_counter() - start
+            self.stats[0] += len(rows)
+            self.stats[1] += elapsed
+            self.stats[2] += elapsed
+
+
+class TransformProfile:
+    """Aggregated costs of one profiled run"""
+
+    def __init__(self):
+        self.nodes: Dict[str, List[float]] = {} # label -> [calls, seconds, self seconds]
+        self.relations: Dict[str, List[float]] = {} # "child -> parent" -> [lookups, matched, seconds]
+        self.transforms: Dict[str, List[float]] = {} # function name -> [calls, errors, seconds]
+        self._stack: List[float] = [] # Time spent in nested nodes, per node being evaluated
+
+    def instrument_plan(self, plan) -> None:
+        """Times every node of a freshly compiled MappingPlan (the nodes are wrapped in place)"""
+        self._instrument_node(plan.root, plan_source(plan.root) or "mapping", "")
+
+    def _instrument_node(self, node, source: str, path: str) -> None:
+        for key, child in node.child_nodes():
+            self._instrument_node(child, source, child_path(path, key))
+        stats = self.nodes.setdefault(node_label(source, path), [0, 0.0, 0.0])
+        node.evaluate = self._timed_node(node.evaluate, stats)
+        if getattr(node, "transform_name", None) is not None:
+            node.transform = self._timed_transform(node.transform, node.transform_name)
+
+    def _timed_node(self, evaluate, stats: List[float]):
+        stack = self._stack
+
+        def timed_evaluate(root, row_index, parent_index):
+            stack.append(0.0)
+            start = perf_counter()
+            try:
+                return evaluate(root, row_index, parent_index)
+            finally:
+                elapsed = perf_counter() - start
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] += elapsed - nested
+
+        return timed_evaluate
+
+    def _timed_transform(self, transform, name: str):
+        stats = self.transforms.setdefault(name, [0, 0, 0.0])
+
+        def timed_transform(val, row_index):
+            start = perf_counter()
+            try:
+                return transform(val, row_index)
+            except Exception:
+                stats[1] += 1
+                raise
+            finally:
+                stats[0] += 1
+                stats[2] += perf_counter() - start
+
+        return timed_transform
+
+    def timed_column(self, plan, key: str, column):
+        """Wraps the column evaluator of a plan's top-level field key (see ColumnarPlan)"""
+        label = node_label(plan_source(plan.root) or "mapping", key)
+        return _TimedColumn(column, self.nodes.setdefault(label, [0, 0.0, 0.0]))
+
+    def record_relation(self, child_type: str, parent_type: str, matched: bool, seconds: float) -> None:
+        stats = self.relations.setdefault(f"{child_type} -> {parent_type}", [0, 0, 0.0])
+        stats[0] += 1
+        stats[1] += matched
+        stats[2] += seconds
+
+    def get_report(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Return every section as a JSON-serializable list, most expensive first"""
+        nodes = [
+            {"name": name, "calls": calls, "seconds": seconds, "self_seconds": self_seconds}
+            for name, (calls, seconds, self_seconds) in self.nodes.items() if calls
+        ]
+        relations = [
+            {"name": name, "lookups": lookups, "matched": matched, "seconds": seconds}
+            for name, (lookups, matched, seconds) in self.relations.items()
+        ]
+        transforms = [
+            {"name": name, "calls": calls, "errors": errors, "seconds": seconds}
+            for name, (calls, errors, seconds) in self.transforms.items() if calls
+        ]
+        return {
+            "mapping_nodes": sorted(nodes, key=lambda entry: entry["self_seconds"], reverse=True),
+            "relations": sorted(relations, key=lambda entry: entry["seconds"], reverse=True),
+            "custom_transforms": sorted(transforms, key=lambda entry: entry["seconds"], reverse=True),
+        }
+
+    def format_report(self, limit: Optional[int] = 20) -> str:
+        """Return the report as text, showing at most limit entries per section"""
+        report = self.get_report()
+        lines = ["", "=== Profile ==="]
+
+        lines.append(f"Mapping nodes (by self time): {len(report['mapping_nodes'])}")
+        lines.append(f"  {'self ms':>10}{'total ms':>10}{'calls':>10}{'us/call':>10}  node")
+        for entry in report["mapping_nodes"][:limit]:
+            lines.append(
+                f"  {entry['self_seconds'] * 1000:>10.3f}{entry['seconds'] * 1000:>10.3f}{entry['calls']:>10}"
+                f"{_per_call(entry['self_seconds'], entry['calls']):>10}  {entry['name']}"
+            )
+
+        lines.append(f"Relations: {len(report['relations'])}")
+        lines.append(f"  {'ms':>10}{'lookups':>10}{'matched':>10}{'us/call':>10}  child -> parent")
+        for entry in report["relations"][:limit]:
+            lines.append(
+                f"  {entry['seconds'] * 1000:>10.3f}{entry['lookups']:>10}{entry['matched']:>10}"
+                f"{_per_call(entry['seconds'], entry['lookups']):>10}  {entry['name']}"
+            )
+
+        lines.append(f"Custom transforms: {len(report['custom_transforms'])}")
+        lines.append(f"  {'ms':>10}{'calls':>10}{'errors':>10}{'us/call':>10}  function")
+        for entry in report["custom_transforms"][:limit]:
+            lines.append(
+                f"  {entry['seconds'] * 1000:>10.3f}{entry['calls']:>10}{entry['errors']:>10}"
+                f"{_per_call(entry['seconds'], entry['calls']):>10}  {entry['name']}"
+            )
+        return "\n".join(lines)
+
+
+def _per_call(seconds: float, calls: int) -> str:
+    return f"{seconds / calls * 1e6:.1f}" if calls else "-"
@@ -1,3 +1,6 @@
+from itertools import chain
+
+
 def is_valid_id(id_value) -> bool:
     """
     Check if an ID value is valid (non-empty, non-null, meaningful).
@@ -14,13 +17,34 @@ def is_valid_id(id_value) -> bool:
     return True
 
 
-def identify_parent_relationships(obj_dict: dict) -> list[tuple[str, str]]:
+def parent_id_fields(objects) -> list[tuple[str, str]]:
+    """
+    Every (key, parent type) pair where key is a parent_id field ('organization_id' -> 'organization')
+    found in any of the object dictionaries, in first-seen order.
+
+    Objects of one collection share their keys, so this is computed once per collection and passed to
+    identify_parent_relationships, instead of testing every key of every object.
+    """
+    keys = dict.fromkeys(chain.from_iterable(objects))
+    return [(key, key[:-3]) for key in keys if key.endswith('_id') and key != 'id']
+
+
+def identify_parent_relationships(obj_dict: dict, id_fields: list[tuple[str, str]] | None = None) -> list[tuple[str, str]]:
     """
     Given an HSDS object dictionary, identify parent relationships.
     
     Looks for all keys ending with '_id' (except the object's own 'id' field),
     validates the ID values, and returns a list of parent relationships.
+    If id_fields (from parent_id_fields) is given, only those keys are read.
     """
+    if id_fields is not None:
+        relationships = []
+        for key, parent_type in id_fields:
+            value = obj_dict.get(key)
+            if is_valid_id(value):
+                relationships.append((parent_type, str(value)))
+        return relationships
+
     # Initialize empty list for relationships
     relationships = []
     
@@ -0,0 +1,159 @@
+"""
+ROWS: memory-compact representation of parsed CSV rows.
+
+A parsed row used to be {filename: {column: value}}: one dict per row holding every header string as a key, plus a
+wrapper dict. Wide exports (150+ columns) spent most of their memory on those dicts. Instead, every row of a file
+shares one RowHeader (the column names and a column -> index lookup), and a CompactRow only holds that header and a
+tuple of values. Short values that repeat across rows ("Active", "Y", "en", ...) are shared as well.
+
+CompactRow still behaves like the old read-only {filename: {column: value}} mapping (indexing, iteration,
+equality with plain dicts, glom), so existing callers keep working. Hot paths (the mapping compiler's accessors and
+mapping validation) resolve columns through RowHeader by index instead.
+"""
+
+import operator
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import glom
+
+# Values up to this length are de-duplicated within a file; longer ones (descriptions, notes) rarely repeat
+SHARED_VALUE_MAX_LENGTH = 32
+
+
+class RowHeader:
+    """Column names of one input file, shared by all of its rows."""
+
+    __slots__ = ("filename", "columns", "keys", "index", "_path_indexes")
+
+    def __init__(self, filename: str, columns: Sequence[Any]):
+        self.filename = filename
+        # Normalize header keys by trimming whitespace
+        self.columns = tuple(column.strip() if isinstance(column, str) else column for column in columns)
+        # Like a dict built from the row, a repeated column keeps its first position and its last value
+        self.index: Dict[Any, int] = {}
+        for position, column in enumerate(self.columns):
+            self.index[column] = position
+        self.keys = tuple(self.index)
+        self._path_indexes: Dict[str, Optional[int]] = {}
+
+    def path_index(self, path: str) -> Optional[int]:
+        """
+        Returns the value index of a "<filename>.<column>" mapping path, or None if the path isn't a column of this
+        file. Every way of splitting the path is tried, so columns containing dots resolve too. Results are cached
+        """
+        try:
+            return self._path_indexes[path]
+        except KeyError:
+            pass
+
+        index = None
+        split = path.find('.')
+        while split != -1:
+            if path[:split] == self.filename:
+                index = self.index.get(path[split + 1:])
+                if index is not None:
+                    break
+            split = path.find('.', split + 1)
+
+        self._path_indexes[path] = index
+        return index
+
+    def as_dict(self, values: Sequence[Any]) -> Dict[Any, Any]:
+        return {column: values[position] for column, position in self.index.items()}
+
+
+class RowFields(Mapping):
+    """Read-only {column: value} view of a CompactRow."""
+
+    __slots__ = ("header", "values")
+
+    def __init__(self, header: RowHeader, values: Tuple[Any, ...]):
+        self.header = header
+        self.values = values
+
+    def __getitem__(self, column):
+        return self.values[self.header.index[column]]
+
+    def __contains__(self, column) -> bool:
+        return column in self.header.index
+
+    def __iter__(self):
+        return iter(self.header.keys)
+
+    def __len__(self) -> int:
+        return len(self.header.keys)
+
+    def __repr__(self) -> str:
+        return repr(self.header.as_dict(self.values))
+
+
+class CompactRow(Mapping):
+    """One parsed CSV row, read like {filename: {column: value}}."""
+
+    __slots__ = ("header", "values")
+
+    def __init__(self, header: RowHeader, values: Tuple[Any, ...]):
+        self.header = header
+        self.values = values
+
+    def __getitem__(self, filename):
+        if filename == self.header.filename:
+            return RowFields(self.header, self.values)
+        raise KeyError(filename)
+
+    def __contains__(self, filename) -> bool:
+        return filename == self.header.filename
+
+    def __iter__(self):
+        yield self.header.filename
+
+    def __len__(self) -> int:
+        return 1
+
+    def __reduce__(self):
+        return (CompactRow, (self.header, self.values))
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Dict[Any, Any]]:
+        """Returns the row as a plain {filename: {column: value}} dict"""
+        return {self.header.filename: self.header.as_dict(self.values)}
+
+
+# glom only indexes dicts by default; the glom fallback for unusual paths needs rows to be indexable too
+glom.register(CompactRow, get=operator.getitem, iterate=iter)
+glom.register(RowFields, get=operator.getitem, iterate=iter)
+
+
+def iter_compact_rows(filename: str, records: Iterable[Sequence[str]]):
+    """
+    Turns csv.reader records (header first) into rows the way csv.DictReader would: blank lines are skipped and
+    short rows are padded with None. Rows with more values than columns can't be represented compactly (DictReader
+    keeps the extras under a None key), so those are yielded as plain dicts
+    """
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return
+
+    header = RowHeader(filename, first)
+    width = len(header.columns)
+    padding = (None,) * width
+    shared_values: Dict[str, str] = {}
+    share = shared_values.setdefault
+
+    for record in records:
+        if not record:
+            continue
+        if len(record) > width:
+            row = header.as_dict(record)
+            row[None] = record[width:]
+            yield {filename: row}
+            continue
+
+        values = tuple([value if len(value) > SHARED_VALUE_MAX_LENGTH else share(value, value) for value in record])
+        if len(values) < width:
+            values += padding[len(values):]
+        yield CompactRow(header, values)
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+# The API modules import their siblings as top-level packages (uvicorn runs with --app-dir src)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from api.executor import (  # noqa: E402
+    TransformExecutor,
+    TransformExecutorSaturatedError,
+    create_transform_executor,
+)
+
+
+def test_run_returns_result_from_worker_thread():
+    executor = TransformExecutor(max_workers=1)
+
+    async def scenario():
+        return await executor.run(lambda a, b: (a + b, threading.current_thread().name), 2, 3)
+
+    total, thread_name = asyncio.run(scenario())
+    executor.shutdown()
+
+    assert total == 5
+    assert thread_name.startswith("hsds-transform")
+
+
+def test_run_rejects_when_workers_and_queue_are_full():
+    executor = TransformExecutor(max_workers=1, max_queued=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0)
+        assert executor.in_flight == 2
+
+        with pytest.raises(TransformExecutorSaturatedError):
+            await executor.run(release.wait)
+
+        release.set()
+        await asyncio.gather(running, queued)
+        # Capacity is back once the jobs finish
+        return await executor.run(lambda: "ok")
+
+    assert asyncio.run(scenario()) == "ok"
+    assert executor.in_flight == 0
+    executor.shutdown()
+
+
+def test_event_loop_stays_responsive_while_job_runs():
+    executor = TransformExecutor(max_workers=1)
+    release = threading.Event()
+
+    async def scenario():
+        job = asyncio.ensure_future(executor.run(release.wait))
+        # The loop can still serve other coroutines while the job blocks its thread
+        await asyncio.sleep(0.01)
+        assert not job.done()
+        release.set()
+        return await job
+
+    assert asyncio.run(scenario()) is True
+    executor.shutdown()
+
+
+def test_errors_propagate_and_release_the_slot():
+    executor = TransformExecutor(max_workers=1)
+
+    def fail():
+        raise ValueError("bad mapping")
+
+    async def scenario():
+        with pytest.raises(ValueError, match="bad mapping"):
+            await executor.run(fail)
+        return await executor.run(lambda: "ok")
+
+    assert asyncio.run(scenario()) == "ok"
+    executor.shutdown()
+
+
+def test_executor_reads_limits_from_environment(monkeypatch):
+    monkeypatch.setenv("HSDS_MAX_CONCURRENT_TRANSFORMS", "3")
+    monkeypatch.setenv("HSDS_MAX_QUEUED_TRANSFORMS", "0")
+
+    executor = create_transform_executor()
+    executor.shutdown()
+
+    assert (executor.max_workers, executor.max_queued) == (3, 0)
+
+
+def test_executor_rejects_invalid_environment(monkeypatch):
+    monkeypatch.setenv("HSDS_MAX_CONCURRENT_TRANSFORMS", "many")
+
+    with pytest.raises(RuntimeError, match="HSDS_MAX_CONCURRENT_TRANSFORMS"):
+        create_transform_executor()
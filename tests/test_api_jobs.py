@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import zipfile
+from datetime import timedelta
+
+import pytest
+
+# The API modules import their siblings as top-level packages (uvicorn runs with --app-dir src)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from api.executor import TransformExecutor, TransformExecutorSaturatedError  # noqa: E402
+from api.jobs import JobStore  # noqa: E402
+
+
+def wait_until_finished(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not job.is_finished:
+        assert time.monotonic() < deadline, "job did not finish in time"
+        time.sleep(0.01)
+
+
+def write_upload(job, members):
+    with zipfile.ZipFile(job.upload_path, "w") as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+
+
+def fake_transform(input_root, input_format, progress):
+    progress(stage="mapping")
+    progress(stage="linking", objects_mapped=3)
+    progress(objects_linked=1)
+    return [("organization", [{"id": "1", "name": "Acme"}]), ("location", [{"id": "2"}])]
+
+
+@pytest.fixture
+def executor():
+    executor = TransformExecutor(max_workers=1)
+    yield executor
+    executor.shutdown()
+
+
+def test_job_runs_in_background_and_writes_result(executor, tmp_path):
+    store = JobStore(executor, fake_transform, root_dir=tmp_path)
+    job = store.create_job(str(tmp_path), "csv", "files")
+    write_upload(job, {"orgs.csv": "id\n1\n"})
+
+    store.start(job)
+    wait_until_finished(job)
+
+    assert job.status == "succeeded"
+    assert (job.objects_mapped, job.objects_linked) == (3, 1)
+    assert not job.upload_path.exists()
+    with zipfile.ZipFile(job.result_path) as zf:
+        assert sorted(zf.namelist()) == ["location_2.json", "organization_1.json"]
+
+
+def test_job_reads_inputs_from_folder_inside_upload(executor, tmp_path):
+    seen = {}
+
+    def listing_transform(input_root, input_format, progress):
+        seen["files"] = sorted(p.name for p in input_root.iterdir())
+        seen["orgs"] = (input_root / "orgs.csv").read_text()
+        return []
+
+    store = JobStore(executor, listing_transform, root_dir=tmp_path)
+    job = store.create_job(str(tmp_path), "csv", "files", upload_name="dataset.zip")
+    write_upload(job, {"dataset/orgs.csv": "id\n1\n", "dataset/orgs_organization_mapping.csv": ""})
+
+    store.start(job, "dataset/")
+    wait_until_finished(job)
+
+    assert job.status == "succeeded"
+    assert seen == {"files": ["orgs.csv", "orgs_organization_mapping.csv"], "orgs": "id\n1\n"}
+
+
+def test_failed_job_records_error(executor, tmp_path):
+    def failing_transform(input_root, input_format, progress):
+        raise ValueError("Mapping references missing column")
+
+    store = JobStore(executor, failing_transform, root_dir=tmp_path)
+    job = store.create_job(str(tmp_path), "csv", "files")
+    write_upload(job, {"orgs.csv": "id\n1\n"})
+    store.start(job)
+    wait_until_finished(job)
+
+    assert job.status == "failed"
+    assert job.error == "Mapping references missing column"
+    assert not job.result_path.exists()
+
+
+def test_finished_jobs_are_evicted_after_ttl(executor, tmp_path):
+    store = JobStore(executor, fake_transform, ttl_seconds=60, root_dir=tmp_path)
+    job = store.create_job(str(tmp_path), "csv", "files")
+    write_upload(job, {"orgs.csv": "id\n1\n"})
+    store.start(job)
+    wait_until_finished(job)
+
+    assert store.evict_expired(now=job.finished_at + timedelta(seconds=59)) == 0
+    assert store.get(job.job_id) is job
+
+    assert store.evict_expired(now=job.finished_at + timedelta(seconds=60)) == 1
+    assert store.get(job.job_id) is None
+    assert not job.workspace_dir.exists()
+
+
+def test_saturated_executor_discards_job(tmp_path):
+    executor = TransformExecutor(max_workers=1)
+    store = JobStore(executor, fake_transform, root_dir=tmp_path)
+    executor._slots.acquire()  # Simulates a transform already using the only slot
+
+    job = store.create_job(str(tmp_path), "csv", "files")
+    with pytest.raises(TransformExecutorSaturatedError):
+        store.start(job)
+
+    assert store.get(job.job_id) is None
+    assert not job.workspace_dir.exists()
+    executor.shutdown()
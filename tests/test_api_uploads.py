@@ -0,0 +1,85 @@
+import asyncio
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+
+# The API modules import their siblings as top-level packages (uvicorn runs with --app-dir src)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+import api.app as app_module  # noqa: E402
+from api.validators import validate_uncompressed_size  # noqa: E402
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+def read_upload(data, filename="upload.zip"):
+    spool = io.BytesIO()
+    root = asyncio.run(app_module.read_zip_upload(UploadFile(io.BytesIO(data), filename=filename), spool))
+    return root, spool
+
+
+def test_uncompressed_size_is_capped():
+    # Highly compressible members are small on the wire but large once inflated
+    data = zip_bytes({"input/orgs.csv": "a" * 10_000, "input/orgs_organization_mapping.csv": "b" * 10_000})
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        validate_uncompressed_size(zf, 20_000)
+        with pytest.raises(HTTPException) as exc_info:
+            validate_uncompressed_size(zf, 19_999)
+    assert exc_info.value.status_code == 413
+
+
+def test_read_zip_upload_spools_and_returns_input_root():
+    data = zip_bytes({"input/orgs.csv": "id\n1\n", "input/orgs_organization_mapping.csv": "x"})
+    root, spool = read_upload(data)
+    assert root == "input/"
+    assert spool.getvalue() == data
+
+
+def test_read_zip_upload_rejects_zip_too_large_once_uncompressed(monkeypatch):
+    monkeypatch.setattr(app_module, "MAX_UNCOMPRESSED_SIZE_BYTES", 1_000)
+    with pytest.raises(HTTPException) as exc_info:
+        read_upload(zip_bytes({"orgs.csv": "a" * 1_001}))
+    assert exc_info.value.status_code == 413
+
+
+def test_api_transform_streams_csv_rows(monkeypatch):
+    calls = []
+
+    def fake_build_collections(input_dir, **kwargs):
+        calls.append(kwargs)
+        return [("organization", [{"id": "1"}])]
+
+    monkeypatch.setattr(app_module, "build_collections", fake_build_collections)
+    monkeypatch.setattr(app_module, "searching_and_assigning", lambda results, **_: results)
+    assert app_module.run_transformer("input") == [("organization", [{"id": "1"}])]
+    assert [call["streaming"] for call in calls] == [True]
+
+
+def test_run_transformer_reports_counts_during_the_run(tmp_path):
+    (tmp_path / "orgs.csv").write_text("ID\norg-1\n")
+    (tmp_path / "orgs_organization_mapping.csv").write_text("path,input_files_field,split,strip\n,,,\nid,ID,,\n")
+    (tmp_path / "locs.csv").write_text("ID,OrgID\n" + "".join(f"loc-{i},org-1\n" for i in range(5000)))
+    (tmp_path / "locs_location_mapping.csv").write_text(
+        "path,input_files_field,split,strip\n,,,\nid,ID,,\norganization_id,OrgID,,\n"
+    )
+    updates = []
+
+    app_module.run_transformer(str(tmp_path), progress=lambda **fields: updates.append(fields))
+
+    mapped = [u["objects_mapped"] for u in updates if "objects_mapped" in u]
+    linked = [u["objects_linked"] for u in updates if "objects_linked" in u]
+    # Rows are reported per batch and links every LINK_PROGRESS_INTERVAL objects, not only when each stage ends
+    assert len(mapped) > 3 and mapped == sorted(mapped) and mapped[-1] == 5001
+    assert len(linked) > 3 and linked == sorted(linked) and linked[-1] == 5000
+    assert "metrics" in updates[-1]
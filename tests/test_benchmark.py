@@ -0,0 +1,103 @@
+"""
+Tests for the synthetic dataset generator and the pipeline benchmark.
+"""
+
+import csv
+import json
+
+from click.testing import CliRunner
+
+from src.cli import benchmark
+from src.lib.benchmark.pipeline import STAGES, compare_results, run_benchmark
+from src.lib.benchmark.synthetic import DatasetConfig, generate_dataset
+from src.lib.transform.collections import build_collections, searching_and_assigning
+
+
+def test_generated_dataset_scales_with_config(tmp_path):
+    config = DatasetConfig(rows=4, columns=15, fan_out=2, path_arrays=3, splits=2)
+
+    written = generate_dataset(tmp_path, config)
+
+    assert written == {"organizations.csv": 4, "locations.csv": 4, "services.csv": 8, "phones.csv": 16}
+    with open(tmp_path / "organizations.csv", newline="") as f:
+        header = next(csv.reader(f))
+    assert len(header) == 15
+    assert {"Phone1", "Phone2", "Phone3", "Tags1", "Tags2"} <= set(header)
+    with open(tmp_path / "organizations_organization_mapping.csv", newline="") as f:
+        mapping_rows = list(csv.reader(f))
+    assert ["phones[].number", "Phone1;Phone2;Phone3", "", "", ""] in mapping_rows
+    assert ["attributes[].value", "Tags1", ",", "", ""] in mapping_rows
+
+
+def test_generated_dataset_is_reproducible(tmp_path):
+    config = DatasetConfig(rows=3, seed=7)
+    generate_dataset(tmp_path / "a", config)
+    generate_dataset(tmp_path / "b", config)
+
+    for path in (tmp_path / "a").iterdir():
+        assert path.read_bytes() == (tmp_path / "b" / path.name).read_bytes()
+
+
+def test_generated_dataset_links_into_organizations(tmp_path):
+    generate_dataset(tmp_path, DatasetConfig(rows=3, fan_out=2))
+
+    linked = dict(searching_and_assigning(build_collections(str(tmp_path))))
+
+    assert len(linked["organization"]) == 3
+    assert not linked["service"] and not linked["phone"] and not linked["location"]
+    organization = linked["organization"][0]
+    assert len(organization["services"]) == 2
+    assert len(organization["services"][0]["phones"]) == 2
+    assert len(organization["locations"]) == 1
+    assert organization["phones"] and organization["attributes"]
+
+
+def test_run_benchmark_times_every_stage(tmp_path):
+    generate_dataset(tmp_path, DatasetConfig(rows=5, fan_out=2))
+
+    results = run_benchmark(tmp_path, repeat=2, trace_memory=True)
+
+    assert list(results["stages"]) == list(STAGES)
+    assert len(results["runs"]) == 2
+    parse = results["stages"]["parse"]
+    assert parse["items"] == 5 + 5 + 10 + 20
+    assert parse["wall_seconds"]["min"] <= parse["wall_seconds"]["median"] <= parse["wall_seconds"]["max"]
+    assert parse["peak_memory_bytes"] > 0
+    assert results["stages"]["searching_and_assigning"]["objects_linked"] == 35
+    assert results["stages"]["save_objects_to_json"]["items"] == 5
+    json.dumps(results)
+
+
+def stage_results(**medians):
+    return {"stages": {stage: {"wall_seconds": {"median": seconds}} for stage, seconds in medians.items()}}
+
+
+def test_compare_results_flags_slow_stages():
+    baseline = stage_results(parse=1.0, nested_map=2.0)
+    current = stage_results(parse=1.1, nested_map=3.0)
+
+    comparison = {entry["stage"]: entry for entry in compare_results(baseline, current, max_regression=0.2)}
+
+    assert not comparison["parse"]["regressed"]
+    assert comparison["nested_map"]["regressed"]
+    assert comparison["nested_map"]["ratio"] == 1.5
+    assert comparison["total"]["current_seconds"] == 4.1
+
+
+def test_cli_writes_results_and_fails_on_regression(tmp_path):
+    runner = CliRunner()
+    output = tmp_path / "results.json"
+
+    result = runner.invoke(
+        benchmark.main, ["run", "--rows", "3", "--fan-out", "2", "--repeat", "1", "-o", str(output)]
+    )
+    assert result.exit_code == 0, result.output
+    results = json.loads(output.read_text())
+    assert results["dataset"]["synthetic"]["rows"] == 3
+
+    # A baseline that was much faster than this run makes every stage a regression
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(stage_results(**{stage: 1e-9 for stage in STAGES})))
+    result = runner.invoke(benchmark.main, ["compare", str(baseline), str(output)])
+    assert result.exit_code == 1
+    assert "REGRESSED" in result.output
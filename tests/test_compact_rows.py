@@ -0,0 +1,134 @@
+"""
+Tests for the compact row representation of parsed CSV inputs.
+"""
+
+import csv
+import io
+import pickle
+import tracemalloc
+from pathlib import Path
+
+import pytest
+from glom import glom
+
+from src.lib.transform.compiler import compile_mapping, make_accessor
+from src.lib.transform.parser import (
+    parse_input_csv,
+    parse_input_csv_rows,
+    parse_nested_mapping,
+    validate_mapping_against_parsed_data,
+)
+from src.lib.transform.rows import CompactRow, RowHeader, iter_compact_rows
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+def dict_reader_rows(text, filename):
+    """The row shape parse_input_csv returns (and the pipeline used before compact rows)"""
+    reader = csv.DictReader(io.StringIO(text, newline=""))
+    return [{filename: {(k.strip() if isinstance(k, str) else k): v for k, v in row.items()}} for row in reader]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "ID, Name ,Status\n1,Acme,Active\n2,Blueprint,Closed\n",
+        "ID,Name,Name\n1,first,second\n",  # repeated column keeps the last value
+        "ID,Name,Status\n1,Acme\n",  # short rows are padded with None
+        "ID,Name\n1,Acme,extra,values\n",  # extra values are kept under None
+        "ID,Name\n\n1,Acme\n\n",  # blank lines are skipped
+        "ID,Name\n",
+        "",
+    ],
+)
+def test_rows_match_dict_reader(tmp_path, text):
+    path = tmp_path / "orgs.csv"
+    path.write_text(text, newline="")
+
+    assert parse_input_csv_rows(str(path), "orgs") == dict_reader_rows(text, "orgs")
+    assert parse_input_csv(str(path), "orgs") == dict_reader_rows(text, "orgs")
+
+
+def test_parse_input_csv_still_returns_dicts(tmp_path):
+    path = tmp_path / "orgs.csv"
+    path.write_text("ID,Name\n1,Acme\n")
+
+    rows = parse_input_csv(str(path), "orgs")
+    rows[0]["orgs"]["Name"] = "Renamed"
+
+    assert type(rows[0]) is dict and type(rows[0]["orgs"]) is dict
+    assert rows == [{"orgs": {"ID": "1", "Name": "Renamed"}}]
+
+
+def test_rows_share_header_and_short_values(tmp_path):
+    path = tmp_path / "orgs.csv"
+    path.write_text("ID,Status\n1,Active\n2,Active\n")
+
+    first, second = parse_input_csv_rows(str(path), "orgs")
+
+    assert isinstance(first, CompactRow)
+    assert first.header is second.header
+    assert first["orgs"]["Status"] is second["orgs"]["Status"]
+
+
+def test_accessor_resolves_compact_rows_by_index():
+    row = CompactRow(RowHeader("orgs", ["ID", "Contact.Email", "Name"]), ("1", "a@b.org", "Acme"))
+
+    assert make_accessor("orgs.Name")(row) == "Acme"
+    assert make_accessor("orgs.Contact.Email")(row) == "a@b.org"
+    assert make_accessor("orgs.Missing")(row) is None
+    assert row.header.path_index("orgs.Name") == 2
+    # Paths that aren't columns still go through glom
+    assert make_accessor("orgs")(row) == {"ID": "1", "Contact.Email": "a@b.org", "Name": "Acme"}
+    assert glom(row, "orgs.ID") == "1"
+
+
+def test_plan_maps_compact_and_dict_rows_the_same():
+    input_file = DATA_DIR / "sanity_check" / "orgs.csv"
+    rows = parse_input_csv_rows(str(input_file), "orgs")
+    mapping, _ = parse_nested_mapping(str(DATA_DIR / "sanity_check" / "orgs_organization_mapping.csv"), "orgs")
+    plan = compile_mapping(mapping)
+
+    for row in rows:
+        assert isinstance(row, CompactRow)
+        assert plan.apply(row) == plan.apply(row.to_dict())
+
+
+def test_validation_reads_columns_from_header():
+    rows = list(iter_compact_rows("orgs", [["ID", "Name"], ["1", "Acme"]]))
+
+    validate_mapping_against_parsed_data({"id": {"path": "orgs.ID"}}, rows, "orgs", "m.csv")
+    with pytest.raises(ValueError, match="Email"):
+        validate_mapping_against_parsed_data({"email": {"path": "orgs.Email"}}, rows, "orgs", "m.csv")
+
+
+def test_rows_survive_pickling():
+    rows = list(iter_compact_rows("orgs", [["ID", "Name"], ["1", "Acme"], ["2", "Blueprint"]]))
+
+    restored = pickle.loads(pickle.dumps(rows))
+
+    assert restored == rows
+    assert restored[0].header is restored[1].header
+
+
+def test_wide_rows_use_far_less_memory(tmp_path):
+    columns = [f"Column {i}" for i in range(150)]
+    path = tmp_path / "wide.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in range(2000):
+            writer.writerow(["" if i % 3 else ("Y" if i % 2 else str(row)) for i in range(150)])
+
+    tracemalloc.start()
+    compact = parse_input_csv_rows(str(path), "wide")
+    compact_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    plain = dict_reader_rows(path.read_text(), "wide")
+    plain_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert compact == plain
+    assert compact_bytes * 3 < plain_bytes
@@ -0,0 +1,239 @@
+"""
+Tests for incremental re-transforms (row fingerprint store and changed-file output).
+"""
+
+import json
+import os
+
+import pytest
+
+import src.lib.transform.collections as collections_module
+from src.lib.transform.collections import (
+    build_collections,
+    searching_and_assigning,
+    searching_and_assigning_incremental,
+)
+from src.lib.transform.custom_transform.transforms_loader import TransformsRegistry
+from src.lib.transform.incremental import (
+    ObjectChanges,
+    changed_object_ids,
+    default_state_dir,
+    map_rows_incremental,
+    save_objects_incremental,
+)
+from src.lib.transform.mapping_cache import MappingCache
+from src.lib.transform.outputs import save_objects
+
+ORGS_MAPPING = "path,input_files_field,split,strip\n,,,\nid,ID,,\nname,Name,,\n"
+SERVICES_MAPPING = "path,input_files_field,split,strip\n,,,\nid,ID,,\norganization_id,OrgID,,\nname,Name,,\n"
+
+
+def write_dataset(data_dir, orgs, services):
+    data_dir.mkdir(exist_ok=True)
+    (data_dir / "orgs_organization_mapping.csv").write_text(ORGS_MAPPING)
+    (data_dir / "services_service_mapping.csv").write_text(SERVICES_MAPPING)
+    (data_dir / "orgs.csv").write_text("ID,Name\n" + "".join(f"{i},{n}\n" for i, n in orgs))
+    (data_dir / "services.csv").write_text(
+        "ID,OrgID,Name\n" + "".join(f"{i},{o},{n}\n" for i, o, n in services)
+    )
+
+
+def run(data_dir, output_dir, state_dir, output_format="files"):
+    changes = ObjectChanges()
+    results = build_collections(str(data_dir), state_dir=state_dir, changes=changes)
+    results = searching_and_assigning_incremental(results, state_dir, changes)
+    return save_objects_incremental(results, str(output_dir), state_dir, output_format=output_format)
+
+
+def read_outputs(output_dir):
+    return {name: (output_dir / name).read_text() for name in sorted(os.listdir(output_dir))}
+
+
+def full_run(data_dir, output_dir, output_format="files"):
+    save_objects(searching_and_assigning(build_collections(str(data_dir))), str(output_dir), output_format)
+    return read_outputs(output_dir)
+
+
+ORGS = [(1, "Acme"), (2, "Blueprint"), (3, "Civic")]
+SERVICES = [(101, 1, "Food"), (102, 2, "Housing"), (103, 3, "Legal")]
+
+
+def test_incremental_runs_match_full_runs(tmp_path):
+    data_dir, state_dir = tmp_path / "data", tmp_path / "state"
+    write_dataset(data_dir, ORGS, SERVICES)
+
+    assert run(data_dir, tmp_path / "out", state_dir) == {"written": 3, "unchanged": 0, "removed": 0}
+    assert read_outputs(tmp_path / "out") == full_run(data_dir, tmp_path / "full")
+
+    write_dataset(data_dir, ORGS, SERVICES[:2] + [(103, 3, "Legal Aid")])
+    run(data_dir, tmp_path / "out", state_dir)
+    assert read_outputs(tmp_path / "out") == full_run(data_dir, tmp_path / "full2")
+
+
+def test_only_changed_rows_are_mapped_and_changed_files_written(tmp_path):
+    data_dir, output_dir, state_dir = tmp_path / "data", tmp_path / "out", tmp_path / "state"
+    write_dataset(data_dir, ORGS, SERVICES)
+    run(data_dir, output_dir, state_dir)
+
+    # A changed child service only rewrites the organization it is embedded in
+    write_dataset(data_dir, ORGS, SERVICES[:2] + [(103, 3, "Legal Aid")])
+    counts = run(data_dir, output_dir, state_dir)
+
+    assert counts == {"written": 1, "unchanged": 2, "removed": 0}
+    org = json.loads((output_dir / "organization_3.json").read_text())
+    assert org["services"][0]["name"] == "Legal Aid"
+
+
+def test_removed_rows_remove_their_files(tmp_path):
+    data_dir, output_dir, state_dir = tmp_path / "data", tmp_path / "out", tmp_path / "state"
+    write_dataset(data_dir, ORGS, SERVICES)
+    run(data_dir, output_dir, state_dir)
+
+    write_dataset(data_dir, ORGS[:2], SERVICES[:2])
+    counts = run(data_dir, output_dir, state_dir)
+
+    assert counts == {"written": 0, "unchanged": 2, "removed": 1}
+    assert sorted(os.listdir(output_dir)) == ["organization_1.json", "organization_2.json"]
+
+
+def test_ndjson_output_is_only_replaced_when_changed(tmp_path):
+    data_dir, output_dir, state_dir = tmp_path / "data", tmp_path / "out", tmp_path / "state"
+    write_dataset(data_dir, ORGS, SERVICES)
+    run(data_dir, output_dir, state_dir, output_format="ndjson")
+    mtime = (output_dir / "organization.ndjson").stat().st_mtime_ns
+
+    counts = run(data_dir, output_dir, state_dir, output_format="ndjson")
+
+    assert counts["written"] == counts["removed"] == 0
+    assert (output_dir / "organization.ndjson").stat().st_mtime_ns == mtime
+    assert read_outputs(output_dir) == full_run(data_dir, tmp_path / "full", "ndjson")
+
+
+def test_unchanged_rows_are_not_mapped_again():
+    mapping = {"id": {"path": "orgs.ID"}, "name": {"path": "orgs.Name"}}
+    records = [("1,Acme\r\n", {"orgs": {"ID": "1", "Name": "Acme"}}), ("2,Blueprint\r\n", {"orgs": {"ID": "2", "Name": "Blueprint"}})]
+
+    objects, states, remapped = map_rows_incremental(records, mapping, None, {})
+    assert (objects, remapped) == ([{"id": "1", "name": "Acme"}, {"id": "2", "name": "Blueprint"}], 2)
+
+    records[1] = ("2,Blueprint Labs\r\n", {"orgs": {"ID": "2", "Name": "Blueprint Labs"}})
+    objects, new_states, remapped = map_rows_incremental(records, mapping, None, dict(states))
+
+    assert remapped == 1
+    assert objects == [{"id": "1", "name": "Acme"}, {"id": "2", "name": "Blueprint Labs"}]
+    # The old version of row 2 is no longer kept
+    assert len(new_states) == 2 and set(new_states) != set(states)
+    assert changed_object_ids(states, new_states) == {"2"}
+
+
+def test_duplicate_rows_get_separate_objects():
+    mapping = {"id": {"path": "orgs.ID"}}
+    records = [("1\r\n", {"orgs": {"ID": "1"}}), ("1\r\n", {"orgs": {"ID": "1"}})]
+    _, states, _ = map_rows_incremental(records, mapping, None, {})
+
+    objects, _, remapped = map_rows_incremental(records, mapping, None, dict(states))
+
+    assert remapped == 0
+    assert objects == [{"id": "1"}, {"id": "1"}]
+    assert objects[0] is not objects[1]
+
+
+@pytest.mark.parametrize("changed_file", ["orgs_organization_mapping.csv", "transforms.py"])
+def test_mapping_or_transform_changes_remap_every_row(tmp_path, changed_file):
+    data_dir, state_dir = tmp_path / "data", tmp_path / "state"
+    write_dataset(data_dir, ORGS, SERVICES)
+    mapping = "path,input_files_field,split,strip,transform\n,,,,\nid,ID,,,\nname,Name,,,shout\n"
+    (data_dir / "orgs_organization_mapping.csv").write_text(mapping)
+    transforms = tmp_path / "transforms.py"
+    transforms.write_text("transforms = {'shout': lambda value: value.upper()}\n")
+
+    build_collections(str(data_dir), TransformsRegistry(transforms), state_dir=state_dir)
+    if changed_file == "transforms.py":
+        transforms.write_text("transforms = {'shout': lambda value: value.upper() + '!'}\n")
+    else:
+        (data_dir / changed_file).write_text(mapping + "description,Name,,,\n")
+
+    incremental = build_collections(str(data_dir), TransformsRegistry(transforms), state_dir=state_dir)
+    full = build_collections(str(data_dir), TransformsRegistry(transforms))
+
+    assert dict(incremental) == dict(full)
+    assert dict(incremental)["organization"][0] in ({"id": "1", "name": "ACME!"}, {"id": "1", "name": "ACME", "description": "Acme"})
+
+
+def test_default_state_dir_sits_next_to_output(tmp_path):
+    assert default_state_dir(str(tmp_path / "out")) == tmp_path / ".out.hsds-state"
+
+
+def test_unchanged_rerun_maps_nothing(tmp_path, monkeypatch):
+    data_dir, output_dir, state_dir = tmp_path / "data", tmp_path / "out", tmp_path / "state"
+    write_dataset(data_dir, ORGS, SERVICES)
+    run(data_dir, output_dir, state_dir)
+    expected = full_run(data_dir, tmp_path / "full")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("an unchanged input was mapped again")
+
+    # No plan is compiled or taken from the cache, so no plan.apply can run either
+    monkeypatch.setattr(MappingCache, "get_or_compile", fail)
+    monkeypatch.setattr(collections_module, "attach_original_to_targets", fail)
+
+    assert run(data_dir, output_dir, state_dir) == {"written": 0, "unchanged": 3, "removed": 0}
+    assert read_outputs(output_dir) == expected
+
+
+def test_only_parents_of_changed_children_are_linked_again(tmp_path, monkeypatch):
+    data_dir, output_dir, state_dir = tmp_path / "data", tmp_path / "out", tmp_path / "state"
+    write_dataset(data_dir, ORGS, SERVICES)
+    run(data_dir, output_dir, state_dir)
+
+    linked = []
+    attach = collections_module.attach_original_to_targets
+
+    def record_attach(collection_map, original_type, original, relations, **kwargs):
+        linked.append((original_type, original["id"]))
+        return attach(collection_map, original_type, original, relations, **kwargs)
+
+    monkeypatch.setattr(collections_module, "attach_original_to_targets", record_attach)
+    write_dataset(data_dir, ORGS, SERVICES[:2] + [(103, 3, "Legal Aid")])
+    run(data_dir, output_dir, state_dir)
+
+    assert linked == [("service", "103")]
+    assert read_outputs(output_dir) == full_run(data_dir, tmp_path / "full")
+
+
+@pytest.mark.parametrize("orgs, services", [
+    # A service moves to another organization
+    (ORGS, [(101, 1, "Food"), (102, 1, "Housing"), (103, 3, "Legal")]),
+    # An organization disappears and its service is left on its own
+    (ORGS[1:], SERVICES),
+    # A new organization picks up a service that pointed at nothing
+    (ORGS + [(4, "Delta")], SERVICES + [(104, 4, "Transit")]),
+    # Rows are reordered, which reorders embedded services
+    (ORGS, [(102, 2, "Housing"), (101, 1, "Food"), (103, 2, "Legal")]),
+    # Duplicate ids can't be told apart, so everything is linked again
+    (ORGS + [(1, "Acme again")], SERVICES),
+])
+def test_incremental_linking_matches_full_runs(tmp_path, orgs, services):
+    data_dir, output_dir, state_dir = tmp_path / "data", tmp_path / "out", tmp_path / "state"
+    write_dataset(data_dir, ORGS, SERVICES + [(104, 4, "Transit")])
+    run(data_dir, output_dir, state_dir, output_format="ndjson")
+
+    write_dataset(data_dir, orgs, services)
+    run(data_dir, output_dir, state_dir, output_format="ndjson")
+    assert read_outputs(output_dir) == full_run(data_dir, tmp_path / "full", "ndjson")
+
+    # And once more from the state the changed run left
+    run(data_dir, output_dir, state_dir, output_format="ndjson")
+    assert read_outputs(output_dir) == full_run(data_dir, tmp_path / "full2", "ndjson")
+
+
+def test_removed_input_file_relinks_its_type(tmp_path):
+    data_dir, output_dir, state_dir = tmp_path / "data", tmp_path / "out", tmp_path / "state"
+    write_dataset(data_dir, ORGS, SERVICES)
+    run(data_dir, output_dir, state_dir)
+
+    (data_dir / "services.csv").unlink()
+    counts = run(data_dir, output_dir, state_dir)
+
+    assert counts == {"written": 3, "unchanged": 0, "removed": 0}
+    assert read_outputs(output_dir) == full_run(data_dir, tmp_path / "full")
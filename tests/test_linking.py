@@ -0,0 +1,207 @@
+"""
+Tests for linking child objects into their parents in searching_and_assigning.
+"""
+
+from src.lib.transform.collections import (
+    PARENT_LINKS,
+    ParentLink,
+    attach_original_to_targets,
+    build_collection_index,
+    find_in_collection,
+    get_parent_link,
+    remove_legacy_id_fields,
+    searching_and_assigning,
+)
+from src.lib.transform.mapper import get_ancestors, get_process_order
+from src.lib.transform.relationships import identify_parent_relationships, parent_id_fields
+
+
+def test_collection_index_matches_find_in_collection():
+    collection_map = {
+        "organization": [
+            {"name": "no id"},
+            {"id": 7, "name": "numeric id"},
+            {"id": "1", "name": "first"},
+            {"id": "1", "name": "duplicate"},
+            {"id": "2", "name": "second"},
+        ],
+        "service": [],
+    }
+
+    index = build_collection_index(collection_map)
+
+    assert set(index["organization"]) == {"1", "2"}
+    assert index["service"] == {}
+    for target_id in ("1", "2", "3"):
+        assert index["organization"].get(target_id) is find_in_collection(
+            collection_map, "organization", target_id, "id"
+        )
+
+
+def test_attach_original_uses_collection_index():
+    org = {"id": "org-1"}
+    collection_map = {"organization": [org], "location": []}
+    location = {"id": "loc-1", "organization_id": "org-1"}
+
+    embedded = attach_original_to_targets(
+        collection_map,
+        "location",
+        location,
+        [("organization", "org-1"), ("organization", "missing")],
+        collection_index={"organization": {"org-1": org}},
+    )
+
+    assert embedded == [("location", location)]
+    assert org["locations"] == [location]
+
+
+def test_searching_and_assigning_links_many_children():
+    orgs = [{"id": f"org-{i}"} for i in range(200)]
+    services = [{"id": f"svc-{i}", "organization_id": f"org-{i % 200}"} for i in range(1000)]
+
+    results = dict(searching_and_assigning([("organization", orgs), ("service", services)]))
+
+    assert results["service"] == []
+    assert len(results["organization"]) == 200
+    assert all(len(org["services"]) == 5 for org in results["organization"])
+    assert all("organization_id" not in s for org in results["organization"] for s in org["services"])
+
+
+class NoCompareDict(dict):
+    """dict that fails the test if linking ever compares objects by value"""
+
+    def __eq__(self, other):
+        raise AssertionError("embedded objects must be tracked by identity")
+
+    __hash__ = None
+
+
+def make_locations_with_phones(n_locations, phones_per_location=2):
+    locations = [NoCompareDict(id=f"loc-{i}") for i in range(n_locations)]
+    phones = [
+        NoCompareDict(id=f"phone-{i}-{j}", location_id=f"loc-{i}")
+        for i in range(n_locations)
+        for j in range(phones_per_location)
+    ]
+    return [("location", locations), ("phone", phones)]
+
+
+def test_embedded_objects_are_tracked_by_identity():
+    results = dict(searching_and_assigning(make_locations_with_phones(50)))
+
+    assert results["phone"] == []
+    assert all(len(loc["phones"]) == 2 for loc in results["location"])
+
+
+class CountingIndex(dict):
+    """Per-collection id index that counts the lookups made through it"""
+
+    lookups = 0
+
+    def get(self, key, default=None):
+        CountingIndex.lookups += 1
+        return super().get(key, default)
+
+
+def test_linking_does_constant_work_per_relation(monkeypatch):
+    """
+    Linking must find each parent with one index lookup, never by scanning a collection, so its work grows
+    linearly with the number of objects. Counted instead of timed so the check doesn't depend on the machine
+    """
+    import src.lib.transform.collections as collections_module
+
+    scans = []
+    monkeypatch.setattr(collections_module, "find_in_collection", lambda *args, **kwargs: scans.append(args))
+    monkeypatch.setattr(
+        collections_module,
+        "build_collection_index",
+        lambda collection_map: {
+            name: CountingIndex(index) for name, index in build_collection_index(collection_map).items()
+        },
+    )
+
+    for n_locations in (2000, 8000):
+        CountingIndex.lookups = 0
+        results = dict(searching_and_assigning(make_locations_with_phones(n_locations)))
+
+        assert results["phone"] == []
+        assert CountingIndex.lookups == 2 * n_locations  # one per phone
+    assert scans == []
+
+
+def test_parent_links_are_resolved_per_type_pair():
+    assert get_parent_link("phone", "location") == ParentLink("list", ("phone", "phones"))
+    assert get_parent_link("address", "location") == ParentLink("list", ("address", "addresses"))
+    assert get_parent_link("organization", "service") == ParentLink("singular", ("organization",))
+    assert get_parent_link("service_at_location", "service") == ParentLink("list", ("service_at_locations",))
+    assert get_parent_link("service_at_location", "location") == ParentLink("parent", ("location",))
+    assert get_parent_link("service_at_location", "organization") == ParentLink(None)
+    # service -> organization isn't a DAG edge, but services carry an organization_id
+    assert ("service", "organization") in PARENT_LINKS
+    assert get_parent_link("widget", "gadget") == ParentLink("list", ("widget", "widgets"))
+
+
+def test_list_links_prefer_an_existing_singular_list():
+    location = {"id": "loc-1", "phone": [{"id": "p0"}]}
+    phone = {"id": "p1", "location_id": "loc-1"}
+
+    attach_original_to_targets({"location": [location]}, "phone", phone, [("location", "loc-1")])
+
+    assert location["phone"] == [{"id": "p0"}, phone]
+    assert "phones" not in location
+
+
+def test_parent_id_fields_are_found_once_per_collection():
+    objects = [
+        {"id": "1", "location_id": "loc-1", "name": "a"},
+        {"id": "2", "service_id": "svc-1", "location_id": " "},
+    ]
+
+    id_fields = parent_id_fields(objects)
+
+    assert id_fields == [("location_id", "location"), ("service_id", "service")]
+    for obj in objects:
+        assert identify_parent_relationships(obj, id_fields) == identify_parent_relationships(obj)
+
+
+def test_legacy_id_fields_are_removed_at_every_depth():
+    shared = {"id": "loc-1", "organization_id": "org-1"}
+    objects = [{"id": "org-1", "service_id": "svc-1", "external_id": "x", "locations": [shared, [{"phone_id": "p"}]]}]
+
+    remove_legacy_id_fields([objects, {"location": shared}])
+
+    assert objects == [{"id": "org-1", "external_id": "x", "locations": [{"id": "loc-1"}, [{}]]}]
+
+
+def test_process_order_puts_children_before_their_ancestors():
+    groups = [(name, []) for name in ("service", "organization", "contact", "phone", "location", "program")]
+
+    order = get_process_order(groups)
+
+    assert order == ["phone", "contact", "location", "program", "organization", "service"]
+    assert "organization" in get_ancestors("phone")
+
+
+def test_process_order_handles_wide_relation_graphs():
+    # Every entity relates to all earlier ones; walking each path separately would take ~2^n steps
+    relations = {f"e{i}": [f"e{j}" for j in range(i)] for i in range(60)}
+    groups = [(name, []) for name in relations]
+
+    order = get_process_order(groups, relations)
+
+    assert order == [f"e{i}" for i in reversed(range(60))]
+    assert get_ancestors("e59", relations) == frozenset(f"e{i}" for i in range(59))
+
+
+def test_process_order_follows_changes_to_the_relations_dict():
+    relations = {"a": [], "b": []}
+    groups = [("a", []), ("b", [])]
+    assert get_process_order(groups, relations) == ["a", "b"]
+
+    relations["a"].append("b")
+
+    assert get_process_order(groups, relations) == ["a", "b"]
+    relations["a"].clear()
+    relations["b"].append("a")
+    assert get_process_order(groups, relations) == ["b", "a"]
+    assert get_ancestors("b", relations) == frozenset({"a"})
@@ -0,0 +1,203 @@
+"""
+Tests for the parsed mapping cache (in-process LRU and on-disk entries).
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from src.lib.transform import mapping_cache
+from src.lib.transform.collections import build_collections
+from src.lib.transform.mapping_cache import MappingCache
+from src.lib.transform.parser import parse_nested_mapping
+from src.lib.transform.profiling import profile_transform
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+MAPPING = "path,input_files_field,split,strip\n,,,\nid,ID,,\nname,Name,,\n"
+
+
+class CountingParser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, mapping_file, input_name):
+        self.calls += 1
+        return parse_nested_mapping(mapping_file, input_name)
+
+
+@pytest.fixture
+def mapping_file(tmp_path):
+    path = tmp_path / "orgs_organization_mapping.csv"
+    path.write_text(MAPPING)
+    return path
+
+
+def test_hit_skips_parsing(mapping_file):
+    cache = MappingCache()
+    parser = CountingParser()
+
+    first = cache.get_or_parse(mapping_file, "orgs", parser, "csv")
+    second = cache.get_or_parse(mapping_file, "orgs", parser, "csv")
+
+    assert first == parse_nested_mapping(mapping_file, "orgs")
+    assert second is first
+    assert (parser.calls, cache.hits, cache.misses) == (1, 1, 1)
+
+
+def test_key_covers_content_and_input_name(mapping_file):
+    cache = MappingCache()
+    parser = CountingParser()
+
+    orgs = cache.get_or_parse(mapping_file, "orgs", parser, "csv")
+    agencies = cache.get_or_parse(mapping_file, "agencies", parser, "csv")
+    mapping_file.write_text(MAPPING + "email,Email,,\n")
+    edited = cache.get_or_parse(mapping_file, "orgs", parser, "csv")
+
+    assert parser.calls == 3
+    assert agencies[0]["id"] == {"path": "agencies.ID"}
+    assert "email" in edited[0] and "email" not in orgs[0]
+
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    cache = MappingCache(max_entries=2)
+    parser = CountingParser()
+    files = []
+    for i in range(3):
+        path = tmp_path / f"m{i}_organization_mapping.csv"
+        path.write_text(MAPPING + f"extra{i},Extra,,\n")
+        files.append(path)
+
+    cache.get_or_parse(files[0], "orgs", parser, "csv")
+    cache.get_or_parse(files[1], "orgs", parser, "csv")
+    cache.get_or_parse(files[0], "orgs", parser, "csv") # files[0] becomes most recently used
+    cache.get_or_parse(files[2], "orgs", parser, "csv") # evicts files[1]
+    assert len(cache) == 2
+
+    cache.get_or_parse(files[0], "orgs", parser, "csv")
+    assert parser.calls == 3
+    cache.get_or_parse(files[1], "orgs", parser, "csv")
+    assert parser.calls == 4
+
+
+def test_disk_cache_is_shared_between_instances(mapping_file, tmp_path):
+    cache_dir = tmp_path / "cache"
+    parser = CountingParser()
+
+    first = MappingCache(cache_dir=str(cache_dir)).get_or_parse(mapping_file, "orgs", parser, "csv")
+    second_cache = MappingCache(cache_dir=str(cache_dir))
+    second = second_cache.get_or_parse(mapping_file, "orgs", parser, "csv")
+
+    assert second == first
+    assert parser.calls == 1
+    assert second_cache.disk_hits == 1
+
+
+def test_disk_cache_evicts_oldest_files(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = MappingCache(max_entries=0, cache_dir=str(cache_dir), max_disk_entries=2)
+    parser = CountingParser()
+
+    for i in range(3):
+        path = tmp_path / f"m{i}_organization_mapping.csv"
+        path.write_text(MAPPING + f"extra{i},Extra,,\n")
+        cache.get_or_parse(path, "orgs", parser, "csv")
+        # Distinct mtimes so eviction order does not depend on timestamp resolution
+        for entry in cache_dir.glob("*.json"):
+            os.utime(entry, (entry.stat().st_atime, entry.stat().st_mtime - 10))
+
+    assert len(list(cache_dir.glob("*.json"))) == 2
+    cache.get_or_parse(tmp_path / "m0_organization_mapping.csv", "orgs", parser, "csv")
+    assert parser.calls == 4
+
+
+def test_corrupt_disk_entry_is_reparsed(mapping_file, tmp_path):
+    cache_dir = tmp_path / "cache"
+    parser = CountingParser()
+    MappingCache(cache_dir=str(cache_dir)).get_or_parse(mapping_file, "orgs", parser, "csv")
+    for entry in cache_dir.glob("*.json"):
+        entry.write_text("{not json")
+
+    parsed = MappingCache(cache_dir=str(cache_dir)).get_or_parse(mapping_file, "orgs", parser, "csv")
+
+    assert parsed == parse_nested_mapping(mapping_file, "orgs")
+    assert parser.calls == 2
+
+
+def test_disabled_cache_always_parses(mapping_file):
+    cache = MappingCache(max_entries=0)
+    parser = CountingParser()
+
+    cache.get_or_parse(mapping_file, "orgs", parser, "csv")
+    cache.get_or_parse(mapping_file, "orgs", parser, "csv")
+
+    assert parser.calls == 2
+
+
+def test_build_collections_uses_default_cache(monkeypatch):
+    cache = MappingCache()
+    monkeypatch.setattr(mapping_cache, "_default_cache", cache)
+
+    first = build_collections(str(DATA_DIR / "sanity_check"))
+    second = build_collections(str(DATA_DIR / "sanity_check"))
+
+    assert second == first
+    assert cache.misses == len(list((DATA_DIR / "sanity_check").glob("*_mapping.csv")))
+    assert cache.hits == cache.misses
+
+
+def test_default_cache_reads_environment(monkeypatch, tmp_path):
+    monkeypatch.setattr(mapping_cache, "_default_cache", None)
+    monkeypatch.setenv("HSDS_MAPPING_CACHE_SIZE", "7")
+    monkeypatch.setenv("HSDS_MAPPING_CACHE_DIR", str(tmp_path / "cache"))
+
+    cache = mapping_cache.get_mapping_cache()
+
+    assert cache.max_entries == 7
+    assert cache.cache_dir == tmp_path / "cache"
+    assert mapping_cache.get_mapping_cache() is cache
+
+
+def test_misconfigured_size_fails_like_other_settings(monkeypatch):
+    monkeypatch.setattr(mapping_cache, "_default_cache", None)
+    monkeypatch.setenv("HSDS_MAPPING_CACHE_SIZE", "lots")
+
+    with pytest.raises(RuntimeError, match="HSDS_MAPPING_CACHE_SIZE"):
+        mapping_cache.get_mapping_cache()
+
+
+def test_compiled_plans_are_reused_per_spec_and_registry(mapping_file):
+    cache = MappingCache()
+    mapping, filter_spec = cache.get_or_parse(mapping_file, "orgs", parse_nested_mapping, "csv")
+    registry = object()
+
+    plan = cache.get_or_compile(mapping, filter_spec)
+
+    assert cache.get_or_compile(dict(mapping), filter_spec) is plan
+    assert cache.get_or_compile(mapping, {"path": "orgs.ID", "value": "1"}) is not plan
+    assert cache.get_or_compile(mapping, filter_spec, registry) is not plan
+    assert cache.get_or_compile({**mapping, "email": {"path": "orgs.Email"}}, filter_spec) is not plan
+    assert cache.plan_hits == 1
+    # Profiled runs instrument their own plans
+    with profile_transform():
+        assert cache.get_or_compile(mapping, filter_spec) is not plan
+    assert MappingCache(max_entries=0).get_or_compile(mapping, filter_spec) is not plan
+
+
+def test_build_collections_compiles_each_mapping_once(monkeypatch):
+    cache = MappingCache()
+    monkeypatch.setattr(mapping_cache, "_default_cache", cache)
+    compiled = []
+    compile_mapping = mapping_cache.compile_mapping
+
+    def counting_compile(*args, **kwargs):
+        compiled.append(args)
+        return compile_mapping(*args, **kwargs)
+
+    monkeypatch.setattr(mapping_cache, "compile_mapping", counting_compile)
+
+    first = build_collections(str(DATA_DIR / "sanity_check"), chunk_size=1)
+    second = build_collections(str(DATA_DIR / "sanity_check"), chunk_size=1)
+
+    assert second == first
+    assert len(compiled) == cache.misses == len(list((DATA_DIR / "sanity_check").glob("*_mapping.csv")))
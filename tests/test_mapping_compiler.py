@@ -0,0 +1,123 @@
+"""
+Tests for compiling mapping specs into reusable MappingPlans.
+"""
+
+from pathlib import Path
+
+from src.lib.transform import mapping_cache
+from src.lib.transform.compiler import build_filter_spec, compile_mapping, make_accessor
+from src.lib.transform.mapper import nested_map
+from src.lib.transform.parser import parse_input_csv_rows, parse_nested_mapping
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+def load(dataset, input_name, object_type):
+    rows = parse_input_csv_rows(str(DATA_DIR / dataset / f"{input_name}.csv"), input_name)
+    mapping, filter_spec = parse_nested_mapping(
+        str(DATA_DIR / dataset / f"{input_name}_{object_type}_mapping.csv"), input_name
+    )
+    return rows, mapping, filter_spec
+
+
+def test_plan_matches_nested_map_on_sanity_check():
+    rows, mapping, filter_spec = load("sanity_check", "orgs", "organization")
+    nested_filter = build_filter_spec(filter_spec, "orgs")
+    plan = compile_mapping(mapping, filter_spec=nested_filter)
+
+    for row in rows:
+        assert plan.apply(row) == nested_map(row, mapping, filter_spec=nested_filter)
+
+
+def test_plan_applies_filter():
+    mapping = {"id": {"path": "orgs.ID"}}
+    plan = compile_mapping(
+        mapping,
+        filter_spec=build_filter_spec({"column": "Status", "value": "Active"}, "orgs"),
+    )
+
+    assert plan.apply({"orgs": {"ID": "1", "Status": " Active "}}) == {"id": "1"}
+    assert plan.apply({"orgs": {"ID": "2", "Status": "Closed"}}) is None
+
+
+def test_build_filter_spec_requires_column_and_value():
+    assert build_filter_spec(None, "orgs") is None
+    assert build_filter_spec({"column": "", "value": "x"}, "orgs") is None
+    assert build_filter_spec({"column": "Status", "value": "Active"}, "orgs") == {
+        "path": "orgs.Status",
+        "value": "Active",
+    }
+
+
+def test_transforms_are_bound_once_per_plan():
+    lookups = []
+
+    class CountingRegistry:
+        def get_transform(self, name):
+            lookups.append(name)
+            return str.upper
+
+    mapping = {"name": {"path": "orgs.name", "transform": "upper"}}
+    plan = compile_mapping(mapping, transreg=CountingRegistry())
+
+    assert plan.apply({"orgs": {"name": "acme"}}) == {"name": "ACME"}
+    assert plan.apply({"orgs": {"name": "blueprint"}}) == {"name": "BLUEPRINT"}
+    assert lookups == ["upper"]
+
+
+def test_strip_directive_is_decoded_at_compile_time():
+    mapping = {"description": {"path": "orgs.description", "strip": "<p>;</p>;\\n"}}
+    plan = compile_mapping(mapping)
+
+    assert plan.apply({"orgs": {"description": "<p>Line\n</p>"}}) == {"description": "Line"}
+
+
+def test_accessor_resolves_two_level_rows_directly():
+    accessor = make_accessor("orgs.name")
+
+    assert accessor({"orgs": {"name": "Acme"}}) == "Acme"
+    assert accessor({"orgs": {"other": "Acme"}}) is None
+
+
+def test_accessor_handles_columns_with_dots_and_spaces():
+    row = {"orgs": {"Contact.Email": "a@b.org", "Agency Name": "Acme"}}
+
+    assert make_accessor("orgs.Contact.Email")(row) == "a@b.org"
+    assert make_accessor("orgs.Agency Name")(row) == "Acme"
+
+
+def test_accessor_falls_back_to_glom_for_nested_inputs():
+    row = {"orgs": {"contact": {"email": "a@b.org"}}}
+
+    assert make_accessor("orgs.contact.email")(row) == "a@b.org"
+    assert make_accessor("orgs.contact.phone")(row) is None
+
+
+def test_plan_maps_dotted_column_names(tmp_path):
+    (tmp_path / "orgs.csv").write_text("ID,Org.Name\n1,Acme\n")
+    (tmp_path / "orgs_organization_mapping.csv").write_text(
+        "path,input_files_field,split,strip\n,,,\nid,ID,,\nname,Org.Name,,\n"
+    )
+    rows = parse_input_csv_rows(str(tmp_path / "orgs.csv"), "orgs")
+    mapping, _ = parse_nested_mapping(str(tmp_path / "orgs_organization_mapping.csv"), "orgs")
+
+    assert compile_mapping(mapping).apply(rows[0]) == {"id": "1", "name": "Acme"}
+
+
+def test_nested_map_compiles_each_spec_once(monkeypatch):
+    monkeypatch.setattr(mapping_cache, "_default_cache", mapping_cache.MappingCache())
+    compiled = []
+    compile_mapping_once = mapping_cache.compile_mapping
+
+    def counting_compile(*args, **kwargs):
+        compiled.append(args)
+        return compile_mapping_once(*args, **kwargs)
+
+    monkeypatch.setattr(mapping_cache, "compile_mapping", counting_compile)
+    rows, mapping, filter_spec = load("sanity_check", "orgs", "organization")
+    nested_filter = build_filter_spec(filter_spec, "orgs")
+
+    mapped = [nested_map(row, mapping, filter_spec=nested_filter) for row in rows * 3]
+
+    assert mapped == [compile_mapping(mapping, filter_spec=nested_filter).apply(row) for row in rows * 3]
+    assert len(compiled) == 1
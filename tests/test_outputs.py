@@ -0,0 +1,103 @@
+"""
+Tests for writing transformed objects to disk.
+"""
+
+import json
+
+import pytest
+
+from src.lib.transform.outputs import (
+    BUNDLE_FILENAME,
+    save_objects,
+    save_objects_to_bundle,
+    save_objects_to_json,
+    save_objects_to_ndjson,
+)
+
+OBJECTS = [
+    ("organization", [{"id": "1", "name": "Acmé"}, {"name": "no id"}]),
+    ("service", [{"id": "s1", "name": "Food"}]),
+    ("organization", [{"id": "2", "name": "Blueprint"}]),
+]
+
+
+def read_per_object_files(output_dir):
+    return {p.name: json.loads(p.read_text(encoding="utf-8")) for p in output_dir.iterdir()}
+
+
+def test_ndjson_writes_one_compact_file_per_type(tmp_path):
+    save_objects_to_ndjson(OBJECTS, tmp_path)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["organization.ndjson", "service.ndjson"]
+    lines = (tmp_path / "organization.ndjson").read_text(encoding="utf-8").splitlines()
+    assert lines == ['{"id":"1","name":"Acmé"}', '{"id":"2","name":"Blueprint"}']
+
+
+def test_ndjson_overwrites_previous_runs(tmp_path):
+    save_objects_to_ndjson(OBJECTS, tmp_path)
+    save_objects_to_ndjson(OBJECTS, tmp_path)
+
+    assert len((tmp_path / "organization.ndjson").read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_bundle_groups_objects_by_type(tmp_path):
+    save_objects_to_bundle(OBJECTS, tmp_path)
+
+    bundle = json.loads((tmp_path / BUNDLE_FILENAME).read_text(encoding="utf-8"))
+    assert bundle == {
+        "organization": [{"id": "1", "name": "Acmé"}, {"id": "2", "name": "Blueprint"}],
+        "service": [{"id": "s1", "name": "Food"}],
+    }
+
+
+def test_bundle_of_empty_results_is_valid_json(tmp_path):
+    save_objects_to_bundle([("organization", [])], tmp_path)
+
+    assert json.loads((tmp_path / BUNDLE_FILENAME).read_text()) == {"organization": []}
+
+
+def test_all_formats_contain_the_same_objects(tmp_path):
+    save_objects_to_json(OBJECTS, tmp_path / "files")
+    save_objects(OBJECTS, tmp_path / "ndjson", output_format="ndjson")
+
+    per_object = sorted(read_per_object_files(tmp_path / "files").values(), key=lambda o: o["id"])
+    from_ndjson = sorted(
+        (json.loads(line) for p in (tmp_path / "ndjson").iterdir() for line in p.read_text(encoding="utf-8").splitlines()),
+        key=lambda o: o["id"],
+    )
+    assert from_ndjson == per_object
+
+
+def test_save_objects_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError, match="Unknown output format"):
+        save_objects(OBJECTS, tmp_path, output_format="xml")
+
+
+@pytest.mark.parametrize("output_format", ["files", "ndjson", "bundle"])
+def test_zipped_objects_match_saved_files(tmp_path, output_format):
+    import io
+    import zipfile
+
+    from src.lib.transform.outputs import iter_zipped_objects
+
+    save_objects(OBJECTS, tmp_path, output_format=output_format)
+    chunks = list(iter_zipped_objects(OBJECTS, output_format=output_format, chunk_bytes=16))
+
+    assert len(chunks) > 1
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        zipped = {name: zf.read(name) for name in zf.namelist()}
+    assert zipped == {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+
+
+def test_zipped_objects_keep_last_object_for_duplicate_ids():
+    import io
+    import zipfile
+
+    from src.lib.transform.outputs import iter_zipped_objects
+
+    objects = [("organization", [{"id": "1", "name": "old"}, {"id": "1", "name": "new"}])]
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(iter_zipped_objects(objects)))) as zf:
+        assert zf.namelist() == ["organization_1.json"]
+        assert json.loads(zf.read("organization_1.json"))["name"] == "new"
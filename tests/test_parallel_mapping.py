@@ -0,0 +1,172 @@
+"""
+Tests for mapping input files across worker processes.
+"""
+
+import json
+import pickle
+import shutil
+from pathlib import Path
+
+import pytest
+
+import src.lib.transform.collections as collections_module
+from src.lib.transform.collections import build_collections
+from src.lib.transform.custom_transform.custom_transform_error import CustomTransformError
+from src.lib.transform.custom_transform.transforms_loader import TransformsRegistry
+from src.lib.transform.json_collections import build_collections_from_json
+from src.lib.transform.parallel import imap_in_processes, map_in_processes
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+TRANSFORMS_MODULE = DATA_DIR / "transform_test" / "transforms.py"
+
+
+def fail_on_negative(value):
+    if value < 0:
+        raise ValueError(f"negative value: {value}")
+    return value * 2
+
+
+def test_map_in_processes_keeps_job_order():
+    jobs = [(n,) for n in range(10)]
+
+    assert map_in_processes(fail_on_negative, jobs, workers=3) == [n * 2 for n in range(10)]
+    assert map_in_processes(fail_on_negative, jobs) == [n * 2 for n in range(10)]
+
+
+def test_imap_in_processes_bounds_jobs_in_flight():
+    taken = []
+
+    def jobs():
+        for n in range(20):
+            taken.append(n)
+            yield (n,)
+
+    results = []
+    for result in imap_in_processes(fail_on_negative, jobs(), workers=2, max_pending=3):
+        # Jobs are only taken from the iterable as results are consumed
+        assert len(taken) - len(results) <= 3
+        results.append(result)
+
+    assert results == [n * 2 for n in range(20)]
+
+
+def test_map_in_processes_reraises_worker_errors():
+    with pytest.raises(ValueError, match="negative value: -1"):
+        map_in_processes(fail_on_negative, [(1,), (-1,), (2,)], workers=2)
+
+
+@pytest.mark.parametrize("dataset", ["wellskydata", "florida_data", "sanity_check"])
+def test_parallel_build_collections_matches_serial(dataset):
+    serial = build_collections(str(DATA_DIR / dataset))
+    parallel = build_collections(str(DATA_DIR / dataset), workers=4)
+
+    assert parallel == serial
+
+
+def test_transforms_registry_is_reloaded_from_its_module_path():
+    registry = TransformsRegistry(TRANSFORMS_MODULE)
+
+    restored = pickle.loads(pickle.dumps(registry))
+
+    assert restored.module_path == registry.module_path
+    assert restored.get_transform("title_case")("acme nonprofit") == "Acme Nonprofit"
+
+
+def test_parallel_build_collections_applies_custom_transforms(tmp_path):
+    for name in ("organizations.csv", "organizations_organization_mapping.csv"):
+        shutil.copy(DATA_DIR / "transform_test" / name, tmp_path / name)
+        shutil.copy(DATA_DIR / "transform_test" / name, tmp_path / name.replace("organizations", "agencies"))
+    registry = TransformsRegistry(TRANSFORMS_MODULE)
+
+    serial = build_collections(str(tmp_path), custom_transforms_registry=registry)
+    parallel = build_collections(str(tmp_path), custom_transforms_registry=registry, workers=2)
+
+    assert len(parallel) == 2
+    assert parallel == serial
+    assert all(objs[0]["name"] == "Acme Nonprofit" for _, objs in parallel)
+
+
+def test_parallel_build_collections_from_json_matches_serial(tmp_path):
+    for name in ("orgs", "agencies"):
+        (tmp_path / f"{name}.json").write_text(json.dumps([{"ID": "1", "Name": name}, {"ID": "2", "Name": "x"}]))
+        (tmp_path / f"{name}_organization_mapping.json").write_text(json.dumps({
+            "mappings": [
+                {"output_path": "id", "input_path": "ID"},
+                {"output_path": "name", "input_path": "Name"},
+            ]
+        }))
+
+    serial = build_collections_from_json(str(tmp_path))
+    parallel = build_collections_from_json(str(tmp_path), workers=2)
+
+    assert len(parallel) == 2
+    assert parallel == serial
+
+
+@pytest.mark.parametrize("dataset", ["iCarol", "wellskydata", "split_test", "sanity_check"])
+@pytest.mark.parametrize("streaming", [False, True])
+def test_chunked_build_collections_matches_serial(dataset, streaming):
+    serial = build_collections(str(DATA_DIR / dataset))
+    chunked = build_collections(str(DATA_DIR / dataset), streaming=streaming, workers=3, chunk_size=2)
+
+    assert chunked == serial
+
+
+def test_chunked_mapping_reports_serial_row_index(tmp_path):
+    rows = "\n".join(f"{i},name-{i}" for i in range(25))
+    (tmp_path / "orgs.csv").write_text(f"ID,Name\n{rows}\n")
+    (tmp_path / "orgs_organization_mapping.csv").write_text(
+        "path,input_files_field,split,strip,transform\n,,,,\nid,ID,,,\nname,Name,,,check_name\n"
+    )
+    transforms = tmp_path / "transforms.py"
+    transforms.write_text(
+        "def check_name(value):\n"
+        "    if value == 'name-17':\n"
+        "        raise ValueError('bad name')\n"
+        "    return value\n"
+        "\n"
+        "transforms = {'check_name': check_name}\n"
+    )
+
+    with pytest.raises(CustomTransformError) as exc:
+        build_collections(
+            str(tmp_path),
+            custom_transforms_registry=TransformsRegistry(transforms),
+            workers=3,
+            chunk_size=4,
+        )
+
+    assert exc.value.row_index == 17
+    assert exc.value.function_name == "check_name"
+
+
+def test_streamed_chunks_are_read_as_they_are_mapped(tmp_path, monkeypatch):
+    rows = "\n".join(f"{i},name-{i}" for i in range(100))
+    (tmp_path / "orgs.csv").write_text(f"ID,Name\n{rows}\n")
+    (tmp_path / "orgs_organization_mapping.csv").write_text("path,input_files_field\n,\nid,ID\nname,Name\n")
+    expected = build_collections(str(tmp_path))
+
+    rows_read = 0
+    iter_input_csv = collections_module.iter_input_csv
+
+    def counting_iter_input_csv(*args):
+        nonlocal rows_read
+        for row in iter_input_csv(*args):
+            rows_read += 1
+            yield row
+
+    map_rows = collections_module.map_rows
+    rows_read_per_chunk = []
+
+    def recording_map_rows(input_rows, *args, **kwargs):
+        rows_read_per_chunk.append(rows_read)
+        return map_rows(input_rows, *args, **kwargs)
+
+    monkeypatch.setattr(collections_module, "iter_input_csv", counting_iter_input_csv)
+    monkeypatch.setattr(collections_module, "map_rows", recording_map_rows)
+
+    chunked = build_collections(str(tmp_path), streaming=True, chunk_size=10)
+
+    assert chunked == expected
+    # Each chunk is mapped before the next one is read, instead of after the whole file
+    assert rows_read_per_chunk == [10 * n for n in range(1, 11)]
@@ -0,0 +1,120 @@
+"""
+Tests for the opt-in transform profile (mapping nodes, relations and custom transforms).
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from src.cli.main import main
+from src.lib.transform.collections import build_collections, searching_and_assigning
+from src.lib.transform.columnar import map_rows_columnar
+from src.lib.transform.compiler import compile_mapping
+from src.lib.transform.custom_transform.custom_transform_error import CustomTransformError
+from src.lib.transform.custom_transform.transforms_loader import TransformsRegistry
+from src.lib.transform.profiling import get_transform_profile, profile_transform
+from src.lib.transform.rows import iter_compact_rows
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+class Registry:
+    def get_transform(self, name):
+        def upper(value):
+            if value == "fail":
+                raise ValueError(value)
+            return value.upper()
+
+        return upper
+
+
+def entries(report, section):
+    return {entry["name"]: entry for entry in report[section]}
+
+
+def test_profile_is_only_active_inside_the_context():
+    assert get_transform_profile() is None
+    with profile_transform() as profile:
+        assert get_transform_profile() is profile
+    assert get_transform_profile() is None
+
+    plan = compile_mapping({"id": {"path": "orgs.ID"}})
+    assert "evaluate" not in vars(plan.root)
+
+
+def test_nodes_are_labelled_by_input_and_output_path():
+    rows = list(iter_compact_rows("orgs", [["ID", "Phone1", "Phone2", "Name"], ["1", "555", "777", "acme"]]))
+    mapping = {
+        "id": {"path": "orgs.ID"},
+        "phones": [{"number": {"path": ["orgs.Phone1", "orgs.Phone2"]}}],
+        "name": {"path": "orgs.Name", "transform": "upper"},
+    }
+    expected = map_rows_columnar(compile_mapping(mapping, transreg=Registry()), rows)
+
+    with profile_transform() as profile:
+        mapped = map_rows_columnar(compile_mapping(mapping, transreg=Registry()), rows * 3)
+
+    assert mapped == expected * 3
+    nodes = entries(profile.get_report(), "mapping_nodes")
+    # id is mapped column-at-a-time: one call per row
+    assert nodes["orgs: id"]["calls"] == 3
+    assert nodes["orgs: phones"]["calls"] == 3
+    assert nodes["orgs: phones[]"]["calls"] == 3
+    assert nodes["orgs: name"]["calls"] == 3
+    # The list's self time excludes the aligned object evaluated inside it
+    assert nodes["orgs: phones"]["self_seconds"] <= nodes["orgs: phones"]["seconds"]
+    assert entries(profile.get_report(), "custom_transforms")["upper"]["calls"] == 3
+
+
+def test_transform_errors_are_counted():
+    rows = list(iter_compact_rows("orgs", [["Name"], ["ok"], ["fail"]]))
+    with profile_transform() as profile:
+        plan = compile_mapping({"name": {"path": "orgs.Name", "transform": "upper"}}, transreg=Registry())
+        with pytest.raises(CustomTransformError):
+            map_rows_columnar(plan, rows)
+
+    transform = entries(profile.get_report(), "custom_transforms")["upper"]
+    assert (transform["calls"], transform["errors"]) == (2, 1)
+
+
+@pytest.mark.parametrize("dataset", ["sanity_check", "transform_test", "wellskydata"])
+def test_profiled_run_matches_plain_run(dataset):
+    transforms = DATA_DIR / dataset / "transforms.py"
+    registry = TransformsRegistry(transforms) if transforms.exists() else None
+
+    expected = searching_and_assigning(build_collections(str(DATA_DIR / dataset), registry))
+    with profile_transform() as profile:
+        profiled = searching_and_assigning(build_collections(str(DATA_DIR / dataset), registry))
+
+    assert profiled == expected
+    assert profile.get_report()["mapping_nodes"]
+
+
+def test_relations_are_counted_per_child_and_parent_type():
+    with profile_transform() as profile:
+        searching_and_assigning(build_collections(str(DATA_DIR / "sanity_check")))
+
+    relations = entries(profile.get_report(), "relations")
+    assert relations["service -> organization"]["lookups"] == 2
+    assert relations["service -> organization"]["matched"] == 2
+    assert relations["program -> service"]["lookups"] == 1
+    assert "=== Profile ===" in profile.format_report()
+
+
+def test_cli_writes_profile_json(tmp_path):
+    profile_file = tmp_path / "profile.json"
+
+    result = CliRunner().invoke(
+        main,
+        [str(DATA_DIR / "sanity_check"), "-o", str(tmp_path / "out"), "--workers", "2", "--profile",
+         "--profile-json", str(profile_file)],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "=== Profile ===" in result.output
+    assert "--workers is ignored" in result.output
+    report = json.loads(profile_file.read_text())
+    assert set(report) == {"mapping_nodes", "relations", "custom_transforms"}
+    assert report["relations"]
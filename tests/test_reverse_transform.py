@@ -0,0 +1,235 @@
+"""
+Tests for selecting the objects of each mapping spec in the reverse transform.
+"""
+
+import csv
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from src.cli.reverse_transform import main
+from src.lib.reverse_transform.buildcsv import reverseTransform
+from src.lib.reverse_transform.parallel import parallel_reverse_transform, split_files
+from src.lib.reverse_transform.paths import RowExtractor, compile_path
+from src.lib.reverse_transform.reverse_transform import (
+    CsvMapping,
+    build_entity_index,
+    get_entity_objects,
+    get_path_value,
+    ingest_json_directory,
+)
+from src.lib.reverse_transform.streaming import file_entity_type, stream_reverse_transform
+
+MAPPING_CSV = "path,input_files_field\n,\nid,ID\nname,Name\n"
+
+
+def spec_for(entity_type, fields=(("id", "ID"),), name="input"):
+    return CsvMapping(name=name, source_file=Path(f"{name}_{entity_type}_mapping.csv"), fields=list(fields))
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def write_objects(directory, objects):
+    for filename, obj in objects.items():
+        (directory / filename).write_text(json.dumps(obj))
+
+
+def hsds_directory(tmp_path):
+    write_objects(tmp_path, {
+        "organization_o1.json": {
+            "id": "o1",
+            "name": "Acme",
+            "services": [
+                {"id": "s1", "name": "Food", "phones": [{"id": "p1", "number": "555"}]},
+                {"id": "s2", "name": "Rent"},
+            ],
+            "locations": [{"id": "l1", "phones": [{"id": "p2"}, {"number": "777"}]}],
+        },
+        "service_s1.json": {"id": "s1", "name": "Food (top level)"},
+        "service_at_location_x1.json": {"id": "x1"},
+        "notes.txt": "not json",
+    })
+    return tmp_path
+
+
+def test_entity_objects_come_from_files_then_nested_lists(tmp_path):
+    hsds_path = hsds_directory(tmp_path)
+    all_objects = ingest_json_directory(hsds_path)
+
+    services = get_entity_objects(spec_for("service"), all_objects, hsds_path)
+    phones = get_entity_objects(spec_for("phone"), all_objects, hsds_path)
+
+    # The top-level s1 wins over the embedded copy with the same id
+    assert [s["name"] for s in services] == ["Food (top level)", "Rent"]
+    # Embedded items are collected depth first; items without an id are always kept
+    assert phones == [{"id": "p1", "number": "555"}, {"id": "p2"}, {"number": "777"}]
+    assert get_entity_objects(spec_for("organization"), all_objects, hsds_path)[0]["id"] == "o1"
+
+
+def test_shared_index_matches_per_spec_lookup(tmp_path):
+    hsds_path = hsds_directory(tmp_path)
+    all_objects = ingest_json_directory(hsds_path)
+    entity_types = ["organization", "service", "location", "phone", "service_at_location"]
+    index = build_entity_index(all_objects, hsds_path, entity_types)
+
+    for entity_type in entity_types + ["address"]:
+        spec = spec_for(entity_type)
+        expected = get_entity_objects(spec, all_objects, hsds_path)
+        assert get_entity_objects(spec, all_objects, hsds_path, index=index) == expected
+
+
+def test_unrecognized_mapping_filename_is_skipped(tmp_path):
+    spec = CsvMapping(name="x", source_file=Path("mapping.csv"), fields=[])
+
+    assert get_entity_objects(spec, [], tmp_path) is None
+
+
+def test_cli_writes_one_csv_per_mapping(tmp_path):
+    (tmp_path / "hsds").mkdir()
+    hsds_path = hsds_directory(tmp_path / "hsds")
+    mapping_dir = tmp_path / "mappings"
+    mapping_dir.mkdir()
+    (mapping_dir / "orgs_organization_mapping.csv").write_text(MAPPING_CSV)
+    (mapping_dir / "svcs_service_mapping.csv").write_text(MAPPING_CSV)
+
+    result = CliRunner().invoke(
+        main, ["-m", str(mapping_dir), "-i", str(hsds_path), "-o", str(tmp_path / "out")]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert read_csv(tmp_path / "out" / "svcs.csv") == [["ID", "Name"], ["s1", "Food (top level)"], ["s2", "Rent"]]
+
+
+def test_streamed_csvs_match_in_memory_reverse_transform(tmp_path):
+    (tmp_path / "hsds").mkdir()
+    hsds_path = hsds_directory(tmp_path / "hsds")
+    fields = [("id", "ID"), ("name", "Name"), ("phones[].number", "Phones")]
+    specs = [spec_for(entity_type, fields, name=entity_type) for entity_type in ("organization", "service", "phone")]
+    all_objects = ingest_json_directory(hsds_path)
+    (tmp_path / "expected").mkdir()
+    (tmp_path / "streamed").mkdir()
+    for spec in specs:
+        reverseTransform(get_entity_objects(spec, all_objects, hsds_path), spec.fields, tmp_path / "expected" / f"{spec.name}.csv")
+
+    written = stream_reverse_transform(specs, hsds_path, tmp_path / "streamed")
+
+    assert [(path.name, rows) for _, path, rows in written] == [("organization.csv", 1), ("service.csv", 2), ("phone.csv", 3)]
+    for spec in specs:
+        filename = f"{spec.name}.csv"
+        assert read_csv(tmp_path / "streamed" / filename) == read_csv(tmp_path / "expected" / filename)
+
+
+def test_streaming_reads_ndjson_files(tmp_path):
+    (tmp_path / "service.ndjson").write_text(
+        json.dumps({"id": "s1", "name": "Food", "phones": [{"id": "p1"}]}) + "\n\n" + json.dumps({"id": "s2"}) + "\n"
+    )
+    specs = [spec_for("service", name="svcs"), spec_for("phone", name="phones")]
+
+    stream_reverse_transform(specs, tmp_path, tmp_path)
+
+    assert read_csv(tmp_path / "svcs.csv") == [["ID"], ["s1"], ["s2"]]
+    assert read_csv(tmp_path / "phones.csv") == [["ID"], ["p1"]]
+
+
+def test_parallel_csvs_match_streamed_csvs(tmp_path):
+    (tmp_path / "hsds").mkdir()
+    hsds_path = hsds_directory(tmp_path / "hsds")
+    (hsds_path / "phone.ndjson").write_text(json.dumps({"id": "p1", "number": "999"}) + "\n")
+    fields = [("id", "ID"), ("name", "Name"), ("phones[].number", "Phones")]
+    specs = [spec_for(entity_type, fields, name=entity_type) for entity_type in ("organization", "service", "phone")]
+    (tmp_path / "streamed").mkdir()
+    (tmp_path / "parallel").mkdir()
+
+    expected = stream_reverse_transform(specs, hsds_path, tmp_path / "streamed")
+    written = parallel_reverse_transform(specs, hsds_path, tmp_path / "parallel", workers=2)
+
+    assert [(path.name, rows) for _, path, rows in written] == [(path.name, rows) for _, path, rows in expected]
+    assert sorted(path.name for path in (tmp_path / "parallel").iterdir()) == ["organization.csv", "phone.csv", "service.csv"]
+    for spec in specs:
+        filename = f"{spec.name}.csv"
+        assert read_csv(tmp_path / "parallel" / filename) == read_csv(tmp_path / "streamed" / filename)
+
+
+def test_files_are_split_into_contiguous_shards():
+    assert split_files(["a", "b", "c", "d", "e"], 2) == [["a", "b", "c"], ["d", "e"]]
+    assert split_files(["a"], 4) == [["a"]]
+    assert split_files([], 4) == [[]]
+
+
+def test_top_level_objects_are_typed_by_their_own_filename():
+    assert file_entity_type("service_at_location_x1", {"id": "x1"}) == "service_at_location"
+    assert file_entity_type("service_at_location_x1", {"id": "at_location_x1"}) == "service"
+    assert file_entity_type("organization_o1", {"id": "o2"}) is None
+    assert file_entity_type("o1", {"id": "o1"}) is None
+
+
+def test_cli_stream_option(tmp_path):
+    (tmp_path / "hsds").mkdir()
+    hsds_path = hsds_directory(tmp_path / "hsds")
+    mapping_dir = tmp_path / "mappings"
+    mapping_dir.mkdir()
+    (mapping_dir / "svcs_service_mapping.csv").write_text(MAPPING_CSV)
+
+    result = CliRunner().invoke(
+        main, ["-m", str(mapping_dir), "-i", str(hsds_path), "-o", str(tmp_path / "out"), "--stream"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Wrote svcs.csv (2 row(s))" in result.output
+    assert read_csv(tmp_path / "out" / "svcs.csv") == [["ID", "Name"], ["s1", "Food (top level)"], ["s2", "Rent"]]
+
+
+def test_cli_workers_option(tmp_path):
+    (tmp_path / "hsds").mkdir()
+    hsds_path = hsds_directory(tmp_path / "hsds")
+    mapping_dir = tmp_path / "mappings"
+    mapping_dir.mkdir()
+    (mapping_dir / "svcs_service_mapping.csv").write_text(MAPPING_CSV)
+
+    args = ["-m", str(mapping_dir), "-i", str(hsds_path), "-o", str(tmp_path / "out"), "--workers", "2"]
+
+    # Workers only read objects the streaming way, so --stream has to be asked for
+    rejected = CliRunner().invoke(main, args)
+    assert rejected.exit_code == 2 and "requires --stream" in rejected.output
+    assert not (tmp_path / "out").exists()
+
+    result = CliRunner().invoke(main, [*args, "--stream"])
+
+    assert result.exit_code == 0, result.output
+    assert "Wrote svcs.csv (2 row(s))" in result.output
+    assert [path.name for path in (tmp_path / "out").iterdir()] == ["svcs.csv"]
+    assert read_csv(tmp_path / "out" / "svcs.csv") == [["ID", "Name"], ["s1", "Food (top level)"], ["s2", "Rent"]]
+
+
+ORGANIZATION = {
+    "id": "o1",
+    "locations": [
+        {"name": "Main", "phones": [{"number": "555"}, {"number": "777"}]},
+        {"name": "Annex", "phones": []},
+    ],
+    "program": {"name": "Food"},
+    "services": {"id": "s1"},
+}
+
+
+def test_compiled_path_gives_the_same_values_as_get_path_value():
+    assert compile_path("locations[].phones[].number") is compile_path("locations[].phones[].number")
+    assert get_path_value(ORGANIZATION, "locations[].phones[].number") == ("555", "777")
+    assert get_path_value(ORGANIZATION, "program.name") == ("Food",)
+    with pytest.raises(ValueError, match='Could not find path "email"'):
+        get_path_value(ORGANIZATION, "email")
+    with pytest.raises(ValueError, match="Expected all services in services\\[\\].id to be in a list"):
+        get_path_value(ORGANIZATION, "services[].id")
+
+
+def test_row_extractor_walks_shared_prefixes_once_per_object():
+    paths = ["id", "locations[].name", "locations[].phones[].number", "locations[].phones[].ext",
+             "program.name", "services[].id", "id", "locations[].id"]
+
+    assert RowExtractor(paths).row(ORGANIZATION) == ["o1", "Main,Annex", "555,777", "", "Food", "", "o1", ""]
+    assert RowExtractor(paths).row({"locations": []}) == ["", "", "", "", "", "", "", ""]
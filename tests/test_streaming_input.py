@@ -0,0 +1,69 @@
+"""
+Tests for streaming CSV inputs through build_collections.
+"""
+
+import types
+from pathlib import Path
+
+import pytest
+
+from src.lib.transform.collections import build_collections
+from src.lib.transform.parser import (
+    iter_input_csv,
+    parse_input_csv,
+    read_csv_header,
+    validate_mapping_against_columns,
+)
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+def test_iter_input_csv_is_lazy_and_matches_parse_input_csv():
+    input_file = str(DATA_DIR / "sanity_check" / "services.csv")
+
+    rows = iter_input_csv(input_file, "services")
+
+    assert isinstance(rows, types.GeneratorType)
+    assert list(rows) == parse_input_csv(input_file, "services")
+
+
+def test_read_csv_header_trims_column_names(tmp_path):
+    p = tmp_path / "orgs.csv"
+    p.write_text(" ID , Name\n1,Acme\n")
+
+    assert read_csv_header(str(p)) == ["ID", "Name"]
+
+
+@pytest.mark.parametrize("dataset", ["sanity_check", "wellskydata", "split_test", "iCarol"])
+def test_streaming_build_collections_matches_materialized(dataset):
+    expected = build_collections(str(DATA_DIR / dataset))
+    streamed = build_collections(str(DATA_DIR / dataset), streaming=True)
+
+    assert streamed == expected
+
+
+def test_streaming_validates_against_header(tmp_path):
+    (tmp_path / "orgs.csv").write_text("ID,Name\n1,Acme\n")
+    (tmp_path / "orgs_organization_mapping.csv").write_text(
+        "path,input_files_field,split,strip\n,,,\nid,ID,,\nemail,Email,,\n"
+    )
+
+    with pytest.raises(ValueError, match="Email"):
+        build_collections(str(tmp_path), streaming=True)
+
+
+def test_streaming_skips_header_only_inputs(tmp_path):
+    (tmp_path / "orgs.csv").write_text("ID,Name\n")
+    (tmp_path / "orgs_organization_mapping.csv").write_text(
+        "path,input_files_field,split,strip\n,,,\nid,ID,,\n"
+    )
+
+    assert build_collections(str(tmp_path), streaming=True) == []
+
+
+def test_validate_mapping_against_columns():
+    mapping = {"id": {"path": "orgs.ID"}, "phones": [{"number": {"path": ["orgs.Phone1", "orgs.Phone2"]}}]}
+
+    validate_mapping_against_columns(mapping, ["ID", "Phone1", "Phone2"], "orgs", "orgs_organization_mapping.csv")
+    with pytest.raises(ValueError, match="Phone2"):
+        validate_mapping_against_columns(mapping, ["ID", "Phone1"], "orgs", "orgs_organization_mapping.csv")
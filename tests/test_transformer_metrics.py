@@ -0,0 +1,247 @@
+"""
+Tests for the stage and per-file metrics kept by TransformerLog.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+
+import pytest
+from click.testing import CliRunner
+
+from src.cli.main import main
+from src.lib.transform.collections import build_collections, searching_and_assigning
+from src.lib.transform.json_collections import build_collections_from_json
+from src.lib.transform.logger import (
+    TransformerLog,
+    call_measured,
+    capture_transformer_log,
+    measure,
+    get_transformer_log,
+    transformer_log,
+)
+
+# The API modules import their siblings as top-level packages (uvicorn runs with --app-dir src)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from api.executor import TransformExecutor  # noqa: E402
+from api.jobs import JobStore  # noqa: E402
+
+
+def write_dataset(root):
+    """organizations with a filter on Kind, and a locations input whose mapping is empty"""
+    root.mkdir(exist_ok=True)
+    (root / "orgs.csv").write_text("ID,Name,Kind\n1,Acme,keep\n2,Blueprint,skip\n3,Cobalt,keep\n")
+    (root / "orgs_organization_mapping.csv").write_text(
+        "path,input_files_field,split,strip\nKind,keep\nid,ID,,\nname,Name,,\n"
+    )
+    (root / "locs.csv").write_text("ID,OrgID\n10,1\n11,3\n")
+    (root / "locs_location_mapping.csv").write_text("path,input_files_field,split,strip\n,,,\n")
+    return root
+
+
+def test_stage_records_timings_even_when_the_block_raises():
+    log = TransformerLog()
+
+    with pytest.raises(RuntimeError):
+        with log.stage("mapping"):
+            raise RuntimeError("boom")
+
+    stage = log.get_metrics()["stages"]["mapping"]
+    assert stage["wall_seconds"] >= 0 and stage["cpu_seconds"] >= 0
+    assert "peak_memory_bytes" not in stage
+
+
+def test_trace_memory_records_peak_allocation():
+    log = TransformerLog(trace_memory=True)
+
+    with log.stage("allocate"):
+        data = [bytes(1024) for _ in range(100)]
+    del data
+
+    assert log.get_metrics()["stages"]["allocate"]["peak_memory_bytes"] >= 100 * 1024
+
+
+def test_nested_blocks_each_get_their_own_peak():
+    with measure(trace_memory=True) as outer:
+        before = [bytes(1024) for _ in range(1000)]
+        del before
+        held = [bytes(1024) for _ in range(500)]
+        with measure(trace_memory=True) as inner:
+            small = [bytes(1024) for _ in range(10)]
+        del small, held
+
+    # The inner block only counts what it allocated, not the memory already held when it started
+    assert 10 * 1024 <= inner["peak_memory_bytes"] < 100 * 1024
+    # The outer block keeps the peak it reached before the inner block started
+    assert outer["peak_memory_bytes"] >= 1000 * 1024
+
+
+def test_file_metrics_report_their_own_peak_allocation(tmp_path):
+    write_dataset(tmp_path)
+
+    with capture_transformer_log(trace_memory=True) as log:
+        build_collections(str(tmp_path))
+
+    metrics = log.get_metrics()
+    orgs = metrics["files"]["orgs_organization_mapping.csv"]
+    assert orgs["peak_memory_bytes"] > 0
+    # The process-wide RSS high-water mark only ever grows, so it is only reported per stage
+    assert "max_rss_bytes" not in orgs
+    assert "peak_memory_bytes" in metrics["stages"]["build_collections"]
+
+
+def test_totals_sum_files_and_counters():
+    log = TransformerLog()
+    log.record_file("a_mapping.csv", rows=10, objects=8, filtered_rows=2, wall_seconds=0.5)
+    log.record_file("b_mapping.csv", rows=0, objects=0, skipped_rows=4, skipped=True)
+    log.count("objects_linked", 3)
+
+    metrics = log.get_metrics()
+
+    assert metrics["files"]["a_mapping.csv"]["rows_per_second"] == 20
+    assert metrics["totals"] == {
+        "rows": 10,
+        "filtered_rows": 2,
+        "skipped_rows": 4,
+        "objects_mapped": 8,
+        "skipped_files": 1,
+        "objects_linked": 3,
+    }
+    json.dumps(metrics)
+    assert "File a_mapping.csv" in log.format_metrics()
+
+
+def test_call_measured_merges_stats_and_timings():
+    def count_rows(rows, stats):
+        stats["rows"] = len(rows)
+        return rows
+
+    result, metrics = call_measured(count_rows, [1, 2])
+
+    assert result == [1, 2]
+    assert metrics["rows"] == 2 and "wall_seconds" in metrics
+
+
+def test_captured_logs_are_isolated_per_thread():
+    seen = {}
+
+    def run(name):
+        with capture_transformer_log() as log:
+            transformer_log.count("objects_linked", len(name))
+            seen[name] = (log, get_transformer_log() is log)
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ("a", "bbb")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen["a"][1] and seen["bbb"][1]
+    assert seen["a"][0].counters == {"objects_linked": 1}
+    assert seen["bbb"][0].counters == {"objects_linked": 3}
+    assert get_transformer_log() is not seen["a"][0]
+
+
+def test_stage_cpu_time_leaves_out_other_threads():
+    done = threading.Event()
+
+    def spin():
+        while not done.is_set():
+            pass
+
+    thread = threading.Thread(target=spin)
+    thread.start()
+    try:
+        with measure() as metrics:
+            time.sleep(0.2)
+    finally:
+        done.set()
+        thread.join()
+
+    # Another run busy in a different thread doesn't count towards this block's CPU time
+    assert metrics["cpu_seconds"] < 0.1
+
+
+def test_traced_blocks_are_kept_by_the_current_run():
+    with capture_transformer_log(trace_memory=True) as log:
+        with log.stage("outer"):
+            with measure(trace_memory=True):
+                assert len(log.traced_blocks) == 2
+                assert get_transformer_log() is log and TransformerLog().traced_blocks == []
+
+    assert log.traced_blocks == []
+
+
+@pytest.mark.parametrize("options", [{}, {"streaming": True}, {"chunk_size": 1}, {"workers": 2}])
+def test_build_collections_records_per_file_metrics(tmp_path, options):
+    write_dataset(tmp_path)
+
+    with capture_transformer_log() as log:
+        collections = build_collections(str(tmp_path), **options)
+        searching_and_assigning(collections)
+
+    metrics = log.get_metrics()
+    orgs = metrics["files"]["orgs_organization_mapping.csv"]
+    locs = metrics["files"]["locs_location_mapping.csv"]
+    assert (orgs["rows"], orgs["objects"], orgs["filtered_rows"], orgs["skipped"]) == (3, 2, 1, False)
+    assert orgs["input_file"] == "orgs.csv" and orgs["object_type"] == "organization"
+    assert (locs["skipped"], locs["skipped_rows"], locs["objects"]) == (True, 2, 0)
+    assert set(metrics["stages"]) == {"build_collections", "searching_and_assigning"}
+    assert metrics["totals"]["objects_mapped"] == 2
+    assert metrics["totals"]["skipped_files"] == 1
+
+
+def test_build_collections_from_json_records_per_file_metrics(tmp_path):
+    (tmp_path / "orgs.json").write_text(json.dumps([{"ID": "1"}, {"ID": "2"}]))
+    (tmp_path / "orgs_organization_mapping.json").write_text(json.dumps({"mappings": [{"output_path": "id", "input_path": "ID"}]}))
+
+    with capture_transformer_log() as log:
+        build_collections_from_json(str(tmp_path))
+
+    files = log.get_metrics()["files"]
+    assert files["orgs_organization_mapping.json"]["rows"] == 2
+    assert files["orgs_organization_mapping.json"]["objects"] == 2
+
+
+def test_cli_writes_metrics_json(tmp_path):
+    write_dataset(tmp_path / "input")
+    metrics_file = tmp_path / "metrics.json"
+
+    result = CliRunner().invoke(
+        main,
+        [str(tmp_path / "input"), "--output-dir", str(tmp_path / "out"), "--metrics", "--metrics-json", str(metrics_file)],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "=== Metrics ===" in result.output
+    metrics = json.loads(metrics_file.read_text())
+    assert set(metrics["stages"]) >= {"build_collections", "searching_and_assigning", "save_objects"}
+    assert metrics["totals"]["rows"] == 3
+
+
+def test_job_keeps_the_metrics_reported_by_the_transform(tmp_path):
+    def transform(input_root, input_format, progress):
+        progress(stage="mapping")
+        progress(objects_linked=0, metrics={"stages": {}, "files": {}, "totals": {"rows": 1}})
+        return [("organization", [{"id": "1"}])]
+
+    executor = TransformExecutor(max_workers=1)
+    try:
+        store = JobStore(executor, transform, root_dir=tmp_path)
+        job = store.create_job(str(tmp_path), "csv", "files")
+        with zipfile.ZipFile(job.upload_path, "w") as zf:
+            zf.writestr("orgs.csv", "id\n1\n")
+
+        store.start(job)
+        deadline = time.monotonic() + 5
+        while not job.is_finished and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        executor.shutdown()
+
+    assert job.status == "succeeded"
+    assert job.metrics["totals"] == {"rows": 1}
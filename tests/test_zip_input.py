@@ -0,0 +1,79 @@
+"""
+Tests for reading transformer inputs straight from a zip archive (zipfile.Path) instead of a directory.
+"""
+
+import os
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from src.lib.transform.collections import build_collections, searching_and_assigning
+from src.lib.transform.json_collections import build_collections_from_json
+
+# The API modules import their siblings as top-level packages (uvicorn runs with --app-dir src)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from api.utils import UploadValidationError, find_zip_input_root, open_zip_input  # noqa: E402
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+def zip_dataset(dataset, zip_path, prefix=""):
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for path in sorted((DATA_DIR / dataset).iterdir()):
+            if path.is_file():
+                zf.write(path, f"{prefix}{path.name}")
+    return zip_path
+
+
+@pytest.mark.parametrize("dataset", ["sanity_check", "services", "split_test"])
+@pytest.mark.parametrize("streaming", [False, True])
+def test_csv_zip_matches_directory(tmp_path, dataset, streaming):
+    expected = searching_and_assigning(build_collections(str(DATA_DIR / dataset), streaming=streaming))
+
+    with zipfile.ZipFile(zip_dataset(dataset, tmp_path / "in.zip"), "r") as zf:
+        results = build_collections(zipfile.Path(zf), streaming=streaming)
+
+    assert dict(searching_and_assigning(results)) == dict(expected)
+
+
+def test_json_zip_matches_directory(tmp_path):
+    expected = build_collections_from_json(str(DATA_DIR / "json_test"))
+
+    with zipfile.ZipFile(zip_dataset("json_test", tmp_path / "in.zip"), "r") as zf:
+        # workers is ignored for archives, which can't be sent to worker processes
+        results = build_collections_from_json(zipfile.Path(zf), workers=4)
+
+    assert dict(results) == dict(expected)
+
+
+def test_zip_input_root_unwraps_single_folder(tmp_path):
+    with zipfile.ZipFile(zip_dataset("sanity_check", tmp_path / "in.zip", prefix="sanity_check/"), "r") as zf:
+        root = find_zip_input_root(zf)
+        results = build_collections(open_zip_input(zf, root, "upload.zip"))
+
+    assert root == "sanity_check/"
+    # Discovery order follows the directory listing, so compare by object type
+    assert dict(results) == dict(build_collections(str(DATA_DIR / "sanity_check")))
+
+
+def test_zip_input_root_keeps_top_level_files(tmp_path):
+    zip_path = tmp_path / "in.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("orgs.csv", "id\n1\n")
+        zf.writestr("nested/orgs_organization_mapping.csv", "")
+
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        assert find_zip_input_root(zf) == ""
+
+
+def test_zip_input_root_rejects_folders_without_files(tmp_path):
+    zip_path = tmp_path / "in.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("empty/", "")
+
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        with pytest.raises(UploadValidationError, match="empty folder"):
+            find_zip_input_root(zf)